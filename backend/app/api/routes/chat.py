@@ -1,19 +1,94 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Dict, List
+import json
 import logging
 
-from app.core.database import get_db, Message
+from app.core.config import settings
+from app.core.database import get_async_db, AsyncSessionLocal, Message
 from app.models.schemas import MessageRequest, ChatResponse
 from app.services.langchain_rag import rag_service
+from app.services.lexical_index import lexical_index
+from app.services.reranker import reranker_service
 from app.core.security import prompt_injection_detector
-from app.utils.logger import log_query
+from app.utils.logger import alog_query
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+async def load_history(db: AsyncSession, conversation_id: str) -> List[Dict[str, str]]:
+    """
+    Load a conversation's messages formatted for the RAG service
+    
+    Args:
+        db: Async database session
+        conversation_id: ID of the conversation
+        
+    Returns:
+        List of message dicts with 'role' and 'content'
+    """
+    result = await db.execute(
+        select(Message)
+        .filter(Message.conversation_id == conversation_id)
+        .order_by(Message.timestamp)
+    )
+    return [
+        {"role": msg.role, "content": msg.content}
+        for msg in result.scalars().all()
+    ]
+
+
+async def save_exchange(
+    db: AsyncSession,
+    conversation_id: str,
+    user_message: str,
+    response_text: str,
+    sources: List[str]
+):
+    """
+    Persist a user message and assistant response, then log the query
+    
+    Args:
+        db: Async database session
+        conversation_id: ID of the conversation
+        user_message: Original (unsanitized) user message
+        response_text: Assistant response
+        sources: List of source URLs
+    """
+    # Save user message
+    db.add(Message(
+        conversation_id=conversation_id,
+        role="user",
+        content=user_message
+    ))
+    
+    # Save assistant response
+    db.add(Message(
+        conversation_id=conversation_id,
+        role="assistant",
+        content=response_text
+    ))
+    await db.commit()
+    
+    # Log the query and response
+    await alog_query(
+        db=db,
+        conversation_id=conversation_id,
+        user_query=user_message,
+        bot_response=response_text,
+        sources=sources
+    )
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @router.get("/debug/rag-test")
 async def test_rag_pipeline():
     """
@@ -24,14 +99,19 @@ async def test_rag_pipeline():
         logger.info(f"Testing RAG pipeline with query: {test_query}")
         
         # Test context retrieval
-        context, sources = rag_service.retrieve_context(test_query)
+        retrieval = await rag_service.aretrieve(test_query)
+        context = retrieval.context
         
         return {
             "query": test_query,
             "context_found": bool(context),
             "context_length": len(context),
-            "sources_count": len(sources),
-            "sources": sources,
+            "tier": retrieval.tier,
+            "rerank_path": retrieval.rerank_path,
+            "rerank_ms": retrieval.rerank_ms,
+            "candidates": retrieval.candidates,
+            "sources_count": len(retrieval.sources),
+            "sources": retrieval.sources,
             "context_preview": context[:500] + "..." if len(context) > 500 else context
         }
     except Exception as e:
@@ -39,10 +119,25 @@ async def test_rag_pipeline():
         raise HTTPException(status_code=500, detail=f"RAG test failed: {str(e)}")
 
 
+@router.get("/debug/stats")
+async def retrieval_stats():
+    """
+    Debug endpoint exposing retrieval counters since startup
+    """
+    return {
+        "retrieval_tiers": dict(rag_service.tier_counts),
+        "rerank_paths": dict(rag_service.rerank_path_counts),
+        "query_embedding_cache": rag_service.query_cache.stats(),
+        "answer_cache": rag_service.answer_cache.stats(),
+        "lexical_index": lexical_index.stats() if settings.HYBRID_SEARCH_ENABLED else None,
+        "reranker": await reranker_service.astats()
+    }
+
+
 @router.post("/message", response_model=ChatResponse)
 async def send_message(
     request: MessageRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send a message and get a response
@@ -68,45 +163,19 @@ async def send_message(
         sanitized_message = prompt_injection_detector.sanitize(request.message)
         
         # Get chat history
-        chat_history = db.query(Message).filter(
-            Message.conversation_id == request.conversation_id
-        ).order_by(Message.timestamp).all()
-        
-        # Format history for RAG
-        history_list = [
-            {"role": msg.role, "content": msg.content}
-            for msg in chat_history
-        ]
+        history_list = await load_history(db, request.conversation_id)
         
         # Generate response using RAG
-        response_text, sources = rag_service.generate_response(
+        response_text, sources = await rag_service.agenerate_response(
             query=sanitized_message,
             chat_history=history_list
         )
         
-        # Save user message
-        user_message = Message(
-            conversation_id=request.conversation_id,
-            role="user",
-            content=request.message
-        )
-        db.add(user_message)
-        
-        # Save assistant response
-        assistant_message = Message(
-            conversation_id=request.conversation_id,
-            role="assistant",
-            content=response_text
-        )
-        db.add(assistant_message)
-        db.commit()
-        
-        # Log the query and response
-        log_query(
+        await save_exchange(
             db=db,
             conversation_id=request.conversation_id,
-            user_query=request.message,
-            bot_response=response_text,
+            user_message=request.message,
+            response_text=response_text,
             sources=sources
         )
         
@@ -118,7 +187,84 @@ async def send_message(
         
     except Exception as e:
         logger.error(f"Error processing message: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Error processing message")
 
 
+@router.post("/message/stream")
+async def send_message_stream(
+    request: MessageRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Send a message and stream the response as Server-Sent Events
+    
+    Emits a 'sources' event as soon as retrieval finishes, then 'token' events
+    as the LLM generates, and a final 'done' event. Messages are persisted once
+    the stream completes.
+    
+    Args:
+        request: Message request with conversation_id and message
+        db: Database session
+        
+    Returns:
+        Streaming response with media type text/event-stream
+    """
+    # Check for prompt injection
+    is_injection, injection_msg = prompt_injection_detector.detect(request.message)
+    
+    history_list = []
+    if not is_injection:
+        try:
+            history_list = await load_history(db, request.conversation_id)
+        except Exception as e:
+            logger.error(f"Error loading chat history: {e}")
+            raise HTTPException(status_code=500, detail="Error processing message")
+    
+    async def event_stream() -> AsyncIterator[str]:
+        if is_injection:
+            yield format_sse("sources", {"sources": []})
+            yield format_sse("token", {"content": injection_msg})
+            yield format_sse("done", {"conversation_id": request.conversation_id})
+            return
+        
+        sanitized_message = prompt_injection_detector.sanitize(request.message)
+        response_parts = []
+        sources = []
+        
+        try:
+            async for event, data in rag_service.astream_response(
+                query=sanitized_message,
+                chat_history=history_list
+            ):
+                if event == "sources":
+                    sources = data["sources"]
+                elif event == "token":
+                    response_parts.append(data["content"])
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.error(f"Error streaming message: {e}")
+            yield format_sse("error", {"detail": "Error processing message"})
+            return
+        
+        # The request-scoped session is closed once the response starts, use a fresh one
+        async with AsyncSessionLocal() as stream_db:
+            try:
+                await save_exchange(
+                    db=stream_db,
+                    conversation_id=request.conversation_id,
+                    user_message=request.message,
+                    response_text="".join(response_parts),
+                    sources=sources
+                )
+            except Exception as e:
+                logger.error(f"Error saving streamed message: {e}")
+                await stream_db.rollback()
+        
+        yield format_sse("done", {"conversation_id": request.conversation_id})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -26,18 +26,100 @@ class Settings(BaseSettings):
     QDRANT_HOST: str = "localhost"
     QDRANT_PORT: int = 6333
     QDRANT_COLLECTION_NAME: str = "zibtek_docs"
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_PREFER_GRPC: bool = False  # Use gRPC (port 6334) instead of REST for search and upserts
+    QDRANT_TIMEOUT: int = 10  # Seconds per Qdrant request
+    QDRANT_MAX_CONNECTIONS: int = 20  # REST connection pool size shared by all requests
+    QDRANT_MAX_KEEPALIVE_CONNECTIONS: int = 10  # Idle REST connections kept open between requests
+    QDRANT_UPSERT_BATCH_SIZE: int = 100  # Points per upsert request
+    QDRANT_UPSERT_CONCURRENCY: int = 4  # Upsert requests in flight during ingestion
+    
+    # Qdrant collection profile (applied on creation and to an existing collection by ingest_data)
+    QDRANT_HNSW_M: int = 16  # HNSW graph degree: higher = better recall, more RAM
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100  # HNSW build-time beam width
+    QDRANT_ON_DISK: bool = False  # Keep original vectors on disk (memory-mapped) instead of RAM
+    QDRANT_QUANTIZATION: str = "none"  # none or int8 (scalar quantization, ~4x less vector RAM)
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True  # Keep the int8 vectors in RAM even when originals are on disk
+    QDRANT_SEARCH_HNSW_EF: int = 128  # HNSW search beam width (>= TOP_K_RESULTS)
+    QDRANT_SEARCH_RESCORE: bool = True  # Re-rank quantized hits with the original vectors
+    QDRANT_SEARCH_OVERSAMPLING: float = 2.0  # Quantized candidates fetched per result before rescoring
+    
+    # Vector store
+    VECTOR_BACKEND: str = "qdrant"  # qdrant or local (memory-mapped NumPy index, no Qdrant server needed)
+    LOCAL_INDEX_DIR: str = "./data/vector_index"  # Where the local index is written by ingest_data
+    LOCAL_INDEX_DTYPE: str = "float32"  # float32 or float16 (half the size, slightly less precise scores)
     
     # Database
     DATABASE_URL: str = "sqlite:///./data/chatbot.db"
     
     # Scraping
     TARGET_WEBSITE: str = "https://www.zibtek.com"
+    SCRAPER_USER_AGENT: str = "ZibtekChatbotCrawler/1.0"
+    SCRAPER_TIMEOUT: float = 10.0  # Seconds per page request
+    SCRAPER_MAX_CONNECTIONS: int = 16  # Pooled keep-alive connections (and pages in flight) across all hosts
+    SCRAPER_PER_HOST_CONCURRENCY: int = 4  # Requests in flight per host
+    SCRAPER_PER_HOST_RPS: float = 4.0  # Request starts per second per host (0 = unlimited); robots.txt Crawl-delay can only slow this down
+    SCRAPER_RESPECT_ROBOTS: bool = True  # Skip URLs disallowed by robots.txt
+    SCRAPER_USE_SITEMAP: bool = True  # Seed the crawl from sitemap.xml (newest lastmod first) before following links
+    SCRAPER_MAX_SITEMAPS: int = 20  # Sitemap files read, including nested sitemap indexes
+    SCRAPER_MAX_DEPTH: int = 5  # Link hops followed from the start page or a sitemap entry
+    SCRAPER_HTML_PARSER: str = "html.parser"  # html.parser, lxml or selectolax (the last two need: pip install lxml / selectolax)
+    SCRAPER_PARSE_WORKERS: int = 2  # Processes extracting content while pages download (0 = parse on the event loop)
+    SCRAPER_CONDITIONAL_REQUESTS: bool = True  # Revalidate previously crawled pages with If-None-Match / If-Modified-Since
+    SCRAPER_STATE_PATH: Optional[str] = "./data/crawl_state.db"  # Per-URL ETag, Last-Modified, content hash and links (None disables)
+    SCRAPER_CACHE_COMPRESSION: str = "none"  # Scraped document cache: none, gzip or zstd (zstd needs: pip install zstandard)
     
     # RAG Settings
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     TOP_K_RESULTS: int = 20  # Initial retrieval from vector DB (before reranking)
     SIMILARITY_THRESHOLD: float = 0.1  # Lowered from 0.7 to allow more results for reranking
+    FALLBACK_SIMILARITY_THRESHOLD: float = 0.5  # Second tier, applied to the same candidates when the primary tier yields nothing
+    
+    # Hybrid retrieval (BM25 lexical index fused with dense results)
+    HYBRID_SEARCH_ENABLED: bool = False  # Fuse BM25 results into the dense candidates with reciprocal rank fusion
+    LEXICAL_INDEX_PATH: str = "./data/lexical_index.json"  # Built by ingest_data
+    LEXICAL_TOP_K: int = 20  # BM25 results fused per query
+    RRF_K: int = 60  # Reciprocal rank fusion constant
+    BM25_K1: float = 1.2
+    BM25_B: float = 0.75
+    
+    # Query Embedding Cache
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024  # Max in-memory entries (0 disables the memory tier)
+    QUERY_EMBEDDING_CACHE_TTL: Optional[int] = 86400  # Seconds before an entry expires (None = never)
+    QUERY_EMBEDDING_CACHE_PATH: Optional[str] = None  # SQLite file for a persistent tier, e.g. ./data/query_embeddings.db
+    EMBEDDING_STORE_PATH: Optional[str] = "./data/chunk_embeddings.db"  # Chunk embeddings keyed by (model, sha256 of text), reused across ingestions (None disables)
+    EMBEDDING_STORE_MAX_ENTRIES: int = 100000  # Least recently used chunk embeddings are pruned beyond this (0 = no cap)
+    
+    # Ingestion embedding pipeline (concurrent, rate-limited OpenAI batches)
+    EMBEDDING_BATCH_MAX_TOKENS: int = 50000  # Input tokens per embedding request
+    EMBEDDING_BATCH_MAX_TEXTS: int = 256  # Chunks per embedding request
+    EMBEDDING_CONCURRENCY: int = 4  # Embedding requests in flight
+    EMBEDDING_REQUESTS_PER_MINUTE: int = 3000  # Request quota of the OpenAI account (0 = unlimited)
+    EMBEDDING_TOKENS_PER_MINUTE: int = 1000000  # Token quota of the OpenAI account (0 = unlimited)
+    EMBEDDING_MAX_RETRIES: int = 6  # Retries per batch on 429s, timeouts and 5xx errors
+    EMBEDDING_RETRY_BASE_DELAY: float = 1.0  # Seconds before the first retry, doubled per attempt (with jitter)
+    EMBEDDING_RETRY_MAX_DELAY: float = 60.0  # Longest single backoff
+    
+    # Streaming ingestion (chunk → embed → upsert)
+    INGEST_BATCH_SIZE: int = 256  # Chunks per batch flowing between stages (and per checkpoint)
+    INGEST_QUEUE_SIZE: int = 2  # Batches buffered between stages; bounds ingestion memory
+    INGEST_CHECKPOINT_PATH: str = "./data/ingest_checkpoint.json"  # Progress of an unfinished run, resumed by the next one
+    
+    # Deduplication before chunking (shared boilerplate and near-duplicate chunks)
+    DEDUP_ENABLED: bool = False  # Opt-in: re-chunks every page on each run, since kept copies depend on the whole corpus
+    DEDUP_SHINGLE_WORDS: int = 5  # Words per shingle, for boilerplate detection and chunk MinHash
+    DEDUP_BOILERPLATE_MIN_PAGES: int = 3  # Text on at least this many pages is boilerplate, kept only on the page with the shortest URL
+    DEDUP_MIN_BLOCK_WORDS: int = 20  # Shorter shared passages are left in place
+    DEDUP_NEAR_DUPLICATE_THRESHOLD: float = 0.8  # Estimated Jaccard similarity at which a chunk is dropped as a near-duplicate of an earlier one
+    DEDUP_NUM_PERM: int = 128  # MinHash signature length
+    
+    # Semantic Answer Cache (first-turn queries only)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_MAX_DISTANCE: float = 0.03  # Max cosine distance between query embeddings for a hit
+    SEMANTIC_CACHE_SIZE: int = 512
+    SEMANTIC_CACHE_TTL: Optional[int] = 86400  # Seconds before a cached answer expires (None = never)
+    CORPUS_VERSION_FILE: str = "./data/corpus_version"  # Bumped by ingest_data to invalidate caches
     
     # Reranker Settings (BGE-Reranker from HuggingFace)
     USE_RERANKER: bool = True
@@ -45,6 +127,28 @@ class Settings(BaseSettings):
     RERANK_TOP_N: int = 10  # Final number of results to keep after reranking
     RERANK_THRESHOLD: float = 0.3  # Minimum relevance score (0-1) - lowered to allow more results
     RERANK_BATCH_SIZE: int = 16  # Batch size for reranking
+    RERANK_BACKEND: str = "torch"  # torch, onnx or onnx-int8 (ONNX needs: pip install 'optimum[onnxruntime]')
+    RERANK_ONNX_CACHE_DIR: str = "./data/onnx"  # Exported ONNX artifacts are cached here
+    RERANK_TOKEN_CACHE_DIR: str = "./data/rerank_tokens"  # Chunk token ids precomputed at ingestion
+    RERANK_SCORE_CACHE_SIZE: int = 10000  # Cached (query, chunk) rerank scores (0 disables)
+    
+    # Rerank Cascade (skip or shorten reranking when vector scores are decisive)
+    RERANK_CASCADE_ENABLED: bool = False
+    RERANK_CASCADE_SKIP_MARGIN: float = 0.08  # Top-1 minus top-2 vector score that skips reranking
+    RERANK_CASCADE_PREFIX_MARGIN: float = 0.03  # Margin that limits reranking to a prefix
+    RERANK_CASCADE_MAX_ENTROPY: float = 0.6  # Normalized score entropy (0-1) at or below which only a prefix is reranked
+    RERANK_CASCADE_TEMPERATURE: float = 0.02  # Softmax temperature applied to vector scores for the entropy
+    RERANK_CASCADE_PREFIX_SIZE: int = 5  # Candidates reranked on the prefix path
+    RERANK_EXECUTOR_WORKERS: int = 1  # Threads used to run reranking off the event loop
+    RERANK_WORKER_ADDRESS: Optional[str] = None  # host:port of a rerank worker pool (python -m app.rerank_server); unset runs the model in-process
+    RERANK_WORKER_AUTHKEY: Optional[str] = None  # Shared secret between API processes and the worker pool; required with RERANK_WORKER_ADDRESS
+    RERANK_WORKERS: int = 2  # Model processes started by the worker pool
+    RERANK_WORKER_TORCH_THREADS: int = 2  # torch intra-op threads per worker process
+    RERANK_WORKER_TIMEOUT: float = 30.0  # Seconds an API process waits for a worker reply
+    RERANK_WORKER_LOAD_TIMEOUT: float = 300.0  # Seconds the worker pool waits for the model to load before exiting
+    RERANK_MICROBATCH_ENABLED: bool = True  # Batch pairs from concurrent requests into shared forward passes
+    RERANK_MAX_BATCH_SIZE: int = 64  # Stop collecting pairs for a micro-batch at this size
+    RERANK_MAX_WAIT_MS: float = 5.0  # Longest a request waits for others to join its micro-batch
     
     # LangSmith Tracing (Optional)
     LANGSMITH_TRACING: Optional[str] = None
@@ -1,12 +1,21 @@
 """
-Data ingestion script to scrape website and populate Qdrant
+Data ingestion script to scrape website and populate the vector store (Qdrant or local index)
 """
+import asyncio
 import logging
+import os
 import sys
+from typing import Dict, Iterable, Iterator, Optional
 from app.core.config import settings
-from app.services.scraper import scrape_website
+from app.services.scraper import WebScraper
+from app.services.dedup import CorpusDeduplicator
+from app.services.embedding_executor import token_counter
 from app.services.embeddings import embedding_service
-from app.services.qdrant_service import qdrant_service
+from app.services.vector_store import vector_store
+from app.services.ingest_pipeline import IngestCheckpoint, IngestPipeline
+from app.services.lexical_index import lexical_index
+from app.services.rerank_token_cache import RerankTokenCache
+from app.utils.corpus import bump_corpus_version, point_id
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,49 +24,167 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def ingest_data(force_refresh: bool = False):
-    """Main data ingestion function"""
+def fit_deduplicator(documents: Iterable[Dict]) -> Optional[CorpusDeduplicator]:
+    """Learn the corpus's shared boilerplate (None when DEDUP_ENABLED is off)"""
+    if not settings.DEDUP_ENABLED:
+        return None
+    deduplicator = CorpusDeduplicator(
+        shingle_words=settings.DEDUP_SHINGLE_WORDS,
+        boilerplate_min_pages=settings.DEDUP_BOILERPLATE_MIN_PAGES,
+        min_block_words=settings.DEDUP_MIN_BLOCK_WORDS,
+        near_duplicate_threshold=settings.DEDUP_NEAR_DUPLICATE_THRESHOLD,
+        num_perm=settings.DEDUP_NUM_PERM,
+        count_tokens=token_counter(settings.OPENAI_EMBEDDING_MODEL)
+    )
+    deduplicator.fit(documents)
+    return deduplicator
+
+
+def build_rerank_token_cache(chunks: Iterable[Dict]):
+    """Tokenize chunks with the reranker's tokenizer so queries only tokenize themselves"""
+    try:
+        from transformers import AutoTokenizer
+        
+        tokenizer = AutoTokenizer.from_pretrained(settings.RERANK_MODEL)
+        token_cache = RerankTokenCache(settings.RERANK_TOKEN_CACHE_DIR, settings.RERANK_MODEL)
+        token_cache.build(
+            chunks,
+            lambda text: tokenizer(text, add_special_tokens=False, truncation=True, max_length=512)['input_ids']
+        )
+    except Exception as e:
+        # The reranker tokenizes uncached chunks itself, so this is not fatal
+        logger.error(f"Error precomputing reranker tokenization: {e}")
+
+
+def ingest_data(force_refresh: bool = False) -> Dict[str, int]:
+    """
+    Main data ingestion function
+    
+    Incremental: only new or changed chunks are embedded and upserted, and
+    chunks that no longer exist are deleted. Chunks stream through chunking,
+    embedding and upserting in batches, and each committed batch is
+    checkpointed, so a restarted run picks up where an interrupted one stopped.
+    
+    Returns:
+        Counts of added, updated, deleted and unchanged chunks
+    """
     try:
         logger.info("Starting data ingestion...")
         
-        # Check if collection already exists
-        if qdrant_service.collection_exists():
-            logger.info("Collection already exists. Skipping ingestion.")
-            logger.info("To re-ingest, delete the collection first.")
-            return
+        checkpoint = IngestCheckpoint(settings.INGEST_CHECKPOINT_PATH)
+        if checkpoint.load():
+            logger.info(
+                f"Resuming interrupted ingestion: {checkpoint.state.get('batches', 0)} batches "
+                f"({checkpoint.state.get('chunks', 0)} chunks) were already committed"
+            )
         
         # Step 1: Scrape website (with caching)
         logger.info(f"Scraping website: {settings.TARGET_WEBSITE}")
         # Try to load from cache first, only crawl if no cache exists or force_refresh is True
-        documents = scrape_website(settings.TARGET_WEBSITE, max_pages=100, force_refresh=force_refresh)
+        # (a refresh crawl revalidates known pages and records which ones are unchanged)
+        scraper = WebScraper(settings.TARGET_WEBSITE, max_pages=100)
+        documents = scraper.crawl_or_load(force_refresh=force_refresh)
         
         if not documents:
             logger.error("No documents scraped. Exiting.")
-            return
+            return {}
         
         logger.info(f"Scraped {len(documents)} documents")
         
-        # Step 2: Chunk documents
-        logger.info("Chunking documents...")
-        chunks = embedding_service.chunk_documents(documents)
-        logger.info(f"Created {len(chunks)} chunks")
+        # Step 2: Read what the vector store already holds
+        collection_exists = vector_store.collection_exists()
+        if collection_exists and settings.VECTOR_BACKEND == "qdrant":
+            vector_store.update_collection_profile()
+        stored_hashes = vector_store.get_content_hashes() if collection_exists else {}
+        
+        # Step 3: Find boilerplate shared across pages, stripped before chunking
+        deduplicator = fit_deduplicator(documents)
+        
+        def corpus_chunks(docs: Iterable[Dict]) -> Iterator[Dict]:
+            """Chunks of docs, deduplicated if enabled (the same chunks on every pass)"""
+            if deduplicator is None:
+                return embedding_service.iter_chunks(docs)
+            return deduplicator.iter_chunks(docs, embedding_service.chunk_document)
+        
+        # Pages the crawler found unchanged skip chunking, unless their chunks are missing from the store.
+        # With dedup (opt-in), a page's chunks also depend on the other pages - which copy of shared text
+        # is kept, which near-duplicate is seen first - so every page is re-chunked; chunks whose text
+        # did not change are still recognized by content hash and not re-embedded
+        unchanged_urls = set() if deduplicator is not None else {
+            url for url in scraper.unchanged_urls
+            if point_id(url, 0) in stored_hashes
+        }
+        # Documents stream from the on-disk cache, so each pass below re-reads them instead of holding them all
+        changed_documents = (doc for doc in documents if doc['url'] not in unchanged_urls)
+        if unchanged_urls:
+            logger.info(f"{len(unchanged_urls)} pages unchanged since the last crawl, {len(documents) - len(unchanged_urls)} to process")
         
-        # Step 3: Create embeddings
-        logger.info("Creating embeddings...")
-        texts = [chunk['content'] for chunk in chunks]
-        embeddings = embedding_service.create_embeddings(texts)
-        logger.info(f"Created {len(embeddings)} embeddings")
+        def ensure_collection(vector_size: int):
+            nonlocal collection_exists
+            if not collection_exists:
+                logger.info(f"Creating {settings.VECTOR_BACKEND} collection...")
+                vector_store.create_collection(vector_size=vector_size)
+                collection_exists = True
         
-        # Step 4: Create Qdrant collection
-        logger.info("Creating Qdrant collection...")
-        qdrant_service.create_collection(vector_size=len(embeddings[0]))
+        # Steps 4-6: Chunk, embed new and changed chunks, upload (ids are deterministic, so updates overwrite in place)
+        checkpoint.start()
+        pipeline = IngestPipeline(
+            embed_fn=embedding_service.acreate_embeddings,
+            upsert_fn=vector_store.aupsert_documents,
+            ensure_collection=ensure_collection,
+            checkpoint=checkpoint,
+            batch_size=settings.INGEST_BATCH_SIZE,
+            queue_size=settings.INGEST_QUEUE_SIZE
+        )
+        logger.info(f"Streaming chunks to the {settings.VECTOR_BACKEND} vector store...")
+        try:
+            result = asyncio.run(pipeline.run(
+                corpus_chunks(changed_documents),
+                stored_hashes,
+                unchanged_urls=unchanged_urls
+            ))
+        finally:
+            # The local index buffers upserts; keep what an interrupted run already embedded
+            vector_store.flush()
+        if deduplicator is not None:
+            logger.info(deduplicator.report())
+        deleted_ids = result.pop('deleted_ids')
+        counts = result
+        logger.info(
+            f"Chunks: {counts['added']} added, {counts['updated']} updated, "
+            f"{counts['deleted']} deleted, {counts['unchanged']} unchanged"
+        )
         
-        # Step 5: Upload to Qdrant
-        logger.info("Uploading to Qdrant...")
-        qdrant_service.upsert_documents(chunks, embeddings)
+        # Step 7: Remove chunks that no longer exist
+        if deleted_ids:
+            logger.info(f"Deleting {len(deleted_ids)} stale chunks...")
+            checkpoint.mark_changed()
+            vector_store.delete_points(deleted_ids)
         
-        logger.info("Data ingestion completed successfully!")
+        # Includes batches committed by an interrupted run this one resumed
+        corpus_changed = checkpoint.corpus_changed
         
+        # Step 8: Precompute reranker tokenization for every chunk
+        token_cache = RerankTokenCache(settings.RERANK_TOKEN_CACHE_DIR, settings.RERANK_MODEL)
+        if settings.USE_RERANKER and (corpus_changed or not os.path.exists(token_cache.path)):
+            logger.info("Precomputing reranker tokenization...")
+            build_rerank_token_cache(corpus_chunks(documents))
+        
+        # Step 9: Build the BM25 index used by hybrid retrieval (HYBRID_SEARCH_ENABLED)
+        if corpus_changed or not os.path.exists(settings.LEXICAL_INDEX_PATH):
+            logger.info("Building lexical index...")
+            lexical_index.build(corpus_chunks(documents))
+        
+        if corpus_changed:
+            # Invalidate caches built against the previous content
+            bump_corpus_version()
+            logger.info("Data ingestion completed successfully!")
+        else:
+            logger.info("Data ingestion completed: content unchanged, nothing to update")
+        
+        checkpoint.clear()
+        return counts
+    
     except Exception as e:
         logger.error(f"Error during data ingestion: {e}")
         raise
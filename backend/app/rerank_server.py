@@ -0,0 +1,209 @@
+"""
+Rerank worker pool: a few processes that each load the cross-encoder once
+
+API processes connect over a local multiprocessing connection (RERANK_WORKER_ADDRESS)
+and send padded batches. Torch inference then no longer competes with uvicorn for
+the GIL, and the number of API workers no longer decides how many model copies
+are kept in memory.
+
+The connection unpickles what clients send, so the pool refuses to start without
+a private RERANK_WORKER_AUTHKEY and binds to 127.0.0.1 unless given --address;
+never expose the port to untrusted networks.
+
+Usage (from the backend directory):
+    python -m app.rerank_server [--workers 2] [--torch-threads 2]
+"""
+import argparse
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from multiprocessing.connection import Listener
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.rerank_backends import load_rerank_backend, parse_worker_address, require_worker_authkey
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Model loaded once per worker process by _init_worker
+_backend = None
+_load_error: Optional[str] = None
+
+
+def _init_worker(model_name: str, backend: str, cache_dir: str, torch_threads: int):
+    """Pool initializer: cap torch threads, then load the model"""
+    global _backend, _load_error
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    try:
+        _backend = load_rerank_backend(backend, model_name, max_length=512, cache_dir=cache_dir)
+    except Exception as e:
+        # Raising here would make the pool respawn the worker forever; report it instead
+        _load_error = f"{type(e).__name__}: {e}"
+
+
+def _backend_name() -> str:
+    if _backend is None:
+        raise RuntimeError(f"Rerank worker failed to load the model: {_load_error}")
+    return _backend.name
+
+
+def _predict_logits(features: Dict[str, np.ndarray]) -> np.ndarray:
+    return _backend.predict_logits(features)
+
+
+class RerankWorkerPool:
+    """Process pool running reranker forward passes, with counters for monitoring"""
+    
+    def __init__(self, workers: int, torch_threads: int, load_timeout: float):
+        """
+        Raises:
+            RuntimeError: A worker could not load the model within load_timeout seconds
+        """
+        self.workers = workers
+        self.torch_threads = torch_threads
+        # spawn: torch and tokenizers are not fork-safe once initialized
+        context = multiprocessing.get_context("spawn")
+        self.pool = context.Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(settings.RERANK_MODEL, settings.RERANK_BACKEND, settings.RERANK_ONNX_CACHE_DIR, torch_threads)
+        )
+        # Blocks until a worker has loaded the model
+        try:
+            self.backend_name = self.pool.apply_async(_backend_name).get(timeout=load_timeout)
+        except multiprocessing.TimeoutError:
+            self.close()
+            raise RuntimeError(f"Rerank workers did not load the model within {load_timeout:.0f}s")
+        except Exception:
+            self.close()
+            raise
+        
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.processed = 0
+        self.errors = 0
+        self.started_at = time.time()
+    
+    def predict(self, batches: List[Dict[str, np.ndarray]]) -> np.ndarray:
+        """
+        Run padded batches across the worker processes
+        
+        Args:
+            batches: Padded model inputs (RerankBackend.pad)
+        
+        Returns:
+            Raw logits for all pairs, in batch order
+        """
+        with self.lock:
+            self.pending += len(batches)
+        try:
+            logits = self.pool.map(_predict_logits, batches, chunksize=1)
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                self.pending -= len(batches)
+        
+        with self.lock:
+            self.processed += len(batches)
+        return np.concatenate(logits)
+    
+    def health(self) -> Dict[str, any]:
+        with self.lock:
+            return {
+                "model": settings.RERANK_MODEL,
+                "backend": self.backend_name,
+                "workers": self.workers,
+                "torch_threads": self.torch_threads,
+                "queue_depth": self.pending,
+                "batches_processed": self.processed,
+                "errors": self.errors,
+                "uptime_seconds": round(time.time() - self.started_at, 1)
+            }
+    
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+def handle_connection(conn, pool: RerankWorkerPool):
+    """Serve requests from one API-side connection until it closes"""
+    with conn:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, ConnectionError):
+                return
+            
+            op = message.get('op')
+            try:
+                if op == 'predict':
+                    reply = {'ok': True, 'logits': pool.predict(message['batches'])}
+                elif op == 'health':
+                    reply = {'ok': True, **pool.health()}
+                else:
+                    reply = {'ok': False, 'error': f"Unknown op '{op}'"}
+            except Exception as e:
+                logger.error(f"Rerank request failed: {e}")
+                reply = {'ok': False, 'error': str(e)}
+            
+            try:
+                conn.send(reply)
+            except (EOFError, ConnectionError):
+                return
+
+
+def serve(address: str, authkey: Optional[str], workers: int, torch_threads: int, load_timeout: float):
+    """Start the worker processes and accept API connections until interrupted"""
+    key = require_worker_authkey(authkey)
+    logger.info(f"Starting {workers} rerank workers ({settings.RERANK_MODEL}, {torch_threads} torch threads each)...")
+    pool = RerankWorkerPool(workers, torch_threads, load_timeout)
+    listener = Listener(parse_worker_address(address), authkey=key)
+    logger.info(f"Rerank worker pool ready on {address} (backend: {pool.backend_name})")
+    
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except multiprocessing.AuthenticationError:
+                logger.warning("Rejected a connection with the wrong RERANK_WORKER_AUTHKEY")
+                continue
+            threading.Thread(target=handle_connection, args=(conn, pool), daemon=True).start()
+    except KeyboardInterrupt:
+        logger.info("Shutting down rerank worker pool...")
+    finally:
+        listener.close()
+        pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=settings.RERANK_WORKER_ADDRESS or "127.0.0.1:6390")
+    parser.add_argument("--workers", type=int, default=settings.RERANK_WORKERS)
+    parser.add_argument("--torch-threads", type=int, default=settings.RERANK_WORKER_TORCH_THREADS)
+    parser.add_argument("--load-timeout", type=float, default=settings.RERANK_WORKER_LOAD_TIMEOUT)
+    args = parser.parse_args()
+    
+    try:
+        require_worker_authkey(settings.RERANK_WORKER_AUTHKEY)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        serve(args.address, settings.RERANK_WORKER_AUTHKEY, args.workers, args.torch_threads, args.load_timeout)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
@@ -0,0 +1,162 @@
+"""
+Semantic response cache
+Reuses answers for queries whose embeddings are close to an earlier query
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.corpus import get_corpus_version
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """Answer cache matched by cosine distance between query embeddings"""
+    
+    def __init__(
+        self,
+        max_distance: float = 0.03,
+        max_size: int = 512,
+        ttl: Optional[float] = None
+    ):
+        """
+        Args:
+            max_distance: Maximum cosine distance (1 - similarity) for a hit
+            max_size: Maximum number of cached answers (LRU eviction)
+            ttl: Entry lifetime in seconds (None = never expire)
+        """
+        self.max_distance = max_distance
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self.corpus_version = get_corpus_version()
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        
+        # Stacked normalized embeddings, rebuilt lazily after changes
+        self._matrix = None
+        self._matrix_ids: List[int] = []
+    
+    @staticmethod
+    def normalize(embedding: List[float]) -> np.ndarray:
+        """Unit-normalize an embedding so dot products are cosine similarities"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _check_corpus_version(self):
+        """Drop every entry if the corpus was re-ingested (lock held)"""
+        version = get_corpus_version()
+        if version != self.corpus_version:
+            if self.entries:
+                logger.info(f"Corpus version changed, invalidating {len(self.entries)} cached answers")
+                self.invalidations += 1
+            self.entries.clear()
+            self._matrix = None
+            self.corpus_version = version
+    
+    def lookup(self, embedding: List[float]) -> Optional[Dict]:
+        """
+        Find a cached answer for a query embedding
+        
+        Args:
+            embedding: Query embedding
+            
+        Returns:
+            Dict with 'answer', 'sources' and 'distance', or None on a miss
+        """
+        with self.lock:
+            self._check_corpus_version()
+            
+            if not self.entries:
+                self.misses += 1
+                return None
+            
+            if self._matrix is None:
+                self._matrix_ids = list(self.entries.keys())
+                self._matrix = np.stack([self.entries[i]['embedding'] for i in self._matrix_ids])
+            
+            similarities = self._matrix @ self.normalize(embedding)
+            best = int(np.argmax(similarities))
+            distance = 1.0 - float(similarities[best])
+            entry_id = self._matrix_ids[best]
+            entry = self.entries[entry_id]
+            
+            if self.ttl is not None and time.time() - entry['created_at'] > self.ttl:
+                self._remove(entry_id)
+                self.misses += 1
+                return None
+            
+            if distance > self.max_distance:
+                self.misses += 1
+                return None
+            
+            self.entries.move_to_end(entry_id)
+            self.hits += 1
+            logger.info(f"Semantic cache hit (cosine distance {distance:.4f})")
+            return {
+                'answer': entry['answer'],
+                'sources': list(entry['sources']),
+                'distance': distance
+            }
+    
+    def store(self, embedding: List[float], answer: str, sources: List[str]):
+        """
+        Cache an answer for a query embedding
+        
+        Args:
+            embedding: Query embedding
+            answer: Generated answer
+            sources: Source URLs used for the answer
+        """
+        if self.max_size <= 0:
+            return
+        
+        with self.lock:
+            self._check_corpus_version()
+            
+            self.entries[self.next_id] = {
+                'embedding': self.normalize(embedding),
+                'answer': answer,
+                'sources': list(sources),
+                'corpus_version': self.corpus_version,
+                'created_at': time.time()
+            }
+            self.next_id += 1
+            self._matrix = None
+            
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def _remove(self, entry_id: int):
+        """Remove a single entry (lock held)"""
+        self.entries.pop(entry_id, None)
+        self._matrix = None
+    
+    def clear(self):
+        """Drop all cached answers"""
+        with self.lock:
+            self.entries.clear()
+            self._matrix = None
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "corpus_version": self.corpus_version
+            }
@@ -0,0 +1,95 @@
+"""
+Per-URL crawl state for incremental re-crawls
+Records each page's validators (ETag, Last-Modified), content hash,
+outgoing links and fetch time in a local SQLite file, so a refresh crawl
+can revalidate pages with conditional requests
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlStateStore:
+    """URL → crawl state store backed by SQLite"""
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite file
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "content_hash TEXT, "
+            "links TEXT NOT NULL DEFAULT '[]', "
+            "fetched_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        logger.info(f"Opened crawl state store: {path}")
+    
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Look up a page's state
+        
+        Returns:
+            Dict with 'etag', 'last_modified', 'content_hash' (None if the page
+            yielded no document), 'links' and 'fetched_at', or None if never crawled
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, links, fetched_at FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content_hash, links, fetched_at = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': content_hash,
+            'links': json.loads(links),
+            'fetched_at': fetched_at
+        }
+    
+    def put(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_hash: Optional[str],
+        links: List[str]
+    ):
+        """Record a page fetched with a full response"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, links, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, json.dumps(links), time.time())
+            )
+            self.conn.commit()
+    
+    def touch(self, url: str):
+        """Record a successful revalidation (304) without changing the state"""
+        with self.lock:
+            self.conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
@@ -0,0 +1,224 @@
+"""
+Corpus deduplication between scraping and chunking
+- Boilerplate: word shingles are counted across pages; a passage made of
+  shingles found on many pages (CTAs, testimonials, service blurbs) is kept
+  on one canonical page, the one with the shortest URL, and stripped from
+  the others
+- Near-duplicate chunks: each chunk gets a MinHash signature, and LSH
+  banding finds earlier chunks it nearly matches; those chunks are dropped
+
+Kept chunks are renumbered per page, so chunk indexes stay contiguous.
+"""
+import logging
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# MinHash permutations h(x) = (a * x + b) mod p, truncated to 32 bits
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def lsh_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Pick (bands, rows per band) whose LSH S-curve turns at the similarity threshold
+    
+    Two signatures sharing any band are candidates; the probability rises
+    steeply around (1 / bands) ** (1 / rows).
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if abs((1 / bands) ** (1 / rows) - threshold) < abs((1 / best[0]) ** (1 / best[1]) - threshold):
+            best = (bands, rows)
+    return best
+
+
+class CorpusDeduplicator:
+    """Strips shared boilerplate from pages and drops near-duplicate chunks"""
+    
+    def __init__(
+        self,
+        shingle_words: int = 5,
+        boilerplate_min_pages: int = 3,
+        min_block_words: int = 20,
+        near_duplicate_threshold: float = 0.8,
+        num_perm: int = 128,
+        count_tokens: Optional[Callable[[str], int]] = None
+    ):
+        """
+        Args:
+            shingle_words: Words per shingle
+            boilerplate_min_pages: A shingle on at least this many pages is boilerplate
+            min_block_words: Shorter runs of boilerplate shingles are left in place
+            near_duplicate_threshold: Estimated Jaccard similarity at which a chunk is dropped
+            num_perm: MinHash signature length
+            count_tokens: Token counter for the savings report (defaults to words)
+        """
+        self.shingle_words = shingle_words
+        self.boilerplate_min_pages = boilerplate_min_pages
+        self.min_block_words = min_block_words
+        self.threshold = near_duplicate_threshold
+        self.num_perm = num_perm
+        self.count_tokens = count_tokens or (lambda text: len(text.split()))
+        self.bands, self.rows = lsh_bands(near_duplicate_threshold, num_perm)
+        
+        generator = np.random.RandomState(1)
+        self.perm_a = generator.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.perm_b = generator.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        
+        # Shingle hash -> [pages containing it, (len(url), url) of the canonical page]
+        self.shingles: Dict[int, list] = {}
+        self.pages = 0
+        self.stats: Dict[str, int] = {}
+        self._reset_stats()
+    
+    def _reset_stats(self):
+        self.stats = {
+            'pages': 0, 'stripped_pages': 0, 'boilerplate_blocks': 0, 'boilerplate_words': 0,
+            'boilerplate_tokens': 0, 'chunks_after': 0, 'near_duplicates': 0,
+            'near_duplicate_tokens': 0, 'tokens_after': 0
+        }
+    
+    def _shingle_hashes(self, words: List[str]) -> List[int]:
+        """Hash of every shingle_words-word window, in order"""
+        lowered = [word.lower() for word in words]
+        width = min(self.shingle_words, len(lowered))
+        return [hash(tuple(lowered[i:i + width])) for i in range(len(lowered) - width + 1)]
+    
+    def fit(self, documents: Iterable[Dict[str, str]]):
+        """
+        Count on how many pages each shingle appears (one pass, one page in memory at a time)
+        
+        Args:
+            documents: Documents with 'url' and 'content'
+        """
+        self.shingles, self.pages = {}, 0
+        for doc in documents:
+            self.pages += 1
+            owner = (len(doc['url']), doc['url'])
+            for shingle in set(self._shingle_hashes(doc['content'].split())):
+                entry = self.shingles.get(shingle)
+                if entry is None:
+                    self.shingles[shingle] = [1, owner]
+                else:
+                    entry[0] += 1
+                    entry[1] = min(entry[1], owner)
+        
+        boilerplate = sum(1 for count, _ in self.shingles.values() if count >= self.boilerplate_min_pages)
+        logger.info(
+            f"Dedup: {len(self.shingles)} distinct shingles across {self.pages} pages, "
+            f"{boilerplate} shared by at least {self.boilerplate_min_pages} pages"
+        )
+    
+    def strip_boilerplate(self, doc: Dict[str, str]) -> Dict[str, str]:
+        """
+        Remove passages shared by many pages, unless this page is their canonical copy
+        
+        Returns:
+            The document with its content stripped (the same dict if nothing was removed)
+        """
+        words = doc['content'].split()
+        owners = []
+        for shingle in self._shingle_hashes(words):
+            entry = self.shingles.get(shingle)
+            owners.append(entry[1][1] if entry and entry[0] >= self.boilerplate_min_pages else None)
+        
+        # Runs of words covered by boilerplate shingles, as [start, end) word ranges
+        width = min(self.shingle_words, len(words))
+        runs: List[List[int]] = []
+        for i, owner in enumerate(owners):
+            if owner is None:
+                continue
+            if runs and i <= runs[-1][1]:
+                runs[-1][1] = i + width
+            else:
+                runs.append([i, i + width])
+        
+        # A run belongs to the canonical page of its first shingle
+        remove = [False] * len(words)
+        for start, end in runs:
+            if end - start >= self.min_block_words and owners[start] != doc['url']:
+                remove[start:end] = [True] * (end - start)
+                self.stats['boilerplate_blocks'] += 1
+                self.stats['boilerplate_words'] += end - start
+                self.stats['boilerplate_tokens'] += self.count_tokens(' '.join(words[start:end]))
+        
+        if not any(remove):
+            return doc
+        self.stats['stripped_pages'] += 1
+        return {**doc, 'content': ' '.join(word for word, removed in zip(words, remove) if not removed)}
+    
+    def _signature(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        width = min(self.shingle_words, len(words)) or 1
+        shingles = {' '.join(words[i:i + width]) for i in range(max(len(words) - width + 1, 1))}
+        hashes = np.array([zlib.crc32(shingle.encode('utf-8')) for shingle in shingles], dtype=np.uint64)
+        # uint64 wraparound in a * x is intended; the result is still a well-mixed permutation
+        permuted = (np.outer(hashes, self.perm_a) + self.perm_b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+    
+    def iter_chunks(
+        self,
+        documents: Iterable[Dict[str, str]],
+        chunk_fn: Callable[[Dict[str, str]], Iterable[Dict]]
+    ) -> Iterator[Dict]:
+        """
+        Strip boilerplate, chunk, and drop chunks nearly matching an earlier one
+        
+        Every call starts from an empty LSH index, so passes over the same
+        documents in the same order yield the same chunks. Call fit first.
+        
+        Args:
+            documents: Stream of documents
+            chunk_fn: Splits one document into chunks (EmbeddingService.chunk_document)
+        
+        Yields:
+            Kept chunks, with chunk_index renumbered per page
+        """
+        self._reset_stats()
+        buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        signatures: List[np.ndarray] = []
+        
+        for doc in documents:
+            self.stats['pages'] += 1
+            chunk_index = 0
+            for chunk in chunk_fn(self.strip_boilerplate(doc)):
+                signature = self._signature(chunk['content'])
+                keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+                candidates = {kept for band, key in enumerate(keys) for kept in buckets[band].get(key, ())}
+                if any(np.mean(signatures[kept] == signature) >= self.threshold for kept in candidates):
+                    self.stats['near_duplicates'] += 1
+                    self.stats['near_duplicate_tokens'] += self.count_tokens(chunk['content'])
+                    continue
+                
+                for band, key in enumerate(keys):
+                    buckets[band].setdefault(key, []).append(len(signatures))
+                signatures.append(signature)
+                
+                chunk['metadata']['chunk_index'] = chunk_index
+                chunk_index += 1
+                self.stats['chunks_after'] += 1
+                self.stats['tokens_after'] += self.count_tokens(chunk['content'])
+                yield chunk
+    
+    def report(self) -> str:
+        """
+        Savings of the last iter_chunks pass
+        
+        Pages are chunked only once, so stripped passages are counted as text
+        rather than as the chunks they would have filled (chunk overlap aside).
+        """
+        stats = self.stats
+        tokens_saved = stats['boilerplate_tokens'] + stats['near_duplicate_tokens']
+        tokens_before = stats['tokens_after'] + tokens_saved
+        share = tokens_saved / tokens_before if tokens_before else 0.0
+        return (
+            f"Dedup: stripped {stats['boilerplate_blocks']} boilerplate passages ({stats['boilerplate_words']} words) "
+            f"from {stats['stripped_pages']}/{stats['pages']} pages, dropped {stats['near_duplicates']} near-duplicate chunks; "
+            f"{stats['chunks_after']} chunks, {stats['tokens_after']} embedding tokens instead of {tokens_before} "
+            f"({tokens_saved} saved, {share:.0%})"
+        )
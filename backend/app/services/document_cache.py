@@ -0,0 +1,335 @@
+"""
+Streaming on-disk cache of scraped documents
+Documents are stored one JSON line per record, each record optionally
+compressed on its own (a gzip member or zstd frame), so the file is still
+a valid .jsonl / .jsonl.gz / .jsonl.zst stream. A sidecar index maps each
+URL to the byte offset and length of its latest record: documents are
+read one at a time, and a changed page is rewritten by appending a record
+instead of rewriting the file. Dead records are compacted away once they
+make up most of the file. documents() is a list-compatible view for callers
+that index or slice the documents.
+"""
+import gzip
+import json
+import logging
+import os
+import zlib
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# Compact when dead records exceed this share of the file
+COMPACT_RATIO = 0.5
+
+READ_BLOCK = 1 << 16
+
+
+def _zstd():
+    import zstandard
+    return zstandard
+
+
+class DocumentCache:
+    """URL → document store over an append-only JSONL file"""
+    
+    def __init__(self, base_path: str, compression: str = "none", base_url: str = ""):
+        """
+        Args:
+            base_path: Path without extension, e.g. data/scraped_content_www_zibtek_com;
+                the data file is base_path + .jsonl (+ .gz / .zst), the index base_path + .index.json
+            compression: none, gzip or zstd (zstd needs: pip install zstandard; falls back to gzip)
+            base_url: Site the documents come from, recorded in the index
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown SCRAPER_CACHE_COMPRESSION '{compression}', expected one of {tuple(COMPRESSIONS)}")
+        if compression == "zstd":
+            try:
+                _zstd()
+            except ImportError:
+                logger.warning("zstandard not installed. Run: pip install zstandard")
+                logger.info("Falling back to gzip for the document cache")
+                compression = "gzip"
+        
+        self.base_path = base_path
+        self.compression = compression
+        self.path = f"{base_path}.jsonl{COMPRESSIONS[compression]}"
+        self.index_path = f"{base_path}.index.json"
+        self.base_url = base_url
+        self.records: Dict[str, Tuple[int, int]] = {}
+        self.dead_bytes = 0
+        self.scraped_at: Optional[str] = None
+        self.dirty = False
+        # Bumped whenever record offsets change, so document views re-read them
+        self.generation = 0
+        
+        os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            self._load_index()
+        else:
+            self._migrate()
+    
+    def _encode(self, record: Dict) -> bytes:
+        line = json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n"
+        if self.compression == "gzip":
+            return gzip.compress(line, mtime=0)
+        if self.compression == "zstd":
+            return _zstd().ZstdCompressor().compress(line)
+        return line
+    
+    def _decode(self, blob: bytes) -> Dict:
+        if self.compression == "gzip":
+            blob = gzip.decompress(blob)
+        elif self.compression == "zstd":
+            blob = _zstd().ZstdDecompressor().decompressobj().decompress(blob)
+        return json.loads(blob)
+    
+    def _scan(self) -> Iterator[Tuple[int, int, Dict]]:
+        """Read every record in file order as (offset, length, record); stops at a torn tail"""
+        with open(self.path, 'rb') as f:
+            if self.compression == "none":
+                offset = 0
+                for line in iter(f.readline, b""):
+                    if not line.endswith(b"\n"):
+                        return
+                    yield offset, len(line), json.loads(line)
+                    offset += len(line)
+                return
+            
+            # Compressed records are back-to-back members; the decompressor reports where each ends
+            offset, buffer = 0, b""
+            while True:
+                if not buffer:
+                    buffer = f.read(READ_BLOCK)
+                    if not buffer:
+                        return
+                if self.compression == "gzip":
+                    decompressor = zlib.decompressobj(wbits=31)
+                else:
+                    decompressor = _zstd().ZstdDecompressor().decompressobj()
+                start, parts = offset, []
+                while not decompressor.eof:
+                    if not buffer:
+                        buffer = f.read(READ_BLOCK)
+                        if not buffer:
+                            return
+                    try:
+                        parts.append(decompressor.decompress(buffer))
+                    except Exception:
+                        return  # corrupt member, treated like a torn tail
+                    used = len(buffer) - len(decompressor.unused_data)
+                    offset += used
+                    buffer = buffer[used:]
+                yield start, offset - start, json.loads(b"".join(parts))
+    
+    def _load_index(self):
+        """Load the sidecar index, rebuilding it if it does not match the data file"""
+        size = os.path.getsize(self.path)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('data_size') == size and index.get('compression') == self.compression:
+                self.records = {url: tuple(entry) for url, entry in index['records'].items()}
+                self.dead_bytes = index.get('dead_bytes', 0)
+                self.scraped_at = index.get('scraped_at')
+                self.base_url = self.base_url or index.get('base_url', "")
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        self._rebuild_index()
+    
+    def _rebuild_index(self):
+        """Recover the index from the records themselves (e.g. after an interrupted crawl)"""
+        self.records, live_bytes, end = {}, 0, 0
+        for offset, length, record in self._scan():
+            url = record['url']
+            if url in self.records:
+                live_bytes -= self.records.pop(url)[1]
+            if not record.get('deleted'):
+                self.records[url] = (offset, length)
+                live_bytes += length
+            end = offset + length
+        
+        if end < os.path.getsize(self.path):
+            # Drop a record torn by a crash mid-write
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+        self.dead_bytes = end - live_bytes
+        self.dirty = True
+        self.flush()
+        logger.info(f"Rebuilt document cache index: {len(self.records)} documents in {self.path}")
+    
+    def flush(self):
+        """Persist the index after writes"""
+        if not self.dirty:
+            return
+        index = {
+            'base_url': self.base_url,
+            'scraped_at': self.scraped_at,
+            'compression': self.compression,
+            'data_size': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'dead_bytes': self.dead_bytes,
+            'records': self.records
+        }
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def __contains__(self, url: str) -> bool:
+        return url in self.records
+    
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        """Stream live documents in file order, one in memory at a time"""
+        return self._read_entries(sorted(self.records.values()))
+    
+    def _read_entries(self, entries: List[Tuple[int, int]]) -> Iterator[Dict[str, str]]:
+        if not entries:
+            return
+        with open(self.path, 'rb') as f:
+            for offset, length in entries:
+                f.seek(offset)
+                yield self._decode(f.read(length))
+    
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        """Read one document by URL"""
+        entry = self.records.get(url)
+        if entry is None:
+            return None
+        return next(self._read_entries([entry]))
+    
+    def documents(self) -> "DocumentSequence":
+        """Live documents as a read-only sequence, in file order"""
+        return DocumentSequence(self)
+    
+    def _append(self, records: Iterable[Dict]):
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            for record in records:
+                blob = self._encode(record)
+                f.write(blob)
+                url = record['url']
+                if url in self.records:
+                    self.dead_bytes += self.records.pop(url)[1]
+                if record.get('deleted'):
+                    self.dead_bytes += len(blob)
+                else:
+                    self.records[url] = (offset, len(blob))
+                offset += len(blob)
+        self.scraped_at = datetime.now().isoformat()
+        self.dirty = True
+        self.generation += 1
+    
+    def put(self, document: Dict[str, str]):
+        """Add or replace one document (appends a record; call flush to persist the index)"""
+        self._append([document])
+    
+    def delete(self, urls: Iterable[str]):
+        """Remove documents (appends tombstones so an index rebuild honors them)"""
+        self._append([{'url': url, 'deleted': True} for url in urls if url in self.records])
+    
+    def retain(self, urls: Iterable[str]):
+        """Delete every document whose URL is not in urls"""
+        keep = set(urls)
+        self.delete([url for url in list(self.records) if url not in keep])
+    
+    def replace_all(self, documents: Iterable[Dict[str, str]]):
+        """Write a fresh file containing exactly these documents"""
+        tmp_path = f"{self.path}.tmp"
+        records: Dict[str, Tuple[int, int]] = {}
+        offset = dead = 0
+        with open(tmp_path, 'wb') as f:
+            for document in documents:
+                blob = self._encode(document)
+                f.write(blob)
+                if document['url'] in records:
+                    dead += records[document['url']][1]
+                records[document['url']] = (offset, len(blob))
+                offset += len(blob)
+        os.replace(tmp_path, self.path)
+        self.records, self.dead_bytes = records, dead
+        self.scraped_at = datetime.now().isoformat()
+        self.dirty = True
+        self.generation += 1
+        self.flush()
+    
+    def compact(self, force: bool = False):
+        """Rewrite the file without dead records once they dominate it"""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if not size or (not force and self.dead_bytes <= size * COMPACT_RATIO):
+            return
+        scraped_at = self.scraped_at
+        self.replace_all(iter(self))
+        self.scraped_at = scraped_at
+        self.dirty = True
+        self.flush()
+        logger.info(f"Compacted document cache {self.path}: {size} -> {os.path.getsize(self.path)} bytes")
+    
+    def _legacy_sources(self) -> List[Tuple[str, Optional[str]]]:
+        """(path, compression) of caches this one can be migrated from; None = legacy JSON document"""
+        sources = [(f"{self.base_path}.json", None)]
+        for compression, suffix in COMPRESSIONS.items():
+            if compression != self.compression:
+                sources.append((f"{self.base_path}.jsonl{suffix}", compression))
+        return sources
+    
+    def _migrate(self):
+        """Import a legacy scraped_content_*.json file or a cache written with another compression"""
+        for path, compression in self._legacy_sources():
+            if not os.path.exists(path):
+                continue
+            try:
+                if compression is None:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        legacy = json.load(f)
+                    documents = legacy.get("documents", [])
+                    self.base_url = self.base_url or legacy.get("base_url", "")
+                else:
+                    documents = DocumentCache(self.base_path, compression=compression, base_url=self.base_url)
+                self.replace_all(documents)
+                if compression is not None:
+                    # Otherwise switching compression back later would pick up this stale copy
+                    os.remove(path)
+                logger.info(f"Migrated {len(self.records)} documents from {path} to {self.path}")
+                return
+            except Exception as e:
+                logger.error(f"Error migrating document cache {path}: {e}")
+
+
+class DocumentSequence(Sequence):
+    """
+    List-compatible view of a DocumentCache
+    
+    Supports len, indexing, slicing and iteration like the list of documents
+    it replaces, but reads each document from disk when it is accessed.
+    """
+    
+    def __init__(self, cache: DocumentCache):
+        self.cache = cache
+        self._entries: List[Tuple[int, int]] = []
+        self._generation = None
+    
+    def _current_entries(self) -> List[Tuple[int, int]]:
+        if self._generation != self.cache.generation:
+            self._entries = sorted(self.cache.records.values())
+            self._generation = self.cache.generation
+        return self._entries
+    
+    def __len__(self) -> int:
+        return len(self.cache)
+    
+    def __getitem__(self, index):
+        entries = self._current_entries()
+        if isinstance(index, slice):
+            return list(self.cache._read_entries(entries[index]))
+        return next(self.cache._read_entries([entries[index]]))
+    
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return self.cache._read_entries(self._current_entries())
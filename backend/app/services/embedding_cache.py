@@ -0,0 +1,168 @@
+"""
+Bounded cache for query embeddings
+In-memory LRU with TTL eviction, optionally backed by an on-disk tier
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.services.embedding_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """LRU/TTL cache keyed by normalized query text and embedding model"""
+    
+    def __init__(
+        self,
+        model: str,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        disk_path: Optional[str] = None
+    ):
+        """
+        Args:
+            model: Embedding model name, part of every key
+            max_size: Maximum number of in-memory entries (0 disables the memory tier)
+            ttl: Entry lifetime in seconds (None = never expire)
+            disk_path: SQLite file for the persistent tier (None = memory only)
+        """
+        self.model = model
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        self.disk = None
+        if disk_path:
+            try:
+                self.disk = EmbeddingStore(disk_path)
+            except Exception as e:
+                logger.error(f"Failed to open query embedding store {disk_path}: {e}")
+    
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize query text so trivially different spellings share an entry"""
+        return ' '.join(query.lower().split())
+    
+    def make_key(self, query: str) -> str:
+        """Build the cache key for a query"""
+        raw = f"{self.model}\x00{self.normalize(query)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def get(self, query: str) -> Optional[List[float]]:
+        """
+        Look up the embedding for a query
+        
+        Args:
+            query: Raw query text
+            
+        Returns:
+            Cached embedding, or None on a miss
+        """
+        key = self.make_key(query)
+        vector = self._memory_get(key)
+        if vector is None and self.disk is not None:
+            vector = self._disk_get(key)
+        if vector is None:
+            self._count_miss()
+        return vector
+    
+    async def aget(self, query: str) -> Optional[List[float]]:
+        """get for the event loop: the disk tier is read in the default executor"""
+        key = self.make_key(query)
+        vector = self._memory_get(key)
+        if vector is None and self.disk is not None:
+            vector = await asyncio.get_running_loop().run_in_executor(None, self._disk_get, key)
+        if vector is None:
+            self._count_miss()
+        return vector
+    
+    def put(self, query: str, vector: List[float]):
+        """Cache the embedding for a query in every enabled tier"""
+        key = self.make_key(query)
+        with self.lock:
+            self._store(key, vector, time.time())
+        if self.disk is not None:
+            self._disk_put(key, vector)
+    
+    async def aput(self, query: str, vector: List[float]):
+        """put for the event loop: the disk tier is written in the default executor"""
+        key = self.make_key(query)
+        with self.lock:
+            self._store(key, vector, time.time())
+        if self.disk is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._disk_put, key, vector)
+    
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            vector, created_at = entry
+            if self.ttl is None or time.time() - created_at <= self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return vector
+            del self.entries[key]
+            return None
+    
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        """Read the disk tier and promote a hit to memory, keeping its original age for the TTL"""
+        try:
+            entry = self.disk.get_entry(key, max_age=self.ttl)
+        except Exception as e:
+            logger.error(f"Error reading query embedding store: {e}")
+            return None
+        if entry is None:
+            return None
+        vector, created_at = entry
+        with self.lock:
+            self.disk_hits += 1
+            self._store(key, vector, created_at)
+        return vector
+    
+    def _disk_put(self, key: str, vector: List[float]):
+        try:
+            self.disk.put(key, vector)
+        except Exception as e:
+            logger.error(f"Error writing query embedding store: {e}")
+    
+    def _count_miss(self):
+        with self.lock:
+            self.misses += 1
+    
+    def _store(self, key: str, vector: List[float], created_at: float):
+        """Insert into the memory tier and evict least recently used entries (lock held)"""
+        if self.max_size <= 0:
+            return
+        self.entries[key] = (vector, created_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all in-memory entries"""
+        with self.lock:
+            self.entries.clear()
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+            }
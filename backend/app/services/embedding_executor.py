@@ -0,0 +1,232 @@
+"""
+Concurrent, rate-limited embedding of document batches
+Texts are packed into token-budgeted batches that run concurrently under
+requests/tokens-per-minute limits, with jittered backoff on transient errors
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying: quota, network and server-side failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+def token_counter(model: str) -> Callable[[str], int]:
+    """Token count function for the embedding model (≈4 characters per token without tiktoken)"""
+    try:
+        import tiktoken
+        
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+        return lambda text: max(1, len(text) // 4)
+
+
+class RateLimiter:
+    """Token buckets for requests per minute and tokens per minute"""
+    
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        """
+        Args:
+            requests_per_minute: Request budget (0 = unlimited)
+            tokens_per_minute: Input token budget (0 = unlimited)
+        """
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.request_allowance = float(requests_per_minute)
+        self.token_allowance = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.lock: Optional[asyncio.Lock] = None
+        self.lock_loop = None
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        if self.rpm:
+            self.request_allowance = min(self.rpm, self.request_allowance + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self.token_allowance = min(self.tpm, self.token_allowance + elapsed * self.tpm / 60.0)
+    
+    async def acquire(self, tokens: int):
+        """Wait until one request carrying this many tokens fits both budgets"""
+        # A batch larger than the whole minute budget would never fit
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        
+        # One lock per event loop, since every ingestion run has its own
+        loop = asyncio.get_running_loop()
+        if self.lock_loop is not loop:
+            self.lock, self.lock_loop = asyncio.Lock(), loop
+        
+        # Holding the lock while sleeping keeps waiters first-come, first-served
+        async with self.lock:
+            while True:
+                self._refill()
+                waits = []
+                if self.rpm and self.request_allowance < 1:
+                    waits.append((1 - self.request_allowance) * 60.0 / self.rpm)
+                if self.tpm and self.token_allowance < tokens:
+                    waits.append((tokens - self.token_allowance) * 60.0 / self.tpm)
+                if not waits:
+                    break
+                await asyncio.sleep(max(waits))
+            
+            if self.rpm:
+                self.request_allowance -= 1
+            if self.tpm:
+                self.token_allowance -= tokens
+
+
+class EmbeddingExecutor:
+    """Runs embedding batches concurrently within the API quota"""
+    
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+        count_tokens: Callable[[str], int],
+        max_batch_tokens: int = 50000,
+        max_batch_size: int = 256,
+        concurrency: int = 4,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = 6,
+        retry_base_delay: float = 1.0,
+        retry_max_delay: float = 60.0
+    ):
+        """
+        Args:
+            embed_fn: Async function embedding one batch of texts
+            count_tokens: Token count of a text, used to size batches and for the limiter
+            max_batch_tokens: Input token budget per request
+            max_batch_size: Texts per request
+            concurrency: Requests in flight at once
+            limiter: Requests/tokens per minute limiter (None = unlimited)
+            max_retries: Retries per batch on transient errors before giving up
+            retry_base_delay: Backoff before the first retry, doubled on each attempt
+            retry_max_delay: Cap on a single backoff
+        """
+        self.embed_fn = embed_fn
+        self.count_tokens = count_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+    
+    def make_batches(self, texts: Sequence[str]) -> List[Tuple[int, List[str], int]]:
+        """
+        Pack texts, in order, into batches within the token and size budgets
+        
+        Returns:
+            List of (start offset, texts, token count) per batch
+        """
+        batches = []
+        start, batch, batch_tokens = 0, [], 0
+        
+        for i, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                batches.append((start, batch, batch_tokens))
+                start, batch, batch_tokens = i, [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        
+        if batch:
+            batches.append((start, batch, batch_tokens))
+        return batches
+    
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honoring Retry-After when the API sends one"""
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            if retry_after:
+                delay = max(delay, min(self.retry_max_delay, float(retry_after)))
+        except ValueError:
+            pass
+        return delay
+    
+    async def _embed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        """Embed one batch, retrying transient errors"""
+        attempt = 0
+        while True:
+            await self.limiter.acquire(tokens)
+            try:
+                return await self.embed_fn(texts)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                logger.warning(
+                    f"Embedding batch of {len(texts)} failed ({type(e).__name__}), "
+                    f"retry {attempt}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+    
+    async def embed(
+        self,
+        texts: Sequence[str],
+        on_batch: Optional[Callable[[List[str], List[List[float]]], None]] = None
+    ) -> List[List[float]]:
+        """
+        Embed texts concurrently
+        
+        Args:
+            texts: Texts to embed
+            on_batch: Called with each batch's texts and vectors as it completes,
+                e.g. to persist progress before the remaining batches finish
+        
+        Returns:
+            Embedding vectors, aligned with texts
+        """
+        if not texts:
+            return []
+        
+        batches = self.make_batches(texts)
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        
+        async def run(start: int, batch: List[str], tokens: int):
+            async with semaphore:
+                vectors = await self._embed_batch(batch, tokens)
+            results[start:start + len(batch)] = vectors
+            if on_batch is not None:
+                on_batch(batch, vectors)
+        
+        tasks = [asyncio.create_task(run(*batch)) for batch in batches]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            # Don't leave sibling batches spending quota after a permanent failure
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        
+        elapsed = time.perf_counter() - started
+        total_tokens = sum(tokens for _, _, tokens in batches)
+        logger.info(
+            f"Embedded {len(texts)} chunks ({total_tokens} tokens) in {len(batches)} batches "
+            f"over {elapsed:.1f}s: {len(texts) / max(elapsed, 1e-9):.1f} chunks/sec"
+        )
+        return results
@@ -0,0 +1,163 @@
+"""
+Persistent on-disk store for embedding vectors
+Vectors are kept as packed float32 blobs in a local SQLite file, optionally
+capped in size with least-recently-used entries pruned first
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """Key → embedding vector store backed by SQLite"""
+    
+    # SQLite limits the number of bound parameters per statement
+    QUERY_BATCH_SIZE = 500
+    
+    def __init__(self, path: str, max_entries: int = 0):
+        """
+        Args:
+            path: SQLite file
+            max_entries: Keep at most this many vectors, pruning least recently used (0 = no cap)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, "
+            "vector BLOB NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "last_access REAL NOT NULL DEFAULT 0)"
+        )
+        # Stores created before LRU pruning lack last_access
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(embeddings)")]
+        if "last_access" not in columns:
+            self.conn.execute("ALTER TABLE embeddings ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        self.conn.commit()
+        logger.info(f"Opened embedding store: {path}")
+    
+    @staticmethod
+    def pack(vector: List[float]) -> bytes:
+        """Serialize a vector to a compact float32 blob"""
+        return array('f', vector).tobytes()
+    
+    @staticmethod
+    def unpack(blob: bytes) -> List[float]:
+        """Deserialize a float32 blob back into a vector"""
+        vector = array('f')
+        vector.frombytes(blob)
+        return vector.tolist()
+    
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[List[float]]:
+        """
+        Look up a vector
+        
+        Args:
+            key: Cache key
+            max_age: Ignore entries older than this many seconds (None = no limit)
+            
+        Returns:
+            The stored vector, or None if missing or expired
+        """
+        return self.get_many([key], max_age=max_age).get(key)
+    
+    def get_entry(self, key: str, max_age: Optional[float] = None) -> Optional[Tuple[List[float], float]]:
+        """
+        Look up a vector and when it was stored, without marking it as recently used
+        
+        Returns:
+            (vector, created_at), or None if missing or expired
+        """
+        entry = self._select([key], max_age, touch=False).get(key)
+        if entry is None:
+            return None
+        return self.unpack(entry[0]), entry[1]
+    
+    def get_many(self, keys: List[str], max_age: Optional[float] = None) -> Dict[str, List[float]]:
+        """
+        Look up several vectors at once, marking them as recently used
+        
+        Args:
+            keys: Cache keys
+            max_age: Ignore entries older than this many seconds (None = no limit)
+            
+        Returns:
+            Dict of key -> vector for the keys that were found and not expired
+        """
+        found = self._select(keys, max_age, touch=True)
+        return {key: self.unpack(blob) for key, (blob, _) in found.items()}
+    
+    def _select(self, keys: List[str], max_age: Optional[float], touch: bool) -> Dict[str, Tuple[bytes, float]]:
+        """Key -> (blob, created_at) of the unexpired keys; touch updates last_access"""
+        now = time.time()
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), self.QUERY_BATCH_SIZE):
+                batch = keys[start:start + self.QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector, created_at FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob, created_at in rows:
+                    if max_age is None or now - created_at <= max_age:
+                        found[key] = (blob, created_at)
+            
+            if found and touch:
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self.conn.commit()
+        
+        return found
+    
+    def put(self, key: str, vector: List[float]):
+        """Store a vector, replacing any existing entry for the key"""
+        self.put_many([(key, vector)])
+    
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]):
+        """
+        Store several vectors in one transaction, then prune to the size cap
+        
+        Args:
+            items: (key, vector) pairs
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at, last_access) VALUES (?, ?, ?, ?)",
+                [(key, self.pack(vector), now, now) for key, vector in items]
+            )
+            self._prune()
+            self.conn.commit()
+    
+    def _prune(self):
+        """Drop least recently used entries beyond max_entries (lock held)"""
+        if not self.max_entries:
+            return
+        excess = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+            logger.info(f"Pruned {excess} least recently used embeddings from {self.path}")
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
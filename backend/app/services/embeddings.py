@@ -1,9 +1,13 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List
+import asyncio
 import logging
 
 from app.core.config import settings
+from app.services.embedding_executor import EmbeddingExecutor, RateLimiter, token_counter
+from app.services.embedding_store import EmbeddingStore
+from app.utils.corpus import content_hash
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +18,21 @@ class EmbeddingService:
     def __init__(self):
         self.embeddings = OpenAIEmbeddings(
             model=settings.OPENAI_EMBEDDING_MODEL,
-            openai_api_key=settings.OPENAI_API_KEY
+            openai_api_key=settings.OPENAI_API_KEY,
+            # Batching and retries are handled by the executor below
+            chunk_size=settings.EMBEDDING_BATCH_MAX_TEXTS,
+            max_retries=0
+        )
+        self.executor = EmbeddingExecutor(
+            embed_fn=self.embeddings.aembed_documents,
+            count_tokens=token_counter(settings.OPENAI_EMBEDDING_MODEL),
+            max_batch_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_TEXTS,
+            concurrency=settings.EMBEDDING_CONCURRENCY,
+            limiter=RateLimiter(settings.EMBEDDING_REQUESTS_PER_MINUTE, settings.EMBEDDING_TOKENS_PER_MINUTE),
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+            retry_base_delay=settings.EMBEDDING_RETRY_BASE_DELAY,
+            retry_max_delay=settings.EMBEDDING_RETRY_MAX_DELAY
         )
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=settings.CHUNK_SIZE,
@@ -22,6 +40,41 @@ class EmbeddingService:
             length_function=len,
             separators=["\n\n", "\n", ". ", " ", ""]
         )
+        # Content-addressed chunk embeddings, so unchanged text is never re-embedded
+        self.store = None
+        if settings.EMBEDDING_STORE_PATH:
+            try:
+                self.store = EmbeddingStore(
+                    settings.EMBEDDING_STORE_PATH,
+                    max_entries=settings.EMBEDDING_STORE_MAX_ENTRIES
+                )
+            except Exception as e:
+                logger.error(f"Failed to open embedding store {settings.EMBEDDING_STORE_PATH}: {e}")
+    
+    def chunk_document(self, doc: Dict[str, str]) -> Iterator[Dict[str, str]]:
+        """
+        Split one document into chunks
+        
+        Args:
+            doc: Document with 'content', 'url', and 'title'
+            
+        Yields:
+            Chunks with metadata
+        """
+        for i, chunk in enumerate(self.text_splitter.split_text(doc['content'])):
+            yield {
+                'content': chunk,
+                'metadata': {
+                    'url': doc['url'],
+                    'title': doc['title'],
+                    'chunk_index': i
+                }
+            }
+    
+    def iter_chunks(self, documents: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+        """Lazily chunk a stream of documents, one document in memory at a time"""
+        for doc in documents:
+            yield from self.chunk_document(doc)
     
     def chunk_documents(self, documents: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
@@ -33,39 +86,59 @@ class EmbeddingService:
         Returns:
             List of chunks with metadata
         """
-        chunks = []
-        
-        for doc in documents:
-            # Split the content into chunks
-            text_chunks = self.text_splitter.split_text(doc['content'])
-            
-            for i, chunk in enumerate(text_chunks):
-                chunks.append({
-                    'content': chunk,
-                    'metadata': {
-                        'url': doc['url'],
-                        'title': doc['title'],
-                        'chunk_index': i
-                    }
-                })
-        
+        chunks = list(self.iter_chunks(documents))
         logger.info(f"Created {len(chunks)} chunks from {len(documents)} documents")
         return chunks
     
+    def store_key(self, text: str) -> str:
+        """Embedding store key: model plus hash of the exact text"""
+        return f"{settings.OPENAI_EMBEDDING_MODEL}:{content_hash(text)}"
+    
     def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Blocking variant of acreate_embeddings"""
+        return asyncio.run(self.acreate_embeddings(texts))
+    
+    async def acreate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Create embeddings for a list of texts
         
+        Texts already in the embedding store are served from disk; only the
+        rest (deduplicated) are sent to the API, in concurrent rate-limited
+        batches. Each batch is stored as it completes, so an interrupted run
+        keeps its progress.
+        
         Args:
             texts: List of text strings
             
         Returns:
-            List of embedding vectors
+            List of embedding vectors, aligned with texts
         """
         try:
-            embeddings = self.embeddings.embed_documents(texts)
-            logger.info(f"Created {len(embeddings)} embeddings")
-            return embeddings
+            keys = [self.store_key(text) for text in texts]
+            cached = self.store.get_many(list(set(keys))) if self.store is not None else {}
+            
+            # One API input per distinct uncached text
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in cached and key not in missing:
+                    missing[key] = text
+            
+            if missing:
+                key_by_text = {text: key for key, text in missing.items()}
+                
+                def save_batch(batch: List[str], vectors: List[List[float]]):
+                    fresh = [(key_by_text[text], vector) for text, vector in zip(batch, vectors)]
+                    if self.store is not None:
+                        self.store.put_many(fresh)
+                    cached.update(fresh)
+                
+                await self.executor.embed(list(missing.values()), on_batch=save_batch)
+            
+            logger.info(
+                f"Created {len(texts)} embeddings "
+                f"({len(missing)} from the API, {len(texts) - len(missing)} reused from the embedding store)"
+            )
+            return [cached[key] for key in keys]
         except Exception as e:
             logger.error(f"Error creating embeddings: {e}")
             raise
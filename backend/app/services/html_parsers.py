@@ -0,0 +1,121 @@
+"""
+HTML parser backends for content extraction
+- html.parser: BeautifulSoup with Python's built-in parser (no extra dependencies)
+- lxml: lxml.html, a C parser (pip install lxml)
+- selectolax: selectolax's Lexbor engine, the fastest (pip install selectolax)
+
+Every backend drops script/style/nav/footer/header, takes the text of
+<main>, <article> or <body> (first found), and returns the page's hrefs
+collected before anything is removed. extract_html is a plain module-level
+function so it can run in a process pool.
+"""
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HTML_PARSERS = ("html.parser", "lxml", "selectolax")
+
+REMOVED_TAGS = ["script", "style", "nav", "footer", "header"]
+
+# (title or None, main text or None, hrefs)
+Extracted = Tuple[Optional[str], Optional[str], List[str]]
+
+
+def _extract_bs4(html: bytes) -> Extracted:
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html, 'html.parser')
+    hrefs = [link['href'] for link in soup.find_all('a', href=True)]
+    
+    for element in soup(REMOVED_TAGS):
+        element.decompose()
+    
+    title = soup.find('title')
+    main_content = soup.find('main') or soup.find('article') or soup.find('body')
+    text = main_content.get_text(separator=' ', strip=True) if main_content else None
+    return (title.get_text() if title else None), text, hrefs
+
+
+def _extract_lxml(html: bytes) -> Extracted:
+    from lxml import etree
+    from lxml import html as lxml_html
+    
+    try:
+        tree = lxml_html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        # Empty or unparseable document
+        return None, None, []
+    hrefs = [link.get('href') for link in tree.iter('a') if link.get('href') is not None]
+    
+    # drop_tree keeps the tail text, like decompose in BeautifulSoup
+    for element in tree.xpath('//script|//style|//nav|//footer|//header|//comment()'):
+        element.drop_tree()
+    
+    title = tree.find('.//title')
+    main_content = next(
+        (element for element in (tree.find('.//main'), tree.find('.//article'), tree.find('.//body'))
+         if element is not None),
+        None
+    )
+    text = None
+    if main_content is not None:
+        text = ' '.join(part.strip() for part in main_content.itertext() if part.strip())
+    return (title.text_content() if title is not None else None), text, hrefs
+
+
+def _extract_selectolax(html: bytes) -> Extracted:
+    from selectolax.lexbor import LexborHTMLParser
+    
+    tree = LexborHTMLParser(html)
+    hrefs = [node.attributes['href'] for node in tree.css('a[href]') if node.attributes.get('href') is not None]
+    
+    tree.strip_tags(REMOVED_TAGS)
+    
+    title = tree.css_first('title')
+    main_content = tree.css_first('main') or tree.css_first('article') or tree.body
+    text = main_content.text(separator=' ', strip=True) if main_content is not None else None
+    return (title.text() if title is not None else None), text, hrefs
+
+
+EXTRACTORS = {
+    "html.parser": _extract_bs4,
+    "lxml": _extract_lxml,
+    "selectolax": _extract_selectolax,
+}
+
+
+def extract_html(html: bytes, backend: str = "html.parser") -> Extracted:
+    """
+    Extract a page's title, main text and links
+    
+    Args:
+        html: Raw response body
+        backend: One of HTML_PARSERS
+    
+    Returns:
+        (title or None, main text or None, raw href values)
+    """
+    return EXTRACTORS[backend](html)
+
+
+def resolve_html_parser(backend: str) -> str:
+    """
+    Validate the configured parser, falling back to html.parser if it is not installed
+    
+    Returns:
+        The backend to use
+    """
+    if backend not in HTML_PARSERS:
+        raise ValueError(f"Unknown SCRAPER_HTML_PARSER '{backend}', expected one of {HTML_PARSERS}")
+    
+    try:
+        if backend == "lxml":
+            import lxml.html  # noqa: F401
+        elif backend == "selectolax":
+            import selectolax.lexbor  # noqa: F401
+    except ImportError:
+        logger.warning(f"HTML parser '{backend}' not installed. Run: pip install {backend}")
+        logger.info("Falling back to the html.parser backend")
+        return "html.parser"
+    return backend
@@ -0,0 +1,262 @@
+"""
+Streaming ingestion pipeline: chunk → embed → upsert
+Stages are connected by bounded queues so memory stays flat as the corpus
+grows, and every committed batch is recorded in a checkpoint so an
+interrupted run can resume
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from app.utils.corpus import content_hash, point_id
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported, e.g. Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageStats:
+    """Items processed and busy time of one pipeline stage"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.batches = 0
+        self.busy = 0.0
+    
+    def record(self, items: int, seconds: float):
+        self.items += items
+        self.batches += 1
+        self.busy += seconds
+    
+    def summary(self) -> str:
+        rate = self.items / self.busy if self.busy else 0.0
+        rss = peak_rss_mb()
+        rss_text = f", peak RSS {rss:.0f} MB" if rss is not None else ""
+        return (
+            f"{self.name}: {self.items} chunks in {self.batches} batches, "
+            f"{self.busy:.1f}s busy ({rate:.1f} chunks/sec){rss_text}"
+        )
+
+
+class IngestCheckpoint:
+    """Progress of an ingestion run, persisted after every committed batch"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.state: Dict = {}
+    
+    def load(self) -> bool:
+        """
+        Load the checkpoint of an interrupted run
+        
+        Returns:
+            True if a previous run did not finish
+        """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+            return True
+        except Exception as e:
+            logger.error(f"Ignoring unreadable ingest checkpoint {self.path}: {e}")
+            return False
+    
+    def start(self):
+        """Begin a run, keeping the progress of an interrupted one"""
+        if not self.load():
+            self.state = {
+                'started_at': datetime.now().isoformat(),
+                'batches': 0,
+                'chunks': 0,
+                'corpus_changed': False
+            }
+        self._write()
+    
+    @property
+    def corpus_changed(self) -> bool:
+        """Whether this run (or the interrupted one it resumes) modified the vector store"""
+        return self.state.get('corpus_changed', False)
+    
+    def commit(self, chunks: int):
+        """Record a batch of chunks as durably written to the vector store"""
+        self.state['batches'] += 1
+        self.state['chunks'] += chunks
+        self.state['corpus_changed'] = True
+        self.state['updated_at'] = datetime.now().isoformat()
+        self._write()
+    
+    def mark_changed(self):
+        """Record a modification outside the batch stream (e.g. deletions)"""
+        self.state['corpus_changed'] = True
+        self._write()
+    
+    def clear(self):
+        """Remove the checkpoint once the run completed"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.state = {}
+    
+    def _write(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+class IngestPipeline:
+    """Streams chunks through embedding and upsert with bounded queues"""
+    
+    def __init__(
+        self,
+        embed_fn: Callable,
+        upsert_fn: Callable,
+        ensure_collection: Callable[[int], None],
+        checkpoint: IngestCheckpoint,
+        batch_size: int = 256,
+        queue_size: int = 2
+    ):
+        """
+        Args:
+            embed_fn: Async function embedding a list of texts
+            upsert_fn: Async function writing (chunks, embeddings) to the vector store
+            ensure_collection: Creates the collection for a vector size if missing
+            checkpoint: Progress record, committed after each upserted batch
+            batch_size: Chunks per batch flowing between stages
+            queue_size: Batches buffered between two stages; bounds memory
+        """
+        self.embed_fn = embed_fn
+        self.upsert_fn = upsert_fn
+        self.ensure_collection = ensure_collection
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.stats = {name: StageStats(name) for name in ("chunk", "embed", "upsert")}
+    
+    async def run(
+        self,
+        chunks: Iterable[Dict],
+        stored_hashes: Dict[str, Optional[str]],
+        unchanged_urls: Iterable[str] = ()
+    ) -> Dict:
+        """
+        Embed and upsert new and changed chunks
+        
+        Chunks whose content hash matches the vector store are skipped, which is
+        also how a resumed run skips the batches its predecessor committed.
+        
+        Args:
+            chunks: Stream of chunks from the chunking stage
+            stored_hashes: Point id -> content hash from vector_store.get_content_hashes()
+            unchanged_urls: Pages left out of the stream because the crawler found them
+                unchanged; their stored chunks are kept
+        
+        Returns:
+            Dict with 'added', 'updated', 'unchanged' and 'deleted' counts and
+            'deleted_ids', the stored points no chunk in the stream maps to
+        """
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0}
+        current_ids: Set[str] = set()
+        
+        # Chunk indexes are contiguous, so an unchanged page's points are url#0, url#1, ...
+        for url in unchanged_urls:
+            chunk_index = 0
+            while (id_ := point_id(url, chunk_index)) in stored_hashes:
+                current_ids.add(id_)
+                counts['unchanged'] += 1
+                chunk_index += 1
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        
+        chunk_iter = iter(chunks)
+        
+        def next_batch() -> Optional[List[Dict]]:
+            """Pull chunks until a batch needs embedding (None once the stream is exhausted)"""
+            batch: List[Dict] = []
+            started = time.perf_counter()
+            seen = 0
+            for chunk in chunk_iter:
+                seen += 1
+                id_ = point_id(chunk['metadata']['url'], chunk['metadata']['chunk_index'])
+                if id_ in current_ids:
+                    # Same page crawled twice; the first copy wins
+                    continue
+                current_ids.add(id_)
+                if id_ not in stored_hashes:
+                    counts['added'] += 1
+                elif stored_hashes[id_] != content_hash(chunk['content']):
+                    counts['updated'] += 1
+                else:
+                    counts['unchanged'] += 1
+                    continue
+                
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    break
+            
+            self.stats['chunk'].record(seen, time.perf_counter() - started)
+            return batch or None
+        
+        async def chunk_stage():
+            # Splitting (and dedup's MinHash) is CPU work; run it off the loop so the
+            # embed and upsert stages keep making progress while the next batch is cut
+            loop = asyncio.get_running_loop()
+            while (batch := await loop.run_in_executor(None, next_batch)) is not None:
+                await embed_queue.put(batch)
+            await embed_queue.put(None)
+        
+        async def embed_stage():
+            while (batch := await embed_queue.get()) is not None:
+                started = time.perf_counter()
+                embeddings = await self.embed_fn([chunk['content'] for chunk in batch])
+                self.stats['embed'].record(len(batch), time.perf_counter() - started)
+                await upsert_queue.put((batch, embeddings))
+            await upsert_queue.put(None)
+        
+        async def upsert_stage():
+            while (item := await upsert_queue.get()) is not None:
+                batch, embeddings = item
+                started = time.perf_counter()
+                self.ensure_collection(len(embeddings[0]))
+                await self.upsert_fn(batch, embeddings)
+                self.checkpoint.commit(len(batch))
+                stats = self.stats['upsert']
+                stats.record(len(batch), time.perf_counter() - started)
+                logger.info(
+                    f"Committed batch {stats.batches} ({stats.items} chunks written this run, "
+                    f"{counts['added'] + counts['updated']} queued so far)"
+                )
+        
+        tasks = [asyncio.create_task(stage()) for stage in (chunk_stage, embed_stage, upsert_stage)]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            # A failed stage would leave the others blocked on full or empty queues
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            for stats in self.stats.values():
+                logger.info(stats.summary())
+        
+        deleted_ids = [id_ for id_ in stored_hashes if id_ not in current_ids]
+        return {**counts, 'deleted': len(deleted_ids), 'deleted_ids': deleted_ids}
@@ -1,16 +1,36 @@
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.schema import HumanMessage, AIMessage, SystemMessage
-from typing import List, Dict, Tuple
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+import asyncio
 import logging
+import time
+
+import numpy as np
 
 from app.core.config import settings
-from app.services.qdrant_service import qdrant_service
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.embedding_cache import QueryEmbeddingCache
+from app.services.lexical_index import lexical_index, reciprocal_rank_fusion
+from app.services.vector_store import vector_store
 from app.services.reranker import reranker_service
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class RetrievalResult:
+    """Outcome of a single retrieval pass"""
+    context: str = ""
+    sources: List[str] = field(default_factory=list)
+    tier: str = "none"  # Threshold tier that produced the context: 'primary', 'fallback' or 'none'
+    candidates: int = 0  # Number of results returned by the vector search
+    rerank_path: str = "none"  # Rerank cascade path: 'full', 'prefix', 'skipped', 'disabled' or 'failed'
+    rerank_ms: float = 0.0  # Time spent in the cross-encoder for this request
+
+
 class RAGService:
     """RAG (Retrieval-Augmented Generation) service using LangChain"""
     
@@ -27,6 +47,17 @@ IMPORTANT RULES:
 
 Remember: ONLY answer questions about Zibtek based on the context provided with each question."""
     
+    OUT_OF_SCOPE_RESPONSE = (
+        "I apologize, but I can only answer questions related to Zibtek. "
+        "Please ask me about our services, team, or offerings."
+    )
+    
+    GREETING_RESPONSE = (
+        "Hello! I'm the Zibtek AI assistant. I can help you learn about Zibtek's services, "
+        "team, expertise, and how we can help with your software development needs. "
+        "What would you like to know?"
+    )
+    
     def __init__(self):
         # GPT-5 doesn't support temperature parameter, so we conditionally set it
         llm_kwargs = {
@@ -47,93 +78,312 @@ Remember: ONLY answer questions about Zibtek based on the context provided with
             model=settings.OPENAI_EMBEDDING_MODEL,
             openai_api_key=settings.OPENAI_API_KEY
         )
+        self.query_cache = QueryEmbeddingCache(
+            model=settings.OPENAI_EMBEDDING_MODEL,
+            max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            ttl=settings.QUERY_EMBEDDING_CACHE_TTL,
+            disk_path=settings.QUERY_EMBEDDING_CACHE_PATH
+        )
+        self.answer_cache = SemanticAnswerCache(
+            max_distance=settings.SEMANTIC_CACHE_MAX_DISTANCE,
+            max_size=settings.SEMANTIC_CACHE_SIZE,
+            ttl=settings.SEMANTIC_CACHE_TTL
+        )
+        # How often each threshold tier produced the context
+        self.tier_counts = Counter()
+        # How often each rerank cascade path was taken
+        self.rerank_path_counts = Counter()
+    
+    @property
+    def threshold_tiers(self) -> List[Tuple[str, float]]:
+        """Similarity threshold tiers, evaluated in order over one candidate set"""
+        return [
+            ("primary", settings.SIMILARITY_THRESHOLD),
+            ("fallback", settings.FALLBACK_SIMILARITY_THRESHOLD),
+        ]
+    
+    async def aembed_query(self, query: str) -> List[float]:
+        """
+        Embed a query, serving repeated queries from the query embedding cache
+        
+        Args:
+            query: User query
+            
+        Returns:
+            Query embedding vector
+        """
+        query_embedding = await self.query_cache.aget(query)
+        if query_embedding is not None:
+            logger.info("Query embedding served from cache")
+            return query_embedding
+        
+        query_embedding = await self.embeddings.aembed_query(query)
+        await self.query_cache.aput(query, query_embedding)
+        return query_embedding
+    
+    def can_use_answer_cache(self, chat_history: Optional[List[Dict[str, str]]]) -> bool:
+        """Answers are only shared for first-turn queries, where history can't change the meaning"""
+        return settings.SEMANTIC_CACHE_ENABLED and not chat_history
     
-    def retrieve_context(self, query: str) -> Tuple[str, List[str]]:
+    async def alookup_answer(self, query: str) -> Tuple[Optional[List[float]], Optional[Dict]]:
+        """
+        Embed the query and look it up in the semantic answer cache
+        
+        Args:
+            query: User query
+            
+        Returns:
+            Tuple of (query_embedding, cached_answer); either may be None
+        """
+        try:
+            query_embedding = await self.aembed_query(query)
+        except Exception as e:
+            logger.error(f"Error embedding query for answer cache: {e}")
+            return None, None
+        
+        return query_embedding, self.answer_cache.lookup(query_embedding)
+    
+    async def aretrieve(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]] = None
+    ) -> RetrievalResult:
         """
         Retrieve relevant context from vector store for EACH query
-        Now includes reranking for improved relevance
+        
+        One embedding and one vector search produce the candidate set; the primary
+        and fallback similarity tiers and the reranker are all evaluated over it.
+        Each candidate is reranked at most once, even if several tiers include it.
         
         Args:
             query: User query
+            query_embedding: Precomputed query embedding (created if not provided)
             
         Returns:
-            Tuple of (formatted_context, source_urls)
+            RetrievalResult with formatted context, source URLs and the matching tier
         """
         try:
-            logger.info(f"Creating embedding for query: {query[:50]}...")
-            # Create embedding for the query
-            query_embedding = self.embeddings.embed_query(query)
-            logger.info(f"Embedding created, vector length: {len(query_embedding)}")
-            
-            # Search in Qdrant vector database
-            logger.info(f"Searching Qdrant with limit: {settings.TOP_K_RESULTS}")
-            results = qdrant_service.search(
+            if query_embedding is None:
+                logger.info(f"Creating embedding for query: {query[:50]}...")
+                # Create embedding for the query
+                query_embedding = await self.aembed_query(query)
+                logger.info(f"Embedding created, vector length: {len(query_embedding)}")
+            
+            # Search the vector store
+            logger.info(f"Searching vector store with limit: {settings.TOP_K_RESULTS}")
+            # Nothing below the loosest tier can be used, so let the store drop it
+            dense_search = vector_store.asearch(
                 query_vector=query_embedding,
-                limit=settings.TOP_K_RESULTS
+                limit=settings.TOP_K_RESULTS,
+                score_threshold=min(threshold for _, threshold in self.threshold_tiers)
             )
-            logger.info(f"Found {len(results)} results from Qdrant")
-            
-            # Filter by similarity threshold
-            filtered_results = [
-                r for r in results 
-                if r['score'] >= settings.SIMILARITY_THRESHOLD
-            ]
-            logger.info(f"Filtered to {len(filtered_results)} results above threshold {settings.SIMILARITY_THRESHOLD}")
+            if settings.HYBRID_SEARCH_ENABLED:
+                # BM25 runs in an executor, concurrently with the vector search
+                candidates, lexical = await asyncio.gather(
+                    dense_search,
+                    lexical_index.asearch(query, limit=settings.LEXICAL_TOP_K)
+                )
+            else:
+                candidates = await dense_search
+            logger.info(f"Found {len(candidates)} results from vector store")
             
             # Log score distribution for debugging
-            if results:
-                scores = [r['score'] for r in results]
+            if candidates:
+                scores = [r['score'] for r in candidates]
                 logger.info(f"Score distribution - Min: {min(scores):.3f}, Max: {max(scores):.3f}, Avg: {sum(scores)/len(scores):.3f}")
-                logger.info(f"Results above {settings.SIMILARITY_THRESHOLD}: {len(filtered_results)}/{len(results)}")
-            
-            if not filtered_results:
-                logger.info("No results above similarity threshold")
-                return "", []
-            
-            # Apply reranking for better relevance
-            if reranker_service.is_enabled():
-                logger.info("Applying reranker to improve context relevance...")
-                reranked_results = reranker_service.rerank_documents(
-                    query=query,
-                    documents=filtered_results,
-                    top_n=settings.RERANK_TOP_N,
-                    threshold=settings.RERANK_THRESHOLD
+            
+            if settings.HYBRID_SEARCH_ENABLED:
+                candidates = reciprocal_rank_fusion(
+                    candidates,
+                    lexical,
+                    limit=settings.TOP_K_RESULTS,
+                    k=settings.RRF_K
                 )
-                logger.info(f"Reranked: {len(filtered_results)} → {len(reranked_results)} documents")
-                filtered_results = reranked_results
-            else:
-                logger.info("Reranker not enabled, using vector search results")
+                lexical_only = sum(1 for r in candidates if r.get('lexical_only'))
+                logger.info(f"Hybrid fusion: {len(lexical)} BM25 results, {lexical_only} lexical-only candidates kept")
             
-            # Check if we have any results after reranking
-            if not filtered_results:
-                logger.info("No results passed reranking threshold")
-                return "", []
+            result = await self.aselect_context(query, candidates)
+            self.tier_counts[result.tier] += 1
+            logger.info(f"Retrieval tier: {result.tier} ({len(result.sources)} sources)")
+            return result
             
-            # Format context with source tracking
-            context_parts = []
-            sources = []
+        except Exception as e:
+            logger.error(f"Error retrieving context: {e}")
+            self.tier_counts["error"] += 1
+            return RetrievalResult()
+    
+    def choose_rerank_path(self, docs: List[Dict]) -> Tuple[str, int]:
+        """
+        Decide how much of a tier's candidates to rerank (the rerank cascade)
+        
+        A clear winner in the vector scores (large top-1/top-2 margin) skips the
+        cross-encoder; a moderately peaked distribution (smaller margin or low
+        entropy) only reranks a prefix; anything else is reranked in full.
+        
+        Args:
+            docs: Tier candidates in retrieval order
             
-            for i, result in enumerate(filtered_results, 1):
-                context_parts.append(f"[{i}] {result['content']}")
-                if result['url'] not in sources:
-                    sources.append(result['url'])
+        Returns:
+            Tuple of (path, number of leading candidates to rerank)
+        """
+        if not settings.RERANK_CASCADE_ENABLED or len(docs) < 2:
+            return "full", len(docs)
+        
+        # Fused (hybrid) candidates are not in vector score order, and BM25-only ones have none
+        scores = np.sort([d['score'] for d in docs if not d.get('lexical_only')])[::-1].astype(np.float64)
+        if len(scores) < 2:
+            return "full", len(docs)
+        margin = scores[0] - scores[1]
+        
+        # Normalized entropy (0-1) of a softmax over the vector scores
+        weights = np.exp((scores - scores[0]) / settings.RERANK_CASCADE_TEMPERATURE)
+        probs = weights / weights.sum()
+        entropy = float(-(probs * np.log(probs + 1e-12)).sum() / np.log(len(probs)))
+        logger.info(f"Rerank cascade: margin={margin:.4f}, entropy={entropy:.3f}")
+        
+        if margin >= settings.RERANK_CASCADE_SKIP_MARGIN:
+            return "skipped", 0
+        if margin >= settings.RERANK_CASCADE_PREFIX_MARGIN or entropy <= settings.RERANK_CASCADE_MAX_ENTROPY:
+            return "prefix", min(settings.RERANK_CASCADE_PREFIX_SIZE, len(docs))
+        return "full", len(docs)
+    
+    async def aselect_context(self, query: str, candidates: List[Dict]) -> RetrievalResult:
+        """
+        Evaluate the threshold tiers (and reranking) over an in-memory candidate set
+        
+        Args:
+            query: User query
+            candidates: Vector search results for the query, sorted by score
+            
+        Returns:
+            RetrievalResult for the first tier that yields any context
+        """
+        rerank_scores: Dict[int, Dict] = {}
+        use_reranker = reranker_service.is_enabled()
+        rerank_path = "full" if use_reranker else "disabled"
+        rerank_ms = 0.0
+        
+        for tier, threshold in self.threshold_tiers:
+            tier_indices = [
+                i for i, r in enumerate(candidates)
+                if not r.get('lexical_only') and r['score'] >= threshold
+            ]
+            logger.info(f"Tier '{tier}': {len(tier_indices)}/{len(candidates)} results above threshold {threshold}")
+            
+            # BM25-only hits have no vector score; they join a tier only once dense
+            # results show the query is in scope, keeping the fused order
+            if tier_indices:
+                tier_indices = [
+                    i for i, r in enumerate(candidates)
+                    if r.get('lexical_only') or r['score'] >= threshold
+                ]
+            
+            if not tier_indices:
+                continue
+            
+            selected = None
+            if use_reranker:
+                rerank_path, prefix = self.choose_rerank_path([candidates[i] for i in tier_indices])
+                rerank_indices = tier_indices[:prefix]
                 
-                # Log both scores if reranking was used
-                if 'rerank_score' in result:
-                    logger.debug(
-                        f"Source {i}: {result['url']} "
-                        f"(vector: {result['original_score']:.3f}, rerank: {result['rerank_score']:.3f})"
+                # Only score candidates no earlier tier has already scored
+                unscored = [i for i in rerank_indices if i not in rerank_scores]
+                if unscored:
+                    logger.info(f"Applying reranker to {len(unscored)} new candidates ({rerank_path})...")
+                    start = time.perf_counter()
+                    try:
+                        scored = await reranker_service.ascore_documents(
+                            query, [dict(candidates[i], _candidate=i) for i in unscored]
+                        )
+                    except Exception as e:
+                        logger.error(f"Error during reranking: {e}")
+                        logger.info("Falling back to vector search results")
+                        use_reranker = False
+                        rerank_path = "failed"
+                    else:
+                        for doc in scored:
+                            rerank_scores[doc.pop('_candidate')] = doc
+                    rerank_ms += (time.perf_counter() - start) * 1000
+                
+                if use_reranker:
+                    tier_docs = sorted(
+                        (rerank_scores[i] for i in rerank_indices),
+                        key=lambda d: d['rerank_score'],
+                        reverse=True
                     )
-                else:
-                    logger.debug(f"Source {i}: {result['url']} (score: {result['score']:.3f})")
+                    selected = reranker_service.filter_scored_documents(
+                        tier_docs,
+                        top_n=settings.RERANK_TOP_N,
+                        threshold=settings.RERANK_THRESHOLD
+                    ) if tier_docs else []
+                    logger.info(f"Reranked: {len(tier_docs)} → {len(selected)} documents")
+                    
+                    # Candidates the cascade didn't rerank follow in vector order, but only when the
+                    # query was accepted: by the reranker on the prefix path, by the vector margin on
+                    # the skip path. BM25-only hits passed no threshold, so they only count once reranked
+                    if prefix < len(tier_indices) and (selected or rerank_path == "skipped"):
+                        tail = [
+                            candidates[i] for i in tier_indices[prefix:]
+                            if not candidates[i].get('lexical_only')
+                        ]
+                        selected = (selected + tail)[:settings.RERANK_TOP_N]
             
-            context = "\n\n".join(context_parts)
-            logger.info(f"Formatted context with {len(sources)} unique sources")
-            return context, sources
+            if selected is None:
+                if rerank_path == "disabled":
+                    logger.info("Reranker not enabled, using vector search results")
+                selected = [candidates[i] for i in tier_indices]
             
-        except Exception as e:
-            logger.error(f"Error retrieving context: {e}")
-            return "", []
+            if selected:
+                context, sources = self.format_context(selected)
+                logger.info(f"Formatted context with {len(sources)} unique sources")
+                self.rerank_path_counts[rerank_path] += 1
+                return RetrievalResult(
+                    context=context,
+                    sources=sources,
+                    tier=tier,
+                    candidates=len(candidates),
+                    rerank_path=rerank_path,
+                    rerank_ms=rerank_ms
+                )
+            
+            logger.info(f"No results passed reranking threshold in tier '{tier}'")
+        
+        logger.info("No relevant context found - treating as out of scope")
+        self.rerank_path_counts[rerank_path] += 1
+        return RetrievalResult(
+            candidates=len(candidates),
+            rerank_path=rerank_path,
+            rerank_ms=rerank_ms
+        )
+    
+    def format_context(self, results: List[Dict]) -> Tuple[str, List[str]]:
+        """
+        Format retrieved results into a numbered context block with source tracking
+        
+        Args:
+            results: Retrieved (and optionally reranked) results
+            
+        Returns:
+            Tuple of (formatted_context, source_urls)
+        """
+        context_parts = []
+        sources = []
+        
+        for i, result in enumerate(results, 1):
+            context_parts.append(f"[{i}] {result['content']}")
+            if result['url'] not in sources:
+                sources.append(result['url'])
+            
+            # Log both scores if reranking was used
+            if 'rerank_score' in result:
+                logger.debug(
+                    f"Source {i}: {result['url']} "
+                    f"(vector: {result['original_score']:.3f}, rerank: {result['rerank_score']:.3f})"
+                )
+            else:
+                logger.debug(f"Source {i}: {result['url']} (score: {result['score']:.3f})")
+        
+        return "\n\n".join(context_parts), sources
     
     def format_chat_history(self, messages: List[Dict[str, str]]) -> List:
         """
@@ -154,12 +404,49 @@ Remember: ONLY answer questions about Zibtek based on the context provided with
         
         return formatted_messages
     
+    def build_messages(
+        self,
+        query: str,
+        context: str,
+        chat_history: List[Dict[str, str]] = None
+    ) -> List:
+        """
+        Build the LLM message list: static system prompt, recent history, context-augmented query
+        
+        Args:
+            query: User query
+            context: Formatted context from the knowledge base
+            chat_history: Previous messages in the conversation
+            
+        Returns:
+            List of LangChain message objects
+        """
+        # Format chat history for context
+        history = []
+        if chat_history:
+            history = self.format_chat_history(chat_history[-6:])  # Last 3 turns
+            logger.info(f"Using {len(history)} messages from chat history")
+        
+        # Create augmented query with retrieved context
+        augmented_query = f"""CONTEXT from Zibtek website:
+{context}
+
+QUESTION: {query}"""
+        
+        logger.info(f"Created augmented query with {len(context)} characters of context")
+        
+        # Build messages - system prompt is static, context is in each query
+        messages = [SystemMessage(content=self.SYSTEM_PROMPT)]
+        messages.extend(history)
+        messages.append(HumanMessage(content=augmented_query))
+        return messages
+    
     def is_greeting(self, query: str) -> bool:
         """Check if query is a simple greeting"""
         greetings = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings']
         return query.lower().strip() in greetings or len(query.strip()) < 10
     
-    def generate_response(
+    async def agenerate_response(
         self,
         query: str,
         chat_history: List[Dict[str, str]] = None
@@ -179,89 +466,31 @@ Remember: ONLY answer questions about Zibtek based on the context provided with
             
             # Handle simple greetings
             if self.is_greeting(query):
-                return (
-                    "Hello! I'm the Zibtek AI assistant. I can help you learn about Zibtek's services, "
-                    "team, expertise, and how we can help with your software development needs. "
-                    "What would you like to know?",
-                    []
-                )
+                return self.GREETING_RESPONSE, []
+            
+            # Paraphrases of an earlier first-turn question reuse its answer
+            query_embedding = None
+            use_answer_cache = self.can_use_answer_cache(chat_history)
+            if use_answer_cache:
+                query_embedding, cached = await self.alookup_answer(query)
+                if cached:
+                    return cached['answer'], cached['sources']
             
             # ALWAYS retrieve relevant context for each query
             logger.info("Retrieving context from knowledge base...")
-            context, sources = self.retrieve_context(query)
-            logger.info(f"Retrieved {len(sources)} sources with context length: {len(context)}")
-            
-            # If no context found with threshold, try lower threshold
-            if not context:
-                logger.info("No context found with primary threshold, trying lower threshold...")
-                # Try with lower threshold for better results
-                query_embedding = self.embeddings.embed_query(query)
-                results = qdrant_service.search(
-                    query_vector=query_embedding,
-                    limit=settings.TOP_K_RESULTS
-                )
-                
-                # Use results with score > 0.5 (lower threshold)
-                filtered_results = [r for r in results if r['score'] >= 0.5]
-                
-                if filtered_results:
-                    # Apply reranking even for fallback results
-                    if reranker_service.is_enabled():
-                        logger.info("Applying reranker to fallback results...")
-                        filtered_results = reranker_service.rerank_documents(
-                            query=query,
-                            documents=filtered_results,
-                            top_n=settings.RERANK_TOP_N,
-                            threshold=settings.RERANK_THRESHOLD
-                        )
-                    
-                    if filtered_results:
-                        context_parts = []
-                        sources = []
-                        for i, result in enumerate(filtered_results, 1):
-                            context_parts.append(f"[{i}] {result['content']}")
-                            if result['url'] not in sources:
-                                sources.append(result['url'])
-                        context = "\n\n".join(context_parts)
-                        logger.info(f"Found context with lower threshold: {len(sources)} sources")
-                    else:
-                        logger.info("No results passed reranking threshold in fallback")
-                        return (
-                            "I apologize, but I can only answer questions related to Zibtek. "
-                            "Please ask me about our services, team, or offerings.",
-                            []
-                        )
-                else:
-                    # Still no context, out of scope
-                    logger.info("No relevant context found - treating as out of scope")
-                    return (
-                        "I apologize, but I can only answer questions related to Zibtek. "
-                        "Please ask me about our services, team, or offerings.",
-                        []
-                    )
-            
-            # Format chat history for context
-            history = []
-            if chat_history:
-                history = self.format_chat_history(chat_history[-6:])  # Last 3 turns
-                logger.info(f"Using {len(history)} messages from chat history")
+            retrieval = await self.aretrieve(query, query_embedding)
+            if not retrieval.context:
+                return self.OUT_OF_SCOPE_RESPONSE, []
             
-            # Create augmented query with retrieved context
-            augmented_query = f"""CONTEXT from Zibtek website:
-{context}
-
-QUESTION: {query}"""
-            
-            logger.info(f"Created augmented query with {len(context)} characters of context")
-            
-            # Build messages - system prompt is static, context is in each query
-            messages = [SystemMessage(content=self.SYSTEM_PROMPT)]
-            messages.extend(history)
-            messages.append(HumanMessage(content=augmented_query))
+            sources = retrieval.sources
+            messages = self.build_messages(query, retrieval.context, chat_history)
             
             logger.info("Generating response with context-augmented query...")
             # Generate response using retrieved context
-            response = self.llm.invoke(messages)
+            response = await self.llm.ainvoke(messages)
+            
+            if use_answer_cache and query_embedding is not None:
+                self.answer_cache.store(query_embedding, response.content, sources)
             
             logger.info(f"Generated response with {len(sources)} sources")
             return response.content, sources
@@ -269,6 +498,66 @@ QUESTION: {query}"""
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             raise
+    
+    async def astream_response(
+        self,
+        query: str,
+        chat_history: List[Dict[str, str]] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Stream a RAG response as events: sources first, then LLM tokens
+        
+        Args:
+            query: User query
+            chat_history: Previous messages in the conversation
+            
+        Yields:
+            Tuples of (event, data) - ('sources', {'sources': [...]}) once retrieval
+            finishes, then ('token', {'content': ...}) for each generated chunk
+        """
+        try:
+            logger.info(f"Processing streaming query: {query[:100]}...")
+            
+            # Greetings and out-of-scope answers are canned, send them as a single token
+            if self.is_greeting(query):
+                yield "sources", {"sources": []}
+                yield "token", {"content": self.GREETING_RESPONSE}
+                return
+            
+            query_embedding = None
+            use_answer_cache = self.can_use_answer_cache(chat_history)
+            if use_answer_cache:
+                query_embedding, cached = await self.alookup_answer(query)
+                if cached:
+                    yield "sources", {"sources": cached['sources']}
+                    yield "token", {"content": cached['answer']}
+                    return
+            
+            retrieval = await self.aretrieve(query, query_embedding)
+            sources = retrieval.sources
+            yield "sources", {"sources": sources}
+            
+            if not retrieval.context:
+                yield "token", {"content": self.OUT_OF_SCOPE_RESPONSE}
+                return
+            
+            messages = self.build_messages(query, retrieval.context, chat_history)
+            
+            logger.info("Streaming response with context-augmented query...")
+            response_parts = []
+            async for chunk in self.llm.astream(messages):
+                if chunk.content:
+                    response_parts.append(chunk.content)
+                    yield "token", {"content": chunk.content}
+            
+            if use_answer_cache and query_embedding is not None:
+                self.answer_cache.store(query_embedding, "".join(response_parts), sources)
+            
+            logger.info(f"Streamed response with {len(sources)} sources")
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            raise
 
 
 # Global instance
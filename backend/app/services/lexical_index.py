@@ -0,0 +1,200 @@
+"""
+BM25 lexical index over corpus chunks, fused with dense results via RRF
+Built by ingest_data; catches keyword-heavy questions (service names,
+technologies, locations) that embeddings alone rank poorly
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List
+
+from app.core.config import settings
+from app.utils.corpus import chunk_key, get_corpus_version, point_id
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its me my of on or our "
+    "that the their this to us was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, keeping terms like 'c#', 'node.js' and 'ci-cd' intact"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """Inverted index with BM25 scoring, stored as one JSON file"""
+    
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.docs: List[Dict] = []
+        self.postings: Dict[str, List[List[int]]] = {}
+        self.avg_length = 0.0
+        self.loaded_version = None
+        self.searches = 0
+    
+    def build(self, chunks: Iterable[Dict]) -> int:
+        """
+        Tokenize chunks and write the index file (called by ingest_data)
+        
+        Args:
+            chunks: Chunks (any iterable, read once) with 'content' and 'metadata' ('url', 'title', 'chunk_index')
+        
+        Returns:
+            Number of indexed chunks
+        """
+        docs = []
+        postings = defaultdict(list)
+        for doc_index, chunk in enumerate(chunks):
+            terms = tokenize(chunk['content'])
+            for term, count in Counter(terms).items():
+                postings[term].append([doc_index, count])
+            docs.append({
+                'url': chunk['metadata']['url'],
+                'title': chunk['metadata']['title'],
+                'chunk_index': chunk['metadata']['chunk_index'],
+                'content': chunk['content'],
+                'length': len(terms)
+            })
+        
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'docs': docs, 'postings': postings}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        
+        logger.info(f"Built lexical index: {len(docs)} chunks, {len(postings)} terms in {self.path}")
+        return len(docs)
+    
+    def _load(self):
+        """(Re)load the index file when the corpus version changes (lock held)"""
+        version = get_corpus_version()
+        if version == self.loaded_version:
+            return
+        
+        self.docs, self.postings, self.avg_length = [], {}, 0.0
+        self.loaded_version = version
+        if not os.path.exists(self.path):
+            logger.warning(f"No lexical index at {self.path}; run ingest_data to build it")
+            return
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.docs, self.postings = data['docs'], data['postings']
+            if self.docs:
+                self.avg_length = sum(doc['length'] for doc in self.docs) / len(self.docs)
+            logger.info(f"Loaded lexical index with {len(self.docs)} chunks")
+        except Exception as e:
+            logger.error(f"Error loading lexical index: {e}")
+    
+    def documents(self) -> List[Dict]:
+        """Indexed chunks ('url', 'title', 'chunk_index', 'content')"""
+        with self.lock:
+            self._load()
+            return list(self.docs)
+    
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        BM25 search
+        
+        Args:
+            query: User query
+            limit: Number of results to return
+        
+        Returns:
+            Results shaped like vector search results, with the BM25 score as 'lexical_score'
+        """
+        with self.lock:
+            self._load()
+            self.searches += 1
+            if not self.docs:
+                return []
+            
+            scores: Dict[int, float] = defaultdict(float)
+            total = len(self.docs)
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_index, count in postings:
+                    length_norm = 1 - self.b + self.b * self.docs[doc_index]['length'] / self.avg_length
+                    scores[doc_index] += idf * count * (self.k1 + 1) / (count + self.k1 * length_norm)
+            
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            results = []
+            for doc_index, score in ranked:
+                doc = self.docs[doc_index]
+                results.append({
+                    'id': point_id(doc['url'], doc['chunk_index']),
+                    'content': doc['content'],
+                    'url': doc['url'],
+                    'title': doc['title'],
+                    'chunk_index': doc['chunk_index'],
+                    'lexical_score': score
+                })
+            return results
+    
+    async def asearch(self, query: str, limit: int = 20) -> List[Dict]:
+        """Async variant of search (scoring scans the postings, and the first call loads the index file)"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.search, query, limit)
+    
+    def stats(self) -> Dict[str, int]:
+        """Index size and usage for monitoring"""
+        with self.lock:
+            return {"chunks": len(self.docs), "terms": len(self.postings), "searches": self.searches}
+
+
+def reciprocal_rank_fusion(
+    dense: List[Dict],
+    lexical: List[Dict],
+    limit: int,
+    k: int = 60
+) -> List[Dict]:
+    """
+    Merge dense and lexical rankings by reciprocal rank fusion
+    
+    Dense results keep their vector 'score' (used by the similarity tiers);
+    chunks found only lexically get score 0.0 and 'lexical_only' set.
+    
+    Args:
+        dense: Vector search results, best first
+        lexical: BM25 results, best first
+        limit: Number of fused results to return
+        k: RRF constant (larger flattens the rank weighting)
+    
+    Returns:
+        Fused results, best first, each with an 'rrf_score'
+    """
+    fused: Dict[str, Dict] = {}
+    
+    for rank, result in enumerate(dense):
+        key = chunk_key(result['url'], result['chunk_index'])
+        fused[key] = {**result, 'rrf_score': 1 / (k + rank + 1)}
+    
+    for rank, result in enumerate(lexical):
+        key = chunk_key(result['url'], result['chunk_index'])
+        if key in fused:
+            fused[key]['rrf_score'] += 1 / (k + rank + 1)
+            fused[key]['lexical_score'] = result['lexical_score']
+        else:
+            fused[key] = {**result, 'score': 0.0, 'lexical_only': True, 'rrf_score': 1 / (k + rank + 1)}
+    
+    return sorted(fused.values(), key=lambda result: result['rrf_score'], reverse=True)[:limit]
+
+
+# Global instance
+lexical_index = LexicalIndex(settings.LEXICAL_INDEX_PATH, k1=settings.BM25_K1, b=settings.BM25_B)
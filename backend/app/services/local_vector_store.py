@@ -0,0 +1,278 @@
+"""
+In-process vector index for small corpora (VECTOR_BACKEND=local)
+Vectors live in a memory-mapped .npy file next to a JSON payload store, and
+search is a NumPy dot product + top-k, so no Qdrant server is needed.
+Upserts are buffered in memory and written in one rewrite by flush(), so
+streaming ingestion does not rewrite the whole index for every batch.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.utils.corpus import content_hash, point_id
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+PAYLOADS_FILE = "payloads.json"
+
+
+class LocalVectorStore:
+    """Drop-in replacement for QdrantService backed by files in index_dir"""
+    
+    def __init__(self, index_dir: str, dtype: str = "float32"):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported LOCAL_INDEX_DTYPE '{dtype}', expected float32 or float16")
+        
+        self.index_dir = index_dir
+        self.dtype = np.dtype(dtype)
+        self.vectors_path = os.path.join(index_dir, VECTORS_FILE)
+        self.payloads_path = os.path.join(index_dir, PAYLOADS_FILE)
+        
+        self.vectors: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+        self.payloads: List[Dict] = []
+        self._loaded_mtime = None
+        # Point id -> (normalized vector, payload) upserted since the last flush
+        self.pending: Dict[str, Tuple[np.ndarray, Dict]] = {}
+    
+    def collection_exists(self) -> bool:
+        """Check if an index has been written"""
+        return os.path.exists(self.vectors_path) and os.path.exists(self.payloads_path)
+    
+    def create_collection(self, vector_size: int = 1536):
+        """
+        Create an empty index
+        
+        Args:
+            vector_size: Size of embedding vectors
+        """
+        if self.collection_exists():
+            logger.info(f"Local index already exists: {self.index_dir}")
+            return
+        self._write(np.zeros((0, vector_size), dtype=self.dtype), [], [])
+        logger.info(f"Created local index: {self.index_dir}")
+    
+    def upsert_documents(self, chunks: List[Dict[str, str]], embeddings: List[List[float]]):
+        """
+        Insert or overwrite document chunks with embeddings (ids are derived from url + chunk_index)
+        
+        The points are buffered; they reach the index files, and searches, on flush().
+        
+        Args:
+            chunks: List of document chunks with metadata
+            embeddings: List of embedding vectors
+        """
+        new_vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        for chunk, vector in zip(chunks, new_vectors):
+            id_ = point_id(chunk['metadata']['url'], chunk['metadata']['chunk_index'])
+            self.pending[id_] = (vector, {
+                'content': chunk['content'],
+                'url': chunk['metadata']['url'],
+                'title': chunk['metadata']['title'],
+                'chunk_index': chunk['metadata']['chunk_index'],
+                'content_hash': content_hash(chunk['content'])
+            })
+        logger.info(f"Buffered {len(chunks)} points for the local index ({len(self.pending)} pending)")
+    
+    async def aupsert_documents(self, chunks: List[Dict[str, str]], embeddings: List[List[float]]):
+        """Async variant of upsert_documents"""
+        await asyncio.get_running_loop().run_in_executor(None, self.upsert_documents, chunks, embeddings)
+    
+    def flush(self):
+        """Write buffered upserts to the index files (one rewrite for the whole batch stream)"""
+        if not self.pending:
+            return
+        try:
+            self._load()
+            
+            if self.vectors is None:
+                vector_size = len(next(iter(self.pending.values()))[0])
+                vectors = np.zeros((0, vector_size), dtype=np.float32)
+            else:
+                vectors = np.array(self.vectors, dtype=np.float32)  # writable copy of the mmap
+            ids = list(self.ids)
+            payloads = list(self.payloads)
+            rows = {id_: row for row, id_ in enumerate(ids)}
+            
+            appended = []
+            for id_, (vector, payload) in self.pending.items():
+                if id_ in rows:
+                    vectors[rows[id_]] = vector
+                    payloads[rows[id_]] = payload
+                else:
+                    ids.append(id_)
+                    payloads.append(payload)
+                    appended.append(vector)
+            
+            if appended:
+                vectors = np.concatenate([vectors, np.stack(appended)])
+            self._write(vectors.astype(self.dtype), ids, payloads)
+            
+            logger.info(f"Upserted {len(self.pending)} points to local index ({len(ids)} total)")
+            self.pending = {}
+        except Exception as e:
+            logger.error(f"Error upserting documents: {e}")
+            raise
+    
+    def get_content_hashes(self) -> Dict[str, Optional[str]]:
+        """
+        Content hash of every stored point, used for incremental ingestion
+        
+        Returns:
+            Dict of point id -> content hash (None for points stored without one)
+        """
+        self._load()
+        hashes = {id_: payload.get('content_hash') for id_, payload in zip(self.ids, self.payloads)}
+        hashes.update((id_, payload['content_hash']) for id_, (_, payload) in self.pending.items())
+        return hashes
+    
+    def delete_points(self, ids: List[str]):
+        """
+        Delete points by id
+        
+        Args:
+            ids: Point ids to delete
+        """
+        try:
+            self.flush()
+            self._load()
+            if self.vectors is None:
+                return
+            
+            doomed = set(ids)
+            keep = [row for row, id_ in enumerate(self.ids) if id_ not in doomed]
+            self._write(
+                np.asarray(self.vectors)[keep],
+                [self.ids[row] for row in keep],
+                [self.payloads[row] for row in keep]
+            )
+            logger.info(f"Deleted {len(self.ids) - len(keep)} points from local index")
+        except Exception as e:
+            logger.error(f"Error deleting points: {e}")
+            raise
+    
+    def search(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Search for similar documents by cosine similarity
+        
+        Args:
+            query_vector: Query embedding vector
+            limit: Number of results to return
+            score_threshold: Drop results below this similarity
+        
+        Returns:
+            List of search results with content and metadata (same shape as QdrantService.search)
+        """
+        try:
+            self._load()
+            if self.vectors is None or not len(self.vectors):
+                return []
+            
+            query = self._normalize(np.asarray(query_vector, dtype=np.float32))
+            # Rows are stored normalized, so the dot product is the cosine similarity
+            scores = np.dot(self.vectors, query)
+            
+            limit = min(limit, len(scores))
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            
+            if score_threshold is not None:
+                top = top[scores[top] >= score_threshold]
+            
+            return [self._format_result(int(i), float(scores[i])) for i in top]
+        except Exception as e:
+            logger.error(f"Error searching local index: {e}")
+            raise
+    
+    async def asearch(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Async variant of search
+        
+        A few hundred chunks take well under a millisecond to scan, so this runs
+        inline rather than paying for an executor hop.
+        """
+        return self.search(query_vector, limit=limit, score_threshold=score_threshold)
+    
+    def _format_result(self, index: int, score: float) -> Dict:
+        """Convert an index row into a search result dict"""
+        payload = self.payloads[index]
+        return {
+            'id': self.ids[index],
+            'content': payload['content'],
+            'url': payload['url'],
+            'title': payload['title'],
+            'chunk_index': payload.get('chunk_index'),
+            'score': score
+        }
+    
+    def delete_collection(self):
+        """Delete the index files"""
+        try:
+            for path in (self.vectors_path, self.payloads_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.vectors, self.ids, self.payloads = None, [], []
+            self.pending = {}
+            self._loaded_mtime = None
+            logger.info(f"Deleted local index: {self.index_dir}")
+        except Exception as e:
+            logger.error(f"Error deleting local index: {e}")
+            raise
+    
+    def _load(self):
+        """Memory-map the index, re-opening it when ingestion rewrote the files"""
+        try:
+            mtime = os.stat(self.vectors_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        
+        # Read-only mmap: pages are shared through the OS page cache across workers
+        vectors = np.load(self.vectors_path, mmap_mode='r')
+        with open(self.payloads_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if len(data['ids']) != len(vectors):
+            # Caught ingestion between its two writes; keep the old index and retry next search
+            logger.warning("Local index is being rewritten, keeping the previous version")
+            return
+        
+        self.vectors, self.ids, self.payloads = vectors, data['ids'], data['payloads']
+        self._loaded_mtime = mtime
+        logger.info(f"Loaded local index: {len(self.ids)} vectors ({self.vectors.dtype}) from {self.index_dir}")
+    
+    def _write(self, vectors: np.ndarray, ids: List[str], payloads: List[Dict]):
+        """Write both files atomically (payloads first, vectors.npy mtime triggers reloads)"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        
+        tmp_payloads = self.payloads_path + ".tmp"
+        with open(tmp_payloads, 'w', encoding='utf-8') as f:
+            json.dump({'ids': ids, 'payloads': payloads}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_payloads, self.payloads_path)
+        
+        tmp_vectors = self.vectors_path + ".tmp.npy"
+        np.save(tmp_vectors, vectors)
+        os.replace(tmp_vectors, self.vectors_path)
+        
+        self._loaded_mtime = None
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize a vector or the rows of a matrix"""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
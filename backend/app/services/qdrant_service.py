@@ -1,23 +1,78 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from typing import List, Dict
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import (
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    PointStruct,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+from typing import List, Dict, Optional
+import asyncio
+import httpx
 import logging
-import uuid
 
 from app.core.config import settings
+from app.utils.corpus import content_hash, point_id
 
 logger = logging.getLogger(__name__)
 
+# Only the fields used to build results are transferred on search
+RESULT_PAYLOAD_FIELDS = ['content', 'url', 'title', 'chunk_index']
+
+QUANTIZATION_MODES = ("none", "int8")
+
 
 class QdrantService:
     """Service for interacting with Qdrant vector database"""
     
-    def __init__(self):
-        self.client = QdrantClient(
-            host=settings.QDRANT_HOST,
-            port=settings.QDRANT_PORT
+    def __init__(self, prefer_grpc: Optional[bool] = None, collection_name: Optional[str] = None):
+        """
+        Args:
+            prefer_grpc: Use gRPC instead of REST (default: QDRANT_PREFER_GRPC)
+            collection_name: Collection to use (default: QDRANT_COLLECTION_NAME)
+        """
+        self.prefer_grpc = settings.QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc
+        options = self._client_options()
+        
+        self.client = QdrantClient(**options)
+        # Async client for the request path so searches don't block the event loop;
+        # one per process, so every request shares its connection pool / gRPC channel
+        self.async_client = AsyncQdrantClient(**options)
+        self.collection_name = collection_name or settings.QDRANT_COLLECTION_NAME
+        logger.info(f"Qdrant transport: {'gRPC' if self.prefer_grpc else 'REST'}")
+        
+        if settings.QDRANT_QUANTIZATION not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown QDRANT_QUANTIZATION '{settings.QDRANT_QUANTIZATION}', expected one of {QUANTIZATION_MODES}")
+        self.search_params = SearchParams(
+            hnsw_ef=settings.QDRANT_SEARCH_HNSW_EF,
+            quantization=QuantizationSearchParams(
+                rescore=settings.QDRANT_SEARCH_RESCORE,
+                oversampling=settings.QDRANT_SEARCH_OVERSAMPLING
+            ) if settings.QDRANT_QUANTIZATION != "none" else None
         )
-        self.collection_name = settings.QDRANT_COLLECTION_NAME
+    
+    def _client_options(self) -> Dict:
+        """Connection settings shared by the sync and async clients"""
+        return {
+            'host': settings.QDRANT_HOST,
+            'port': settings.QDRANT_PORT,
+            'grpc_port': settings.QDRANT_GRPC_PORT,
+            'prefer_grpc': self.prefer_grpc,
+            'timeout': settings.QDRANT_TIMEOUT,
+            # REST only: for localhost/127.0.0.1 the client default keeps no idle
+            # connections, so every request would pay a new TCP handshake; other
+            # hosts get httpx's defaults, which these replace
+            'limits': httpx.Limits(
+                max_connections=settings.QDRANT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.QDRANT_MAX_KEEPALIVE_CONNECTIONS
+            )
+        }
     
     def collection_exists(self) -> bool:
         """Check if collection exists"""
@@ -39,15 +94,56 @@ class QdrantService:
             if not self.collection_exists():
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+                    vectors_config=VectorParams(
+                        size=vector_size,
+                        distance=Distance.COSINE,
+                        on_disk=settings.QDRANT_ON_DISK
+                    ),
+                    hnsw_config=self._hnsw_config(),
+                    quantization_config=self._quantization_config()
                 )
-                logger.info(f"Created collection: {self.collection_name}")
+                logger.info(f"Created collection: {self.collection_name} ({self._profile_summary()})")
             else:
                 logger.info(f"Collection already exists: {self.collection_name}")
         except Exception as e:
             logger.error(f"Error creating collection: {e}")
             raise
     
+    def update_collection_profile(self):
+        """Apply the configured HNSW, on-disk and quantization settings to an existing collection"""
+        try:
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                vectors_config={"": VectorParamsDiff(on_disk=settings.QDRANT_ON_DISK)},
+                hnsw_config=self._hnsw_config(),
+                # None would leave existing quantization in place
+                quantization_config=self._quantization_config() or Disabled.DISABLED
+            )
+            logger.info(f"Updated collection profile: {self.collection_name} ({self._profile_summary()})")
+        except Exception as e:
+            logger.error(f"Error updating collection profile: {e}")
+            raise
+    
+    def _hnsw_config(self) -> HnswConfigDiff:
+        return HnswConfigDiff(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT)
+    
+    def _quantization_config(self) -> Optional[ScalarQuantization]:
+        if settings.QDRANT_QUANTIZATION == "none":
+            return None
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+            )
+        )
+    
+    def _profile_summary(self) -> str:
+        return (
+            f"m={settings.QDRANT_HNSW_M}, ef_construct={settings.QDRANT_HNSW_EF_CONSTRUCT}, "
+            f"on_disk={settings.QDRANT_ON_DISK}, quantization={settings.QDRANT_QUANTIZATION}"
+        )
+    
     def upsert_documents(self, chunks: List[Dict[str, str]], embeddings: List[List[float]]):
         """
         Upsert document chunks with embeddings to Qdrant
@@ -57,22 +153,10 @@ class QdrantService:
             embeddings: List of embedding vectors
         """
         try:
-            points = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                point = PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=embedding,
-                    payload={
-                        'content': chunk['content'],
-                        'url': chunk['metadata']['url'],
-                        'title': chunk['metadata']['title'],
-                        'chunk_index': chunk['metadata']['chunk_index']
-                    }
-                )
-                points.append(point)
+            points = self._build_points(chunks, embeddings)
             
             # Upsert in batches
-            batch_size = 100
+            batch_size = settings.QDRANT_UPSERT_BATCH_SIZE
             for i in range(0, len(points), batch_size):
                 batch = points[i:i + batch_size]
                 self.client.upsert(
@@ -85,14 +169,115 @@ class QdrantService:
             logger.error(f"Error upserting documents: {e}")
             raise
     
-    def search(self, query_vector: List[float], limit: int = 5) -> List[Dict]:
+    async def aupsert_documents(self, chunks: List[Dict[str, str]], embeddings: List[List[float]]):
+        """
+        Upsert document chunks with the async client, several batches in flight at once
+        
+        Args:
+            chunks: List of document chunks with metadata
+            embeddings: List of embedding vectors
+        """
+        try:
+            points = self._build_points(chunks, embeddings)
+            batch_size = settings.QDRANT_UPSERT_BATCH_SIZE
+            semaphore = asyncio.Semaphore(settings.QDRANT_UPSERT_CONCURRENCY)
+            
+            async def upsert_batch(batch: List[PointStruct]):
+                async with semaphore:
+                    await self.async_client.upsert(
+                        collection_name=self.collection_name,
+                        points=batch
+                    )
+            
+            await asyncio.gather(*[
+                upsert_batch(points[i:i + batch_size])
+                for i in range(0, len(points), batch_size)
+            ])
+            
+            logger.info(f"Upserted {len(points)} points to Qdrant")
+        except Exception as e:
+            logger.error(f"Error upserting documents: {e}")
+            raise
+    
+    def flush(self):
+        """Nothing to do: every upsert is written to Qdrant directly"""
+    
+    def _build_points(self, chunks: List[Dict[str, str]], embeddings: List[List[float]]) -> List[PointStruct]:
+        """Turn chunks and their embeddings into Qdrant points"""
+        return [
+            PointStruct(
+                id=point_id(chunk['metadata']['url'], chunk['metadata']['chunk_index']),
+                vector=embedding,
+                payload={
+                    'content': chunk['content'],
+                    'url': chunk['metadata']['url'],
+                    'title': chunk['metadata']['title'],
+                    'chunk_index': chunk['metadata']['chunk_index'],
+                    'content_hash': content_hash(chunk['content'])
+                }
+            )
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
+    
+    def get_content_hashes(self) -> Dict[str, Optional[str]]:
+        """
+        Content hash of every stored point, used for incremental ingestion
+        
+        Returns:
+            Dict of point id -> content hash (None for points stored without one)
+        """
+        try:
+            hashes = {}
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    limit=256,
+                    offset=offset,
+                    with_payload=['content_hash'],
+                    with_vectors=False
+                )
+                for point in points:
+                    hashes[str(point.id)] = (point.payload or {}).get('content_hash')
+                if offset is None:
+                    return hashes
+        except Exception as e:
+            logger.error(f"Error reading content hashes: {e}")
+            raise
+    
+    def delete_points(self, ids: List[str]):
+        """
+        Delete points by id
+        
+        Args:
+            ids: Point ids to delete
+        """
+        try:
+            batch_size = settings.QDRANT_UPSERT_BATCH_SIZE
+            for i in range(0, len(ids), batch_size):
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=ids[i:i + batch_size]
+                )
+            logger.info(f"Deleted {len(ids)} points from Qdrant")
+        except Exception as e:
+            logger.error(f"Error deleting points: {e}")
+            raise
+    
+    def search(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
         """
         Search for similar documents
         
         Args:
             query_vector: Query embedding vector
             limit: Number of results to return
-            
+            score_threshold: Drop results below this similarity on the server
+        
         Returns:
             List of search results with content and metadata
         """
@@ -100,22 +285,60 @@ class QdrantService:
             results = self.client.search(
                 collection_name=self.collection_name,
                 query_vector=query_vector,
-                limit=limit
+                limit=limit,
+                score_threshold=score_threshold,
+                search_params=self.search_params,
+                with_payload=RESULT_PAYLOAD_FIELDS
             )
             
-            return [
-                {
-                    'content': result.payload['content'],
-                    'url': result.payload['url'],
-                    'title': result.payload['title'],
-                    'score': result.score
-                }
-                for result in results
-            ]
+            return [self._format_result(result) for result in results]
+        except Exception as e:
+            logger.error(f"Error searching Qdrant: {e}")
+            raise
+    
+    async def asearch(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Async variant of search using the async Qdrant client
+        
+        Args:
+            query_vector: Query embedding vector
+            limit: Number of results to return
+            score_threshold: Drop results below this similarity on the server
+        
+        Returns:
+            List of search results with content and metadata
+        """
+        try:
+            results = await self.async_client.search(
+                collection_name=self.collection_name,
+                query_vector=query_vector,
+                limit=limit,
+                score_threshold=score_threshold,
+                search_params=self.search_params,
+                with_payload=RESULT_PAYLOAD_FIELDS
+            )
+            
+            return [self._format_result(result) for result in results]
         except Exception as e:
             logger.error(f"Error searching Qdrant: {e}")
             raise
     
+    def _format_result(self, result) -> Dict:
+        """Convert a Qdrant scored point into a search result dict"""
+        return {
+            'id': str(result.id),
+            'content': result.payload['content'],
+            'url': result.payload['url'],
+            'title': result.payload['title'],
+            'chunk_index': result.payload.get('chunk_index'),
+            'score': result.score
+        }
+    
     def delete_collection(self):
         """Delete the collection"""
         try:
@@ -0,0 +1,368 @@
+"""
+Inference backends for the cross-encoder reranker
+- torch: sentence-transformers CrossEncoder (fp32 on CPU)
+- onnx: ONNX Runtime export of the same model, cached on disk
+- onnx-int8: ONNX export with dynamic int8 quantization
+- remote: any of the above hosted by a rerank worker pool (app.rerank_server)
+"""
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from multiprocessing.connection import Client
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RERANK_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class RerankBackend(ABC):
+    """Common interface: score query-document pairs like CrossEncoder.predict"""
+    
+    name = "base"
+    
+    def __init__(self, model_name: str, max_length: int = 512):
+        self.model_name = model_name
+        self.max_length = max_length
+        self.tokenizer = None
+    
+    def tokenize(self, text: str) -> List[int]:
+        """Token ids for one side of a pair, without special tokens"""
+        return self.tokenizer(
+            text,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=self.max_length
+        )['input_ids']
+    
+    def encode_ids(self, query_ids: List[int], doc_ids: List[int]) -> Dict[str, List[int]]:
+        """
+        Join pre-tokenized query and document ids into one model input
+        
+        The document is truncated by tokens so the pair fits max_length; the query
+        is capped at half of the available length.
+        
+        Args:
+            query_ids: Query token ids (no special tokens)
+            doc_ids: Document token ids (no special tokens)
+        
+        Returns:
+            Dict with 'input_ids' (and 'token_type_ids' if the model uses them)
+        """
+        budget = self.max_length - self.tokenizer.num_special_tokens_to_add(pair=True)
+        query_ids = query_ids[:budget // 2]
+        doc_ids = doc_ids[:budget - len(query_ids)]
+        
+        item = {'input_ids': self.tokenizer.build_inputs_with_special_tokens(query_ids, doc_ids)}
+        if 'token_type_ids' in self.tokenizer.model_input_names:
+            item['token_type_ids'] = self.tokenizer.create_token_type_ids_from_sequences(query_ids, doc_ids)
+        return item
+    
+    def encode(self, pairs: List[List[str]]) -> List[Dict[str, List[int]]]:
+        """Tokenize query-document text pairs into unpadded model inputs"""
+        return [self.encode_ids(self.tokenize(query), self.tokenize(doc)) for query, doc in pairs]
+    
+    def pad(self, items: List[Dict[str, List[int]]]) -> Dict[str, np.ndarray]:
+        """Right-pad encoded pairs into a batch of numpy arrays"""
+        length = max(len(item['input_ids']) for item in items)
+        pad_id = self.tokenizer.pad_token_id or 0
+        
+        features = {
+            'input_ids': np.full((len(items), length), pad_id, dtype=np.int64),
+            'attention_mask': np.zeros((len(items), length), dtype=np.int64)
+        }
+        if 'token_type_ids' in items[0]:
+            features['token_type_ids'] = np.zeros((len(items), length), dtype=np.int64)
+        
+        for row, item in enumerate(items):
+            size = len(item['input_ids'])
+            features['input_ids'][row, :size] = item['input_ids']
+            features['attention_mask'][row, :size] = 1
+            if 'token_type_ids' in features:
+                features['token_type_ids'][row, :size] = item['token_type_ids']
+        
+        return features
+    
+    @abstractmethod
+    def predict_logits(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        """Run the model on padded inputs, returning one raw logit per pair"""
+    
+    def predict_encoded(self, items: List[Dict[str, List[int]]], batch_size: int = 16) -> np.ndarray:
+        """
+        Score encoded pairs, matching CrossEncoder.predict (sigmoid for single-label models)
+        
+        Args:
+            items: Encoded pairs from encode/encode_ids
+            batch_size: Pairs per forward pass
+        
+        Returns:
+            Array of scores aligned with items
+        """
+        logits = [
+            self.predict_logits(self.pad(items[start:start + batch_size]))
+            for start in range(0, len(items), batch_size)
+        ]
+        if not logits:
+            return np.zeros(0, dtype=np.float32)
+        return 1 / (1 + np.exp(-np.concatenate(logits)))
+    
+    def predict(self, pairs: List[List[str]], batch_size: int = 16) -> np.ndarray:
+        """
+        Score query-document text pairs
+        
+        Args:
+            pairs: Query-document pairs
+            batch_size: Pairs per forward pass
+        
+        Returns:
+            Array of scores aligned with pairs
+        """
+        return self.predict_encoded(self.encode(pairs), batch_size=batch_size)
+
+
+class TorchRerankBackend(RerankBackend):
+    """sentence-transformers CrossEncoder running in PyTorch"""
+    
+    name = "torch"
+    
+    def __init__(self, model_name: str, max_length: int = 512, device: Optional[str] = None):
+        super().__init__(model_name, max_length)
+        import torch
+        from sentence_transformers import CrossEncoder
+        
+        self.torch = torch
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        logger.info(f"Using device: {self.device}")
+        
+        self.cross_encoder = CrossEncoder(model_name, max_length=max_length, device=self.device)
+        self.tokenizer = self.cross_encoder.tokenizer
+    
+    def predict_logits(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        inputs = {
+            name: self.torch.as_tensor(value, device=self.device)
+            for name, value in features.items()
+        }
+        with self.torch.inference_mode():
+            logits = self.cross_encoder.model(**inputs).logits
+        return logits.float().cpu().numpy().reshape(-1)
+
+
+class OnnxRerankBackend(RerankBackend):
+    """ONNX Runtime export of the cross-encoder, optionally int8-quantized"""
+    
+    def __init__(
+        self,
+        model_name: str,
+        max_length: int = 512,
+        cache_dir: str = "./data/onnx",
+        quantize: bool = False
+    ):
+        super().__init__(model_name, max_length)
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+        
+        self.name = "onnx-int8" if quantize else "onnx"
+        export_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+        model_dir, file_name = self._ensure_artifact(export_dir, quantize)
+        
+        logger.info(f"Loading ONNX reranker from {os.path.join(model_dir, file_name)}")
+        self.model = ORTModelForSequenceClassification.from_pretrained(
+            model_dir,
+            file_name=file_name,
+            provider="CPUExecutionProvider"
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+    
+    def _ensure_artifact(self, export_dir: str, quantize: bool):
+        """Export (and quantize) the model once, reusing the cached artifact afterwards"""
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        
+        if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+            logger.info(f"Exporting {self.model_name} to ONNX in {export_dir} (one-time)...")
+            model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+            model.save_pretrained(export_dir)
+            AutoTokenizer.from_pretrained(self.model_name).save_pretrained(export_dir)
+        
+        if not quantize:
+            return export_dir, "model.onnx"
+        
+        quantized_dir = os.path.join(export_dir, "int8")
+        if not os.path.exists(os.path.join(quantized_dir, "model_quantized.onnx")):
+            logger.info(f"Applying dynamic int8 quantization in {quantized_dir} (one-time)...")
+            quantizer = ORTQuantizer.from_pretrained(export_dir, file_name="model.onnx")
+            quantizer.quantize(
+                save_dir=quantized_dir,
+                quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            )
+        return quantized_dir, "model_quantized.onnx"
+    
+    def predict_logits(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        # ORT models accept numpy inputs and return numpy logits
+        logits = self.model(**features).logits
+        return np.asarray(logits, dtype=np.float32).reshape(-1)
+
+
+# Keys that were published as examples, and so protect nothing
+PUBLISHED_AUTHKEYS = {"zibtek-reranker", "change-me"}
+
+
+def parse_worker_address(address: str) -> Tuple[str, int]:
+    """Split a 'host:port' worker address (host defaults to 127.0.0.1)"""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def require_worker_authkey(authkey: Optional[str]) -> bytes:
+    """
+    Validate the worker pool secret
+    
+    The pool unpickles whatever an authenticated client sends, so the key is
+    all that stands between the port and arbitrary code execution.
+    
+    Raises:
+        ValueError: The key is unset or a published example
+    """
+    if not authkey or authkey in PUBLISHED_AUTHKEYS:
+        raise ValueError(
+            "RERANK_WORKER_AUTHKEY must be set to a private secret to use the rerank worker pool, "
+            "e.g. python -c \"import secrets; print(secrets.token_hex(32))\""
+        )
+    return authkey.encode()
+
+
+class RemoteRerankBackend(RerankBackend):
+    """
+    Client for a rerank worker pool started with `python -m app.rerank_server`
+    
+    Tokenization stays in the API process (it is cheap and uses the token cache);
+    only padded batches cross the IPC channel, and the pool spreads them over its
+    model processes.
+    """
+    
+    def __init__(
+        self,
+        model_name: str,
+        address: str,
+        authkey: Optional[str],
+        max_length: int = 512,
+        timeout: float = 30.0
+    ):
+        super().__init__(model_name, max_length)
+        self.authkey = require_worker_authkey(authkey)
+        from transformers import AutoTokenizer
+        
+        self.address = parse_worker_address(address)
+        self.timeout = timeout
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # One connection per thread (batcher worker, executor threads, event loop)
+        self._local = threading.local()
+        
+        health = self.health()
+        self.name = f"remote:{health['backend']}"
+        logger.info(f"Connected to rerank worker pool at {address} ({health['workers']} workers, {health['backend']})")
+    
+    def _close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+    
+    def _request(self, message: Dict) -> Dict:
+        """Send one request to the pool, reconnecting once if the connection was dropped"""
+        for attempt in range(2):
+            try:
+                if getattr(self._local, 'conn', None) is None:
+                    self._local.conn = Client(self.address, authkey=self.authkey)
+                conn = self._local.conn
+                conn.send(message)
+                if not conn.poll(self.timeout):
+                    # The late reply would be read by the next request, so drop the connection
+                    self._close()
+                    raise TimeoutError(f"Rerank worker pool did not answer within {self.timeout}s")
+                reply = conn.recv()
+                break
+            except (EOFError, ConnectionError):
+                self._close()
+                if attempt:
+                    raise
+                logger.warning("Lost connection to the rerank worker pool, reconnecting...")
+        
+        if not reply.get('ok'):
+            raise RuntimeError(f"Rerank worker pool error: {reply.get('error')}")
+        return reply
+    
+    def health(self) -> Dict[str, any]:
+        """Worker count, queue depth and throughput counters reported by the pool"""
+        reply = self._request({'op': 'health'})
+        reply.pop('ok')
+        return reply
+    
+    def predict_logits(self, features: Dict[str, np.ndarray]) -> np.ndarray:
+        return self._request({'op': 'predict', 'batches': [features]})['logits']
+    
+    def predict_encoded(self, items: List[Dict[str, List[int]]], batch_size: int = 16) -> np.ndarray:
+        if not items:
+            return np.zeros(0, dtype=np.float32)
+        # Ship all sub-batches at once so the pool can run them on different workers
+        batches = [self.pad(items[start:start + batch_size]) for start in range(0, len(items), batch_size)]
+        logits = self._request({'op': 'predict', 'batches': batches})['logits']
+        return 1 / (1 + np.exp(-logits))
+
+
+def load_rerank_backend(
+    backend: str,
+    model_name: str,
+    max_length: int = 512,
+    cache_dir: str = "./data/onnx",
+    device: Optional[str] = None,
+    worker_address: Optional[str] = None,
+    worker_authkey: Optional[str] = None,
+    worker_timeout: float = 30.0
+) -> RerankBackend:
+    """
+    Create the configured reranker backend, falling back to torch if ONNX is unavailable
+    
+    Args:
+        backend: One of 'torch', 'onnx', 'onnx-int8'
+        model_name: HuggingFace model id
+        max_length: Maximum tokens per query-document pair
+        cache_dir: Directory for exported ONNX artifacts
+        device: Torch device (torch backend only)
+        worker_address: host:port of a rerank worker pool; when set, the model runs
+            there (with the pool's backend) instead of in this process
+        worker_authkey: Shared secret for the worker pool (required with worker_address)
+        worker_timeout: Seconds to wait for a worker pool reply
+    
+    Returns:
+        Loaded backend
+    """
+    if backend not in RERANK_BACKENDS:
+        raise ValueError(f"Unknown RERANK_BACKEND '{backend}', expected one of {RERANK_BACKENDS}")
+    
+    if worker_address:
+        return RemoteRerankBackend(
+            model_name,
+            worker_address,
+            worker_authkey,
+            max_length=max_length,
+            timeout=worker_timeout
+        )
+    
+    if backend in ("onnx", "onnx-int8"):
+        try:
+            return OnnxRerankBackend(
+                model_name,
+                max_length=max_length,
+                cache_dir=cache_dir,
+                quantize=backend == "onnx-int8"
+            )
+        except ImportError:
+            logger.warning("ONNX Runtime backend not installed. Run: pip install 'optimum[onnxruntime]'")
+            logger.info("Falling back to the torch reranker backend")
+    
+    return TorchRerankBackend(model_name, max_length=max_length, device=device)
@@ -0,0 +1,169 @@
+"""
+Dynamic micro-batching for the reranker
+Pairs from concurrent requests are collected into shared forward passes
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RerankJob:
+    """Pairs submitted by one request, resolved through a future"""
+    
+    def __init__(self, pairs: Sequence):
+        self.pairs = pairs
+        self.future: Future = Future()
+        self.scores = np.zeros(len(pairs), dtype=np.float32)
+
+
+class RerankBatcher:
+    """Scheduler that batches rerank pairs across concurrent requests"""
+    
+    def __init__(
+        self,
+        predict_fn: Callable[[List], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        bucket_size: int = 16,
+        length_fn: Optional[Callable] = None
+    ):
+        """
+        Args:
+            predict_fn: Scores a list of pairs, returning one score per pair
+            max_batch_size: Stop collecting once this many pairs are waiting
+            max_wait_ms: Longest time the first job in a batch waits for company
+            bucket_size: Pairs per forward pass; pairs are sorted by length first
+                so each pass pads to a similar length
+            length_fn: Length of a pair used for bucketing (default: characters)
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.bucket_size = bucket_size
+        self.length_fn = length_fn or (lambda pair: sum(len(part) for part in pair))
+        
+        self.jobs: "queue.Queue[RerankJob]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.pairs_scored = 0
+        self.jobs_completed = 0
+        
+        self.worker = threading.Thread(target=self._run, name="rerank-batcher", daemon=True)
+        self.worker.start()
+    
+    def submit(self, pairs: Sequence) -> Future:
+        """
+        Queue pairs for scoring
+        
+        Args:
+            pairs: Query-document pairs for one request
+            
+        Returns:
+            Future resolving to a numpy array of scores aligned with pairs
+        """
+        job = RerankJob(pairs)
+        if not pairs:
+            job.future.set_result(job.scores)
+            return job.future
+        
+        self.jobs.put(job)
+        return job.future
+    
+    def predict(self, pairs: Sequence) -> np.ndarray:
+        """Blocking variant of submit"""
+        return self.submit(pairs).result()
+    
+    def _next_job(self, timeout: Optional[float] = None) -> RerankJob:
+        """
+        Dequeue the next job whose caller is still waiting
+        
+        Jobs cancelled while queued (e.g. the client disconnected) are dropped;
+        the rest are marked running, so they can no longer be cancelled and
+        resolving them cannot fail.
+        
+        Raises:
+            queue.Empty: No live job arrived before the timeout
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                raise queue.Empty
+            job = self.jobs.get(timeout=remaining)
+            if job.future.set_running_or_notify_cancel():
+                return job
+    
+    def _collect(self) -> List[RerankJob]:
+        """Wait for a job, then gather more until the batch is full or the window closes"""
+        batch = [self._next_job()]
+        pending = len(batch[0].pairs)
+        deadline = time.monotonic() + self.max_wait
+        
+        while pending < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._next_job(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(job)
+            pending += len(job.pairs)
+        
+        return batch
+    
+    def _run(self):
+        """Worker loop: the only thread that runs the model, so it must never exit"""
+        while True:
+            batch: List[RerankJob] = []
+            try:
+                batch = self._collect()
+                self._score(batch)
+            except Exception as e:
+                logger.error(f"Error scoring rerank batch: {e}")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+    
+    def _score(self, batch: List[RerankJob]):
+        """Score every pair of a batch and resolve its jobs"""
+        # Flatten and sort by length so each forward pass has little padding
+        items = [
+            (self.length_fn(pair), job, i, pair)
+            for job in batch
+            for i, pair in enumerate(job.pairs)
+        ]
+        items.sort(key=lambda item: item[0])
+        
+        for start in range(0, len(items), self.bucket_size):
+            bucket = items[start:start + self.bucket_size]
+            scores = self.predict_fn([item[3] for item in bucket])
+            for (_, job, i, _), score in zip(bucket, scores):
+                job.scores[i] = score
+        
+        for job in batch:
+            job.future.set_result(job.scores)
+        
+        with self.lock:
+            self.batches += 1
+            self.pairs_scored += len(items)
+            self.jobs_completed += len(batch)
+        logger.debug(f"Scored rerank batch: {len(batch)} requests, {len(items)} pairs")
+    
+    def stats(self) -> Dict[str, float]:
+        """Throughput counters for monitoring"""
+        with self.lock:
+            return {
+                "queue_depth": self.jobs.qsize(),
+                "batches": self.batches,
+                "pairs_scored": self.pairs_scored,
+                "jobs_completed": self.jobs_completed,
+                "avg_pairs_per_batch": self.pairs_scored / self.batches if self.batches else 0.0
+            }
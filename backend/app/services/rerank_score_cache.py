@@ -0,0 +1,100 @@
+"""
+Bounded LRU cache of cross-encoder scores
+Keyed by normalized query hash, chunk id and reranker model; cleared when
+the corpus is re-ingested
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.services.embedding_cache import QueryEmbeddingCache
+from app.utils.corpus import get_corpus_version
+
+logger = logging.getLogger(__name__)
+
+
+class RerankScoreCache:
+    """LRU cache of rerank scores for (query, chunk) pairs"""
+    
+    def __init__(self, model_name: str, max_size: int = 10000):
+        """
+        Args:
+            model_name: Reranker model name, part of every key
+            max_size: Maximum number of cached scores (0 disables the cache)
+        """
+        self.model_name = model_name
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, float]" = OrderedDict()
+        self.corpus_version = get_corpus_version()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def make_keys(self, query: str, documents: List[Dict]) -> List[Optional[str]]:
+        """
+        Build cache keys for a query and its candidate chunks
+        
+        Returns:
+            One key per document; None for documents without a point id
+        """
+        normalized = QueryEmbeddingCache.normalize(query)
+        query_hash = hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32]
+        return [
+            f"{self.model_name}|{query_hash}|{doc['id']}" if doc.get('id') is not None else None
+            for doc in documents
+        ]
+    
+    def _check_corpus_version(self):
+        """Drop all scores if the corpus was re-ingested (lock held)"""
+        version = get_corpus_version()
+        if version != self.corpus_version:
+            if self.entries:
+                logger.info(f"Corpus version changed, invalidating {len(self.entries)} cached rerank scores")
+            self.entries.clear()
+            self.corpus_version = version
+    
+    def get_many(self, keys: List[Optional[str]]) -> List[Optional[float]]:
+        """Look up scores, returning None for misses"""
+        if self.max_size <= 0:
+            return [None] * len(keys)
+        
+        scores = []
+        with self.lock:
+            self._check_corpus_version()
+            for key in keys:
+                score = self.entries.get(key) if key is not None else None
+                if score is None:
+                    self.misses += 1
+                else:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                scores.append(score)
+        return scores
+    
+    def put_many(self, keys: List[Optional[str]], scores: List[float]):
+        """Store scores, evicting least recently used entries"""
+        if self.max_size <= 0:
+            return
+        
+        with self.lock:
+            for key, score in zip(keys, scores):
+                if key is None:
+                    continue
+                self.entries[key] = float(score)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,101 @@
+"""
+Precomputed reranker tokenization for corpus chunks
+Chunk token ids are built once at ingestion time, so only the query needs
+tokenizing per request
+"""
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from app.utils.corpus import chunk_key, content_hash, get_corpus_version
+
+logger = logging.getLogger(__name__)
+
+
+class RerankTokenCache:
+    """Chunk token ids keyed by chunk id, one file per reranker model"""
+    
+    def __init__(self, cache_dir: str, model_name: str):
+        self.path = os.path.join(cache_dir, f"{model_name.replace('/', '__')}.json")
+        self.model_name = model_name
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        self.loaded_version = None
+        self.hits = 0
+        self.misses = 0
+    
+    def build(self, chunks: Iterable[Dict], tokenize) -> int:
+        """
+        Tokenize chunks and write the cache file (called by ingest_data)
+        
+        Args:
+            chunks: Chunks (any iterable, read once) with 'content' and 'metadata' ('url', 'chunk_index')
+            tokenize: Function mapping text to token ids without special tokens
+            
+        Returns:
+            Number of cached chunks
+        """
+        entries = {}
+        for chunk in chunks:
+            key = chunk_key(chunk['metadata']['url'], chunk['metadata']['chunk_index'])
+            entries[key] = {
+                'hash': content_hash(chunk['content']),
+                'ids': tokenize(chunk['content'])
+            }
+        
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model': self.model_name, 'chunks': entries}, f)
+        os.replace(tmp_path, self.path)
+        
+        logger.info(f"Cached reranker tokenization for {len(entries)} chunks in {self.path}")
+        return len(entries)
+    
+    def _load(self):
+        """(Re)load the cache file when the corpus version changes (lock held)"""
+        version = get_corpus_version()
+        if version == self.loaded_version:
+            return
+        
+        self.entries = {}
+        self.loaded_version = version
+        if not os.path.exists(self.path):
+            logger.info(f"No reranker token cache at {self.path}")
+            return
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('chunks', {})
+            logger.info(f"Loaded reranker token cache with {len(self.entries)} chunks")
+        except Exception as e:
+            logger.error(f"Error loading reranker token cache: {e}")
+    
+    def get(self, doc: Dict) -> Optional[List[int]]:
+        """
+        Look up cached token ids for a search result
+        
+        Args:
+            doc: Search result with 'url', 'chunk_index' and 'content'
+            
+        Returns:
+            Token ids, or None if missing or the content changed since ingestion
+        """
+        if doc.get('chunk_index') is None:
+            return None
+        
+        with self.lock:
+            self._load()
+            entry = self.entries.get(chunk_key(doc['url'], doc['chunk_index']))
+            if entry is not None and entry['hash'] == content_hash(doc['content']):
+                self.hits += 1
+                return entry['ids']
+            self.misses += 1
+            return None
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
@@ -2,13 +2,21 @@
 Reranker service for improving context relevance
 Uses BGE-Reranker (BAAI/bge-reranker-large) from HuggingFace
 Fast, local, no API calls needed!
+Runs in PyTorch or ONNX Runtime (optionally int8) depending on RERANK_BACKEND,
+in-process or in a separate worker pool (RERANK_WORKER_ADDRESS)
 """
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import List, Dict, Optional
-from sentence_transformers import CrossEncoder
-import torch
+import numpy as np
 
 from app.core.config import settings
+from app.services.rerank_backends import RemoteRerankBackend, load_rerank_backend, require_worker_authkey
+from app.services.rerank_batcher import RerankBatcher
+from app.services.rerank_score_cache import RerankScoreCache
+from app.services.rerank_token_cache import RerankTokenCache
 
 logger = logging.getLogger(__name__)
 
@@ -19,25 +27,52 @@ class RerankerService:
     def __init__(self):
         """Initialize BGE reranker model"""
         self.model = None
+        self.batcher = None
         self.enabled = settings.USE_RERANKER
+        # Chunk token ids precomputed by ingest_data
+        self.token_cache = RerankTokenCache(settings.RERANK_TOKEN_CACHE_DIR, settings.RERANK_MODEL)
+        # Scores for (query, chunk) pairs seen before
+        self.score_cache = RerankScoreCache(settings.RERANK_MODEL, max_size=settings.RERANK_SCORE_CACHE_SIZE)
+        # Dedicated executor so CPU-bound inference never runs on the event loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.RERANK_EXECUTOR_WORKERS,
+            thread_name_prefix="reranker"
+        )
         
         if self.enabled:
+            # A worker pool without a private key is a misconfiguration, not a missing model
+            if settings.RERANK_WORKER_ADDRESS:
+                require_worker_authkey(settings.RERANK_WORKER_AUTHKEY)
             try:
-                logger.info(f"Loading reranker model: {settings.RERANK_MODEL}")
-                
-                # Determine device
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-                logger.info(f"Using device: {device}")
+                logger.info(f"Loading reranker model: {settings.RERANK_MODEL} (backend: {settings.RERANK_BACKEND})")
                 
                 # Load BGE reranker model
-                self.model = CrossEncoder(
+                self.model = load_rerank_backend(
+                    settings.RERANK_BACKEND,
                     settings.RERANK_MODEL,
                     max_length=512,
-                    device=device
+                    cache_dir=settings.RERANK_ONNX_CACHE_DIR,
+                    worker_address=settings.RERANK_WORKER_ADDRESS,
+                    worker_authkey=settings.RERANK_WORKER_AUTHKEY,
+                    worker_timeout=settings.RERANK_WORKER_TIMEOUT
                 )
                 
-                logger.info(f"Reranker initialized successfully with {settings.RERANK_MODEL}")
+                # Share forward passes across concurrent requests
+                if settings.RERANK_MICROBATCH_ENABLED:
+                    self.batcher = RerankBatcher(
+                        predict_fn=self._predict,
+                        max_batch_size=settings.RERANK_MAX_BATCH_SIZE,
+                        max_wait_ms=settings.RERANK_MAX_WAIT_MS,
+                        bucket_size=settings.RERANK_BATCH_SIZE,
+                        length_fn=lambda item: len(item['input_ids'])
+                    )
+                    logger.info(
+                        f"Rerank micro-batching enabled (max_batch_size={settings.RERANK_MAX_BATCH_SIZE}, "
+                        f"max_wait_ms={settings.RERANK_MAX_WAIT_MS})"
+                    )
                 
+                logger.info(f"Reranker initialized successfully with {settings.RERANK_MODEL} ({self.model.name})")
+            
             except Exception as e:
                 logger.error(f"Failed to initialize BGE reranker: {e}")
                 logger.info("Reranker will be disabled")
@@ -60,7 +95,7 @@ class RerankerService:
             documents: List of document dicts with 'content', 'url', 'score' keys
             top_n: Number of top results to return (default: from settings)
             threshold: Minimum relevance score 0-1 (default: from settings)
-            
+        
         Returns:
             Reranked and filtered list of documents with updated scores
         """
@@ -73,82 +108,262 @@ class RerankerService:
             return documents
         
         try:
-            # Use settings defaults if not provided
-            top_n = top_n or settings.RERANK_TOP_N
-            threshold = threshold or settings.RERANK_THRESHOLD
-            
-            logger.info(f"Reranking {len(documents)} documents with top_n={top_n}, threshold={threshold}")
-            
-            # Prepare query-document pairs for the model
-            pairs = [[query, doc['content'][:512]] for doc in documents]
-            
-            # Get relevance scores from BGE model
-            # BGE outputs logits, we'll normalize them to 0-1 range using sigmoid
-            scores = self.model.predict(pairs, batch_size=settings.RERANK_BATCH_SIZE)
-            
-            # Apply sigmoid to convert logits to probabilities (0-1 range)
-            import numpy as np
-            scores = 1 / (1 + np.exp(-scores))  # Sigmoid function
-            
-            # Create reranked document list with scores
-            scored_docs = []
-            for idx, (doc, score) in enumerate(zip(documents, scores)):
-                scored_doc = {
-                    'content': doc['content'],
-                    'url': doc['url'],
-                    'original_score': doc['score'],  # Vector similarity score
-                    'rerank_score': float(score),    # BGE relevance score
-                    'score': float(score)            # Use rerank score as primary
-                }
-                scored_docs.append(scored_doc)
-                
-                logger.debug(
-                    f"Doc {idx}: original_score={doc['score']:.3f}, "
-                    f"rerank_score={float(score):.3f}"
-                )
-            
-            # Sort by rerank score (descending)
-            scored_docs.sort(key=lambda x: x['rerank_score'], reverse=True)
+            scored_docs = self.score_documents(query, documents)
+            return self.filter_scored_documents(scored_docs, top_n=top_n, threshold=threshold)
+        
+        except Exception as e:
+            logger.error(f"Error during reranking: {e}")
+            logger.info("Falling back to original document order")
+            return documents
+    
+    def score_documents(
+        self,
+        query: str,
+        documents: List[Dict[str, any]]
+    ) -> List[Dict[str, any]]:
+        """
+        Score documents against the query without filtering
+        
+        Args:
+            query: User query
+            documents: List of document dicts with 'content', 'url', 'score' keys
+        
+        Returns:
+            Copies of the documents with 'original_score' and 'rerank_score' added,
+            sorted by rerank score (descending)
+        """
+        logger.info(f"Scoring {len(documents)} documents with reranker")
+        
+        keys, scores, missing = self._lookup_scores(query, documents)
+        if missing:
+            items = self._encode(query, [documents[i] for i in missing])
+            if self.batcher:
+                new_scores = self.batcher.predict(items)
+            else:
+                new_scores = self._predict(items)
+            self._store_scores(keys, scores, missing, new_scores)
+        
+        return self._build_scored_documents(documents, scores)
+    
+    def _lookup_scores(self, query: str, documents: List[Dict[str, any]]):
+        """
+        Fetch cached scores for the documents
+        
+        Returns:
+            Tuple of (cache keys, scores with None for misses, indices of misses)
+        """
+        keys = self.score_cache.make_keys(query, documents)
+        scores = self.score_cache.get_many(keys)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if len(missing) < len(documents):
+            logger.info(f"Rerank score cache: {len(documents) - len(missing)}/{len(documents)} hits")
+        return keys, scores, missing
+    
+    def _store_scores(self, keys, scores, missing: List[int], new_scores: np.ndarray):
+        """Fill in freshly computed scores and cache them"""
+        for i, score in zip(missing, new_scores):
+            scores[i] = float(score)
+        self.score_cache.put_many([keys[i] for i in missing], new_scores)
+    
+    def _encode(self, query: str, documents: List[Dict[str, any]]) -> List[Dict[str, List[int]]]:
+        """
+        Prepare query-document model inputs
+        
+        Only the query is tokenized per request; chunk token ids come from the
+        ingestion-time cache, falling back to tokenizing chunks that aren't cached.
+        """
+        query_ids = self.model.tokenize(query)
+        items = []
+        cached = 0
+        for doc in documents:
+            doc_ids = self.token_cache.get(doc)
+            if doc_ids is None:
+                doc_ids = self.model.tokenize(doc['content'])
+            else:
+                cached += 1
+            items.append(self.model.encode_ids(query_ids, doc_ids))
+        
+        logger.debug(f"Reranker tokenization: {cached}/{len(documents)} chunks from cache")
+        return items
+    
+    def _predict(self, items: List[Dict[str, List[int]]]) -> np.ndarray:
+        """Run the cross-encoder over encoded pairs"""
+        return self.model.predict_encoded(items, batch_size=settings.RERANK_BATCH_SIZE)
+    
+    def _build_scored_documents(
+        self,
+        documents: List[Dict[str, any]],
+        scores: np.ndarray
+    ) -> List[Dict[str, any]]:
+        """Attach model scores to copies of the documents and sort them"""
+        # BGE outputs logits, we'll normalize them to 0-1 range using sigmoid
+        scores = 1 / (1 + np.exp(-np.asarray(scores)))  # Sigmoid function
+        
+        # Create reranked document list with scores
+        scored_docs = []
+        for idx, (doc, score) in enumerate(zip(documents, scores)):
+            scored_doc = {
+                **doc,
+                'original_score': doc['score'],  # Vector similarity score
+                'rerank_score': float(score),    # BGE relevance score
+                'score': float(score)            # Use rerank score as primary
+            }
+            scored_docs.append(scored_doc)
             
-            # Log rerank score distribution
+            logger.debug(
+                f"Doc {idx}: original_score={doc['score']:.3f}, "
+                f"rerank_score={float(score):.3f}"
+            )
+        
+        # Sort by rerank score (descending)
+        scored_docs.sort(key=lambda x: x['rerank_score'], reverse=True)
+        
+        # Log rerank score distribution
+        if scored_docs:
             rerank_scores = [doc['rerank_score'] for doc in scored_docs]
             logger.info(f"Rerank score distribution - Min: {min(rerank_scores):.3f}, Max: {max(rerank_scores):.3f}, Avg: {sum(rerank_scores)/len(rerank_scores):.3f}")
-            
-            # Filter by threshold first, then limit to top_n
-            reranked_docs = []
-            filtered_out_count = 0
-            
-            # First, filter by threshold
-            for i, doc in enumerate(scored_docs):
-                if doc['rerank_score'] >= threshold:
-                    reranked_docs.append(doc)
-                    logger.debug(f"Doc {i+1}: rerank_score={doc['rerank_score']:.3f} ✅ (above threshold {threshold})")
-                else:
-                    filtered_out_count += 1
-                    logger.info(f"Doc {i+1}: rerank_score={doc['rerank_score']:.3f} ❌ (below threshold {threshold})")
-            
-            # Then limit to top_n
-            if len(reranked_docs) > top_n:
-                logger.info(f"Limiting {len(reranked_docs)} threshold-passing docs to top {top_n}")
-                reranked_docs = reranked_docs[:top_n]
-            
-            logger.info(f"Reranking filter results: {len(reranked_docs)} final docs (from {len(scored_docs)} total, {filtered_out_count} filtered out by threshold)")
-            
-            logger.info(
-                f"Reranking complete: {len(documents)} → {len(reranked_docs)} documents "
-                f"(filtered by threshold {threshold})"
-            )
-            
-            return reranked_docs
-            
+        
+        return scored_docs
+    
+    def filter_scored_documents(
+        self,
+        scored_docs: List[Dict[str, any]],
+        top_n: Optional[int] = None,
+        threshold: Optional[float] = None
+    ) -> List[Dict[str, any]]:
+        """
+        Apply the rerank threshold and top_n limit to already scored documents
+        
+        Args:
+            scored_docs: Documents returned by score_documents, sorted by rerank score
+            top_n: Number of top results to return (default: from settings)
+            threshold: Minimum relevance score 0-1 (default: from settings)
+        
+        Returns:
+            Filtered list of documents
+        """
+        # Use settings defaults if not provided
+        top_n = top_n or settings.RERANK_TOP_N
+        threshold = threshold or settings.RERANK_THRESHOLD
+        
+        logger.info(f"Filtering {len(scored_docs)} reranked documents with top_n={top_n}, threshold={threshold}")
+        
+        # Filter by threshold first, then limit to top_n
+        reranked_docs = []
+        filtered_out_count = 0
+        
+        # First, filter by threshold
+        for i, doc in enumerate(scored_docs):
+            if doc['rerank_score'] >= threshold:
+                reranked_docs.append(doc)
+                logger.debug(f"Doc {i+1}: rerank_score={doc['rerank_score']:.3f} ✅ (above threshold {threshold})")
+            else:
+                filtered_out_count += 1
+                logger.info(f"Doc {i+1}: rerank_score={doc['rerank_score']:.3f} ❌ (below threshold {threshold})")
+        
+        # Then limit to top_n
+        if len(reranked_docs) > top_n:
+            logger.info(f"Limiting {len(reranked_docs)} threshold-passing docs to top {top_n}")
+            reranked_docs = reranked_docs[:top_n]
+        
+        logger.info(f"Reranking filter results: {len(reranked_docs)} final docs (from {len(scored_docs)} total, {filtered_out_count} filtered out by threshold)")
+        
+        return reranked_docs
+    
+    async def arerank_documents(
+        self,
+        query: str,
+        documents: List[Dict[str, any]],
+        top_n: Optional[int] = None,
+        threshold: Optional[float] = None
+    ) -> List[Dict[str, any]]:
+        """
+        Async variant of rerank_documents that never runs inference on the event loop
+        
+        Args:
+            query: User query
+            documents: List of document dicts with 'content', 'url', 'score' keys
+            top_n: Number of top results to return (default: from settings)
+            threshold: Minimum relevance score 0-1 (default: from settings)
+        
+        Returns:
+            Reranked and filtered list of documents with updated scores
+        """
+        if not self.is_enabled() or not documents:
+            logger.info("Reranker not enabled or no documents to rerank")
+            return documents
+        
+        try:
+            scored_docs = await self.ascore_documents(query, documents)
+            return self.filter_scored_documents(scored_docs, top_n=top_n, threshold=threshold)
+        
         except Exception as e:
             logger.error(f"Error during reranking: {e}")
             logger.info("Falling back to original document order")
             return documents
     
+    async def ascore_documents(
+        self,
+        query: str,
+        documents: List[Dict[str, any]]
+    ) -> List[Dict[str, any]]:
+        """
+        Async variant of score_documents: awaits the micro-batcher, or the
+        reranker executor when batching is disabled
+        
+        Args:
+            query: User query
+            documents: List of document dicts with 'content', 'url', 'score' keys
+        
+        Returns:
+            Scored copies of the documents, sorted by rerank score (descending)
+        """
+        logger.info(f"Scoring {len(documents)} documents with reranker")
+        
+        keys, scores, missing = self._lookup_scores(query, documents)
+        if missing:
+            loop = asyncio.get_running_loop()
+            items = await loop.run_in_executor(
+                self.executor,
+                partial(self._encode, query, [documents[i] for i in missing])
+            )
+            if self.batcher:
+                # The batcher owns the model thread; just wait for this request's scores
+                new_scores = await asyncio.wrap_future(self.batcher.submit(items))
+            else:
+                new_scores = await loop.run_in_executor(self.executor, partial(self._predict, items))
+            self._store_scores(keys, scores, missing, new_scores)
+        
+        return self._build_scored_documents(documents, scores)
+    
     def is_enabled(self) -> bool:
         """Check if reranker is enabled and available"""
         return self.enabled and self.model is not None
+    
+    def worker_health(self) -> Optional[Dict[str, any]]:
+        """Health of the rerank worker pool, or None when the model runs in-process"""
+        if not isinstance(self.model, RemoteRerankBackend):
+            return None
+        try:
+            return {"status": "ok", **self.model.health()}
+        except Exception as e:
+            logger.error(f"Rerank worker pool health check failed: {e}")
+            return {"status": "unavailable", "error": str(e)}
+    
+    async def astats(self) -> Dict[str, any]:
+        """Async variant of stats (the worker health check is a blocking round-trip to the pool)"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.stats)
+    
+    def stats(self) -> Dict[str, any]:
+        """Reranker counters for monitoring"""
+        return {
+            "enabled": self.is_enabled(),
+            "backend": self.model.name if self.model else None,
+            "token_cache": self.token_cache.stats(),
+            "score_cache": self.score_cache.stats(),
+            "batcher": self.batcher.stats() if self.batcher else None,
+            "workers": self.worker_health()
+        }
 
 
 # Global instance
@@ -1,16 +1,46 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import httpx
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin, urlparse
-from typing import List, Set, Dict
+from urllib.robotparser import RobotFileParser
+from typing import Iterable, List, Set, Dict, Optional, Sequence, Tuple
 import time
 import logging
-import json
 import os
-from datetime import datetime
+
+from app.core.config import settings
+from app.services.crawl_state import CrawlStateStore
+from app.services.document_cache import DocumentCache
+from app.services.html_parsers import Extracted, extract_html, resolve_html_parser
+from app.services.url_frontier import TIER_SEED, TIER_SITEMAP, URLFrontier, canonicalize_url, parse_sitemap
+from app.utils.corpus import content_hash
 
 logger = logging.getLogger(__name__)
 
 
+class HostThrottle:
+    """Per-host politeness: bounded concurrency and a minimum interval between requests"""
+    
+    def __init__(self, concurrency: int, requests_per_second: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+    
+    def slow_down(self, delay: float):
+        """Raise the interval, e.g. to a robots.txt Crawl-delay"""
+        self.interval = max(self.interval, delay)
+    
+    async def wait_turn(self):
+        """Sleep until this host's next request slot (call with the semaphore held)"""
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
 class WebScraper:
     """Web scraper for extracting content from websites"""
     
@@ -18,8 +48,23 @@ class WebScraper:
         self.base_url = base_url
         self.max_pages = max_pages
         self.visited_urls: Set[str] = set()
-        self.documents: List[Dict[str, str]] = []
+        # Urls of the documents extracted by the current crawl
+        self.document_urls: Set[str] = set()
         self.cache_file = cache_file or f"scraped_content_{urlparse(base_url).netloc.replace('.', '_')}.json"
+        # Migrates a legacy data/<cache_file> JSON cache on first use
+        self.cache = DocumentCache(
+            os.path.join("data", os.path.splitext(self.cache_file)[0]),
+            compression=settings.SCRAPER_CACHE_COMPRESSION,
+            base_url=base_url
+        )
+        self.headers = {'User-Agent': settings.SCRAPER_USER_AGENT}
+        self.html_parser = resolve_html_parser(settings.SCRAPER_HTML_PARSER)
+        self.parse_pool: Optional[ProcessPoolExecutor] = None
+        self.throttles: Dict[str, HostThrottle] = {}
+        self.robots: Dict[str, asyncio.Future] = {}
+        self.robots_sitemaps: List[str] = []
+        # Document urls a revalidating crawl found unchanged since the previous crawl
+        self.unchanged_urls: Set[str] = set()
     
     def is_valid_url(self, url: str) -> bool:
         """Check if URL belongs to the base domain"""
@@ -33,158 +78,340 @@ class WebScraper:
         text = ' '.join(text.split())
         return text.strip()
     
+    def parse_page(self, url: str, html: bytes) -> Tuple[Optional[Dict[str, str]], List[str]]:
+        """
+        Parse a fetched page once for both its content and its links
+        
+        Args:
+            url: Page URL (base for relative links)
+            html: Raw response body
+        
+        Returns:
+            (document or None, same-domain links)
+        """
+        return self.build_document(url, extract_html(html, self.html_parser))
+    
+    async def aparse_page(self, url: str, html: bytes) -> Tuple[Optional[Dict[str, str]], List[str]]:
+        """parse_page in the extraction process pool, so parsing overlaps with fetching"""
+        if self.parse_pool is None:
+            return self.parse_page(url, html)
+        loop = asyncio.get_running_loop()
+        extracted = await loop.run_in_executor(self.parse_pool, extract_html, html, self.html_parser)
+        return self.build_document(url, extracted)
+    
+    def build_document(self, url: str, extracted: Extracted) -> Tuple[Optional[Dict[str, str]], List[str]]:
+        """Turn an extract_html result into a document and same-domain links"""
+        title, text, hrefs = extracted
+        links = self.get_links(url, hrefs)
+        
+        if text is None:
+            return None, links
+        
+        return {
+            'url': url,
+            'title': title if title is not None else url,
+            'content': self.clean_text(text)
+        }, links
+    
     def extract_content(self, url: str) -> Dict[str, str]:
         """Extract content from a single page"""
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-            
-            # Get page title
-            title = soup.find('title')
-            title_text = title.get_text() if title else url
-            
-            # Extract main content
-            # Try to find main content areas
-            main_content = soup.find('main') or soup.find('article') or soup.find('body')
-            
-            if main_content:
-                text = main_content.get_text(separator=' ', strip=True)
-                text = self.clean_text(text)
-                
-                return {
-                    'url': url,
-                    'title': title_text,
-                    'content': text
-                }
-            
-            return None
+            with httpx.Client(timeout=settings.SCRAPER_TIMEOUT, headers=self.headers, follow_redirects=True) as client:
+                response = client.get(url)
+                response.raise_for_status()
             
+            doc, _ = self.parse_page(url, response.content)
+            return doc
+        
         except Exception as e:
             logger.error(f"Error extracting content from {url}: {e}")
             return None
     
-    def get_links(self, url: str, soup: BeautifulSoup) -> List[str]:
-        """Extract all valid links from a page"""
+    def get_links(self, url: str, hrefs: List[str]) -> List[str]:
+        """Resolve a page's href values into valid links"""
         links = []
-        for link in soup.find_all('a', href=True):
-            href = link['href']
+        for href in hrefs:
             full_url = urljoin(url, href)
             
-            # Only include URLs from the same domain
-            if self.is_valid_url(full_url) and full_url not in self.visited_urls:
-                # Remove fragments
-                full_url = full_url.split('#')[0]
-                links.append(full_url)
+            # Only include URLs from the same domain (the frontier drops ones already seen)
+            if urlparse(full_url).scheme in ('http', 'https') and self.is_valid_url(full_url):
+                links.append(canonicalize_url(full_url))
         
         return links
     
-    def save_to_file(self, documents: List[Dict[str, str]]) -> None:
-        """Save scraped documents to a JSON file"""
+    def save_to_file(self, documents: Iterable[Dict[str, str]]) -> None:
+        """Replace the document cache with these documents"""
         try:
-            # Create data directory if it doesn't exist
-            os.makedirs("data", exist_ok=True)
-            
-            cache_data = {
-                "base_url": self.base_url,
-                "scraped_at": datetime.now().isoformat(),
-                "total_documents": len(documents),
-                "documents": documents
-            }
-            
-            file_path = os.path.join("data", self.cache_file)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"Saved {len(documents)} documents to {file_path}")
-            
+            self.cache.replace_all(documents)
+            logger.info(f"Saved {len(self.cache)} documents to {self.cache.path}")
+        
         except Exception as e:
             logger.error(f"Error saving documents to file: {e}")
             raise
     
-    def load_from_file(self) -> List[Dict[str, str]]:
-        """Load scraped documents from a JSON file"""
+    def load_from_file(self) -> Sequence[Dict[str, str]]:
+        """
+        Open the document cache without reading it
+        
+        Returns:
+            Cached documents, read from disk as they are accessed (empty if nothing was cached)
+        """
+        if not len(self.cache):
+            logger.info(f"Cache file {self.cache.path} does not exist")
+        else:
+            logger.info(f"Loaded {len(self.cache)} documents from cache (scraped at: {self.cache.scraped_at or 'Unknown'})")
+        return self.cache.documents()
+    
+    async def _load_robots(self, client: httpx.AsyncClient, host: str) -> Optional[RobotFileParser]:
+        """Fetch and parse robots.txt for a host (None = no rules, everything allowed)"""
+        robots_url = f"{urlparse(self.base_url).scheme}://{host}/robots.txt"
         try:
-            file_path = os.path.join("data", self.cache_file)
-            
-            if not os.path.exists(file_path):
-                logger.info(f"Cache file {file_path} does not exist")
-                return []
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
-            documents = cache_data.get("documents", [])
-            scraped_at = cache_data.get("scraped_at", "Unknown")
-            
-            logger.info(f"Loaded {len(documents)} documents from cache (scraped at: {scraped_at})")
-            return documents
-            
+            response = await client.get(robots_url)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not fetch {robots_url}, crawling without it: {e}")
+            return None
+        if response.status_code >= 400:
+            return None
+        
+        parser = RobotFileParser(robots_url)
+        parser.parse(response.text.splitlines())
+        self.robots_sitemaps.extend(parser.site_maps() or [])
+        delay = parser.crawl_delay(settings.SCRAPER_USER_AGENT)
+        if delay:
+            self._throttle(host).slow_down(float(delay))
+            logger.info(f"Honoring robots.txt Crawl-delay of {delay}s for {host}")
+        return parser
+    
+    def _throttle(self, host: str) -> HostThrottle:
+        if host not in self.throttles:
+            self.throttles[host] = HostThrottle(
+                settings.SCRAPER_PER_HOST_CONCURRENCY,
+                settings.SCRAPER_PER_HOST_RPS
+            )
+        return self.throttles[host]
+    
+    async def _allowed(self, client: httpx.AsyncClient, url: str) -> bool:
+        """Check robots.txt for a URL, fetching each host's rules once"""
+        if not settings.SCRAPER_RESPECT_ROBOTS:
+            return True
+        host = urlparse(url).netloc
+        if host not in self.robots:
+            self.robots[host] = asyncio.ensure_future(self._load_robots(client, host))
+        parser = await self.robots[host]
+        return parser is None or parser.can_fetch(settings.SCRAPER_USER_AGENT, url)
+    
+    async def _fetch(self, client: httpx.AsyncClient, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET a page within its host's politeness budget (a 304 is returned, not raised)"""
+        throttle = self._throttle(urlparse(url).netloc)
+        async with throttle.semaphore:
+            await throttle.wait_turn()
+            response = await client.get(url, headers=headers)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+    
+    def _open_crawl_state(self) -> Optional[CrawlStateStore]:
+        """Open the crawl state store (None when conditional requests are disabled)"""
+        if not settings.SCRAPER_CONDITIONAL_REQUESTS or not settings.SCRAPER_STATE_PATH:
+            return None
+        try:
+            return CrawlStateStore(settings.SCRAPER_STATE_PATH)
         except Exception as e:
-            logger.error(f"Error loading documents from file: {e}")
-            return []
+            logger.error(f"Failed to open crawl state store {settings.SCRAPER_STATE_PATH}: {e}")
+            return None
     
-    def crawl(self) -> List[Dict[str, str]]:
-        """Crawl the website and extract content"""
-        to_visit = [self.base_url]
+    def _conditional_headers(self, url: str, page_state: Optional[Dict]) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for a page whose last response can be reused"""
+        if page_state is None:
+            return {}
+        # A 304 reuses the cached document, so pages that produced one are only revalidated while it is cached
+        if page_state['content_hash'] is not None and url not in self.cache:
+            return {}
+        headers = {}
+        if page_state['etag']:
+            headers['If-None-Match'] = page_state['etag']
+        if page_state['last_modified']:
+            headers['If-Modified-Since'] = page_state['last_modified']
+        return headers
+    
+    async def _seed_from_sitemaps(self, client: httpx.AsyncClient, frontier: URLFrontier):
+        """Enqueue the pages listed in the site's sitemaps (robots.txt Sitemap: entries or /sitemap.xml)"""
+        base = urlparse(self.base_url)
+        if settings.SCRAPER_RESPECT_ROBOTS:
+            await self._allowed(client, self.base_url)  # loads robots.txt and its Sitemap: lines
+        pending = list(self.robots_sitemaps) or [f"{base.scheme}://{base.netloc}/sitemap.xml"]
+        fetched: Set[str] = set()
+        added = 0
         
-        while to_visit and len(self.visited_urls) < self.max_pages:
-            url = to_visit.pop(0)
-            
-            if url in self.visited_urls:
+        # Sitemap indexes can nest; cap the number of files read
+        while pending and len(fetched) < settings.SCRAPER_MAX_SITEMAPS:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in fetched:
+                continue
+            fetched.add(sitemap_url)
+            try:
+                response = await self._fetch(client, sitemap_url)
+                pages, nested = parse_sitemap(response.content)
+            except Exception as e:
+                logger.warning(f"Could not read sitemap {sitemap_url}: {e}")
                 continue
             
-            logger.info(f"Crawling: {url}")
-            self.visited_urls.add(url)
+            pending.extend(nested)
+            for url, lastmod in pages:
+                if self.is_valid_url(url) and frontier.push(url, depth=0, tier=TIER_SITEMAP, lastmod=lastmod):
+                    added += 1
+        
+        if added:
+            logger.info(f"Seeded {added} URLs from {len(fetched)} sitemap file(s)")
+    
+    async def acrawl(self) -> Sequence[Dict[str, str]]:
+        """
+        Crawl the website concurrently, fetching and parsing each page once
+        
+        New and changed documents are appended to the cache as they are
+        extracted; pages the crawl no longer yields are dropped at the end.
+        
+        Returns:
+            Documents, read from the cache as they are accessed, or an empty list if
+            nothing was extracted (the cache is left as it was)
+        """
+        frontier = URLFrontier(max_depth=settings.SCRAPER_MAX_DEPTH)
+        frontier.push(self.base_url, depth=0, tier=TIER_SEED)
+        # Throttles and robots.txt lookups hold asyncio primitives bound to this run's loop
+        self.throttles, self.robots, self.robots_sitemaps = {}, {}, []
+        self.document_urls, self.unchanged_urls = set(), set()
+        state = self._open_crawl_state()
+        not_modified = 0
+        downloaded = 0
+        started = time.perf_counter()
+        
+        limits = httpx.Limits(
+            max_connections=settings.SCRAPER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SCRAPER_MAX_CONNECTIONS
+        )
+        async with httpx.AsyncClient(
+            timeout=settings.SCRAPER_TIMEOUT,
+            limits=limits,
+            headers=self.headers,
+            follow_redirects=True
+        ) as client:
             
-            try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
+            if settings.SCRAPER_USE_SITEMAP:
+                await self._seed_from_sitemaps(client, frontier)
+            
+            async def visit(url: str, depth: int):
+                nonlocal not_modified, downloaded
+                if not await self._allowed(client, url):
+                    logger.info(f"Disallowed by robots.txt: {url}")
+                    return
+                
+                logger.info(f"Crawling: {url}")
+                page_state = state.get(url) if state is not None else None
+                response = await self._fetch(client, url, self._conditional_headers(url, page_state))
+                
+                if response.status_code == 304:
+                    # Unchanged since the last crawl: reuse its document and links without parsing
+                    not_modified += 1
+                    state.touch(url)
+                    doc, new_links = self.cache.get(url), page_state['links']
+                    if doc:
+                        self.unchanged_urls.add(doc['url'])
+                else:
+                    downloaded += len(response.content)
+                    doc, new_links = await self.aparse_page(url, response.content)
+                    if state is not None:
+                        doc_hash = content_hash(doc['content']) if doc and len(doc['content']) > 100 else None
+                        # Servers without validators still resend identical pages
+                        if doc_hash and page_state and doc_hash == page_state['content_hash'] and url in self.cache:
+                            doc = self.cache.get(url)
+                            self.unchanged_urls.add(doc['url'])
+                        state.put(
+                            url,
+                            response.headers.get('etag'),
+                            response.headers.get('last-modified'),
+                            doc_hash,
+                            new_links
+                        )
                 
-                # Extract content
-                doc = self.extract_content(url)
                 if doc and len(doc['content']) > 100:  # Only include pages with substantial content
-                    self.documents.append(doc)
+                    self.document_urls.add(doc['url'])
+                    # Unchanged documents stay where they are in the cache; only new and changed ones are appended
+                    if doc['url'] not in self.unchanged_urls and self.cache.get(doc['url']) != doc:
+                        self.cache.put(doc)
                     logger.info(f"Extracted content from: {url}")
                 
                 # Get new links to visit
-                new_links = self.get_links(url, soup)
-                to_visit.extend(new_links)
-                
-                # Be respectful - add delay
-                time.sleep(0.5)
-                
-            except Exception as e:
-                logger.error(f"Error crawling {url}: {e}")
+                for link in new_links:
+                    frontier.push(link, depth=depth + 1)
+            
+            async def worker():
+                while True:
+                    url, depth = await frontier.pop()
+                    try:
+                        # The frontier never hands out a URL twice
+                        if len(self.visited_urls) >= self.max_pages:
+                            continue
+                        self.visited_urls.add(url)
+                        await visit(url, depth)
+                    except Exception as e:
+                        logger.error(f"Error crawling {url}: {e}")
+                    finally:
+                        frontier.task_done()
+            
+            # Politeness is enforced per host; the worker count only caps pages in flight
+            if settings.SCRAPER_PARSE_WORKERS > 0:
+                self.parse_pool = ProcessPoolExecutor(max_workers=settings.SCRAPER_PARSE_WORKERS)
+            workers = [asyncio.create_task(worker()) for _ in range(settings.SCRAPER_MAX_CONNECTIONS)]
+            try:
+                await frontier.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if self.parse_pool is not None:
+                    self.parse_pool.shutdown()
+                    self.parse_pool = None
         
-        logger.info(f"Crawled {len(self.visited_urls)} pages, extracted {len(self.documents)} documents")
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Crawled {len(self.visited_urls)} pages, extracted {len(self.document_urls)} documents "
+            f"in {elapsed:.1f}s ({len(self.visited_urls) / max(elapsed, 1e-9):.1f} pages/sec); {frontier.stats()}"
+        )
+        if state is not None:
+            logger.info(
+                f"Revalidation: {not_modified} pages not modified (304), {len(self.unchanged_urls)} documents unchanged, "
+                f"{len(self.document_urls) - len(self.unchanged_urls)} new or changed, {downloaded / 1024:.0f} KB downloaded"
+            )
         
-        # Save to file for future use
-        if self.documents:
-            self.save_to_file(self.documents)
+        if not self.document_urls:
+            self.cache.flush()
+            return []
         
-        return self.documents
+        # Pages that disappeared or fell out of the crawl leave the cache
+        self.cache.retain(self.document_urls)
+        self.cache.flush()
+        self.cache.compact()
+        logger.info(f"Saved {len(self.cache)} documents to {self.cache.path}")
+        return self.cache.documents()
+    
+    def crawl(self) -> Sequence[Dict[str, str]]:
+        """Crawl the website and extract content"""
+        return asyncio.run(self.acrawl())
     
-    def crawl_or_load(self, force_refresh: bool = False) -> List[Dict[str, str]]:
+    def crawl_or_load(self, force_refresh: bool = False) -> Sequence[Dict[str, str]]:
         """
         Crawl website or load from cache
         
         Args:
             force_refresh: If True, always crawl fresh. If False, try to load from cache first.
-            
+        
         Returns:
-            List of documents
+            Documents (a list-compatible sequence read from the on-disk cache)
         """
         if not force_refresh:
             # Try to load from cache first
             cached_documents = self.load_from_file()
-            if cached_documents:
+            if len(cached_documents):
                 logger.info("Using cached content. Set force_refresh=True to crawl fresh.")
                 return cached_documents
         
@@ -193,7 +420,7 @@ class WebScraper:
         return self.crawl()
 
 
-def scrape_website(base_url: str, max_pages: int = 50, force_refresh: bool = False) -> List[Dict[str, str]]:
+def scrape_website(base_url: str, max_pages: int = 50, force_refresh: bool = False) -> Sequence[Dict[str, str]]:
     """
     Scrape a website and return documents (with caching)
     
@@ -201,9 +428,9 @@ def scrape_website(base_url: str, max_pages: int = 50, force_refresh: bool = Fal
         base_url: The base URL to start crawling from
         max_pages: Maximum number of pages to crawl
         force_refresh: If True, always crawl fresh. If False, try to load from cache first.
-        
+    
     Returns:
-        List of documents with url, title, and content
+        Documents with url, title, and content (read from the cache as they are accessed)
     """
     scraper = WebScraper(base_url, max_pages)
     return scraper.crawl_or_load(force_refresh=force_refresh)
@@ -0,0 +1,141 @@
+"""
+URL frontier for the crawler
+Canonicalizes URLs, deduplicates everything ever enqueued, and hands out
+URLs by priority: the start page, then sitemap entries (most recently
+modified first), then discovered links (shallowest first)
+"""
+import asyncio
+import itertools
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl"}
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Priority tiers, lowest served first
+TIER_SEED = 0
+TIER_SITEMAP = 1
+TIER_LINK = 2
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so variants of the same page compare equal
+    
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes (except the root), and sorts the query.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    
+    path = parsed.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    )
+    return urlunparse((scheme, host, path, "", urlencode(query), ""))
+
+
+def parse_sitemap(xml: bytes) -> Tuple[List[Tuple[str, Optional[float]]], List[str]]:
+    """
+    Parse a sitemap or sitemap index
+    
+    Returns:
+        ([(page url, lastmod timestamp or None)], [nested sitemap urls])
+    """
+    root = ET.fromstring(xml)
+    pages, sitemaps = [], []
+    for element in root:
+        tag = element.tag.rsplit("}", 1)[-1]
+        loc = lastmod = None
+        for child in element:
+            name = child.tag.rsplit("}", 1)[-1]
+            if name == "loc":
+                loc = (child.text or "").strip()
+            elif name == "lastmod":
+                lastmod = (child.text or "").strip()
+        if not loc:
+            continue
+        if tag == "sitemap":
+            sitemaps.append(loc)
+        elif tag == "url":
+            pages.append((loc, _parse_lastmod(lastmod)))
+    return pages, sitemaps
+
+
+def _parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """W3C datetime (2024-05-01 or 2024-05-01T10:00:00+00:00) to a timestamp"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class URLFrontier:
+    """Priority queue of URLs to crawl with O(1) dedup of everything seen"""
+    
+    def __init__(self, max_depth: int = 5):
+        """
+        Args:
+            max_depth: Links more than this many hops from a seed are not enqueued
+        """
+        self.max_depth = max_depth
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.seen: Set[str] = set()
+        self.counter = itertools.count()  # FIFO order within equal priorities
+        self.duplicates = 0
+        self.too_deep = 0
+    
+    def push(self, url: str, depth: int = 0, tier: int = TIER_LINK, lastmod: Optional[float] = None) -> bool:
+        """
+        Enqueue a URL unless it (in canonical form) was enqueued before
+        
+        Returns:
+            True if the URL was added
+        """
+        if depth > self.max_depth:
+            self.too_deep += 1
+            return False
+        url = canonicalize_url(url)
+        if url in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(url)
+        
+        # Sitemap pages: newest first, undated ones after; links: shallowest first
+        if tier == TIER_SITEMAP:
+            rank = -lastmod if lastmod is not None else 0.0
+        else:
+            rank = float(depth)
+        self.queue.put_nowait((tier, rank, next(self.counter), url, depth))
+        return True
+    
+    async def pop(self) -> Tuple[str, int]:
+        """Wait for the next (url, depth)"""
+        _, _, _, url, depth = await self.queue.get()
+        return url, depth
+    
+    def task_done(self):
+        self.queue.task_done()
+    
+    async def join(self):
+        """Wait until every popped URL was marked done and nothing is left"""
+        await self.queue.join()
+    
+    def stats(self) -> str:
+        return f"{len(self.seen)} unique URLs enqueued, {self.duplicates} duplicates and {self.too_deep} too-deep links skipped"
@@ -0,0 +1,36 @@
+"""
+Vector store selection
+VECTOR_BACKEND=qdrant uses the Qdrant server, VECTOR_BACKEND=local the
+in-process memory-mapped index (no Qdrant needed)
+"""
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+VECTOR_BACKENDS = ("qdrant", "local")
+
+
+def create_vector_store():
+    """
+    Create the configured vector store
+    
+    Returns:
+        QdrantService or LocalVectorStore (same interface)
+    """
+    if settings.VECTOR_BACKEND not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown VECTOR_BACKEND '{settings.VECTOR_BACKEND}', expected one of {VECTOR_BACKENDS}")
+    
+    if settings.VECTOR_BACKEND == "local":
+        from app.services.local_vector_store import LocalVectorStore
+        logger.info(f"Using local vector index in {settings.LOCAL_INDEX_DIR} ({settings.LOCAL_INDEX_DTYPE})")
+        return LocalVectorStore(settings.LOCAL_INDEX_DIR, dtype=settings.LOCAL_INDEX_DTYPE)
+    
+    # Imported lazily so the local mode does not need qdrant-client installed
+    from app.services.qdrant_service import qdrant_service
+    return qdrant_service
+
+
+# Global instance
+vector_store = create_vector_store()
@@ -0,0 +1,75 @@
+"""
+Corpus version tracking
+ingest_data bumps the version whenever the indexed content changes, so
+caches in the API process can detect stale entries
+"""
+import hashlib
+import logging
+import os
+import uuid
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_cached_version = ""
+_cached_mtime = None
+
+
+def get_corpus_version() -> str:
+    """
+    Get the current corpus version
+    
+    Returns:
+        Version string, or "" if no ingestion has recorded one yet
+    """
+    global _cached_version, _cached_mtime
+    
+    try:
+        mtime = os.stat(settings.CORPUS_VERSION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return ""
+    
+    # Only re-read the file when it changed
+    if mtime != _cached_mtime:
+        with open(settings.CORPUS_VERSION_FILE, 'r', encoding='utf-8') as f:
+            _cached_version = f.read().strip()
+        _cached_mtime = mtime
+    
+    return _cached_version
+
+
+def bump_corpus_version() -> str:
+    """
+    Record a new corpus version after the indexed content changed
+    
+    Returns:
+        The new version string
+    """
+    version = uuid.uuid4().hex
+    directory = os.path.dirname(settings.CORPUS_VERSION_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    tmp_path = f"{settings.CORPUS_VERSION_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(tmp_path, settings.CORPUS_VERSION_FILE)
+    
+    logger.info(f"Corpus version bumped to {version}")
+    return version
+
+
+def chunk_key(url: str, chunk_index: int) -> str:
+    """Stable identifier for a chunk: source URL plus its position in the page"""
+    return f"{url}#{chunk_index}"
+
+
+def content_hash(text: str) -> str:
+    """Hash of chunk text, used to detect changed content"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def point_id(url: str, chunk_index: int) -> str:
+    """Deterministic vector store id for a chunk, so re-ingestion overwrites it in place"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, chunk_key(url, chunk_index)))
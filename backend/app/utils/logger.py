@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import json
 import logging
@@ -42,3 +43,34 @@ def log_query(
         db.rollback()
 
 
+async def alog_query(
+    db: AsyncSession,
+    conversation_id: str,
+    user_query: str,
+    bot_response: str,
+    sources: List[str]
+):
+    """
+    Async variant of log_query for the async request path
+    
+    Args:
+        db: Async database session
+        conversation_id: ID of the conversation
+        user_query: User's query
+        bot_response: Bot's response
+        sources: List of source URLs
+    """
+    try:
+        query_log = QueryLog(
+            conversation_id=conversation_id,
+            user_query=user_query,
+            bot_response=bot_response,
+            sources=json.dumps(sources),
+            timestamp=datetime.utcnow()
+        )
+        db.add(query_log)
+        await db.commit()
+        logger.info(f"Logged query for conversation {conversation_id}")
+    except Exception as e:
+        logger.error(f"Error logging query: {e}")
+        await db.rollback()
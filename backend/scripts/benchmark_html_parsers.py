@@ -0,0 +1,111 @@
+"""
+Compare HTML parser backends on saved pages: extraction throughput and text agreement with html.parser
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_html_parsers --fetch            # save the bundled corpus pages as fixtures once
+    python -m scripts.benchmark_html_parsers --backends html.parser lxml selectolax --workers 4
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from app.services.html_parsers import HTML_PARSERS, extract_html
+from scripts.common import load_documents
+
+DEFAULT_FIXTURES = os.path.join("data", "html_fixtures")
+
+
+def fetch_fixtures(directory: str, limit: int):
+    """Download the pages of the bundled corpus as HTML fixtures"""
+    os.makedirs(directory, exist_ok=True)
+    urls = [doc['url'] for doc in load_documents()][:limit or None]
+    with httpx.Client(timeout=10, follow_redirects=True) as client:
+        for url in urls:
+            path = os.path.join(directory, hashlib.sha1(url.encode()).hexdigest()[:16] + ".html")
+            try:
+                response = client.get(url)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"skip {url}: {e}")
+                continue
+            with open(path, 'wb') as f:
+                f.write(response.content)
+    print(f"Saved {len(os.listdir(directory))} fixtures to {directory}")
+
+
+def normalize(text) -> str:
+    return ' '.join((text or '').split())
+
+
+def jaccard(a: str, b: str) -> float:
+    """Word-set overlap between two extracted texts"""
+    words_a, words_b = set(re.findall(r"\w+", a.lower())), set(re.findall(r"\w+", b.lower()))
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory of saved .html pages")
+    parser.add_argument("--fetch", action="store_true", help="Download the bundled corpus pages into --fixtures first")
+    parser.add_argument("--limit", type=int, default=0, help="Pages to fetch (0 = all)")
+    parser.add_argument("--backends", nargs="+", default=list(HTML_PARSERS), choices=HTML_PARSERS)
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the fixtures per backend")
+    parser.add_argument("--workers", type=int, default=0, help="Also time a process pool of this size (0 = skip)")
+    args = parser.parse_args()
+    
+    if args.fetch:
+        fetch_fixtures(args.fixtures, args.limit)
+    
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    if not pages:
+        parser.error(f"No fixtures in {args.fixtures}; run with --fetch first")
+    megabytes = sum(len(page) for page in pages) / (1024 * 1024)
+    print(f"{len(pages)} pages, {megabytes:.1f} MB")
+    
+    baseline = [normalize(extract_html(page, "html.parser")[1]) for page in pages]
+    
+    header = f"{'backend':>11} | {'pages/s':>8} | {'MB/s':>6} | {'pool pages/s':>12} | {'identical':>9} | {'word overlap':>12}"
+    print(header)
+    for backend in args.backends:
+        try:
+            texts = [normalize(extract_html(page, backend)[1]) for page in pages]  # warm-up and agreement
+        except ImportError as e:
+            print(f"{backend:>11} | not installed ({e})")
+            continue
+        
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for page in pages:
+                extract_html(page, backend)
+        elapsed = time.perf_counter() - start
+        
+        pool_rate = "-"
+        if args.workers:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                list(pool.map(extract_html, pages, [backend] * len(pages), chunksize=4))  # start workers
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    list(pool.map(extract_html, pages, [backend] * len(pages), chunksize=4))
+                pool_rate = f"{len(pages) * args.repeat / (time.perf_counter() - start):.1f}"
+        
+        identical = sum(text == base for text, base in zip(texts, baseline))
+        overlap = sum(jaccard(text, base) for text, base in zip(texts, baseline)) / len(pages)
+        print(
+            f"{backend:>11} | {len(pages) * args.repeat / elapsed:>8.1f} | {megabytes * args.repeat / elapsed:>6.1f} | "
+            f"{pool_rate:>12} | {identical:>4}/{len(pages):<4} | {overlap:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
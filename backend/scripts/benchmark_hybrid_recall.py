@@ -0,0 +1,83 @@
+"""
+Recall-vs-K of dense, BM25 and hybrid (RRF) first-stage retrieval
+
+Known-item evaluation: each query is a short word window taken from a random
+indexed chunk, and a hit means that chunk is in the top K. Needs an ingested
+corpus (vector store + lexical index) and the OpenAI settings from .env.
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_hybrid_recall [--queries 100] [--window 8]
+"""
+import argparse
+import asyncio
+import random
+
+from app.core.config import settings
+from app.services.langchain_rag import rag_service
+from app.services.lexical_index import lexical_index, reciprocal_rank_fusion
+from app.services.vector_store import vector_store
+from app.utils.corpus import chunk_key
+
+K_VALUES = [1, 3, 5, 10, 20, 40]
+
+
+def make_queries(count: int, window: int, seed: int):
+    """Pick (query, target chunk key) pairs from the lexical index's chunks"""
+    docs = [doc for doc in lexical_index.documents() if len(doc['content'].split()) > window]
+    rng = random.Random(seed)
+    
+    queries = []
+    for doc in rng.sample(docs, min(count, len(docs))):
+        words = doc['content'].split()
+        start = rng.randrange(len(words) - window)
+        queries.append((" ".join(words[start:start + window]), chunk_key(doc['url'], doc['chunk_index'])))
+    return queries
+
+
+def rank_of(results, target: str):
+    """1-based rank of the target chunk, or None if missing"""
+    for rank, result in enumerate(results, start=1):
+        if chunk_key(result['url'], result['chunk_index']) == target:
+            return rank
+    return None
+
+
+async def evaluate(queries, depth: int):
+    ranks = {"dense": [], "bm25": [], "hybrid": []}
+    for query, target in queries:
+        embedding = await rag_service.aembed_query(query)
+        dense = await vector_store.asearch(query_vector=embedding, limit=depth)
+        lexical = lexical_index.search(query, limit=depth)
+        hybrid = reciprocal_rank_fusion(dense, lexical, limit=depth, k=settings.RRF_K)
+        
+        ranks["dense"].append(rank_of(dense, target))
+        ranks["bm25"].append(rank_of(lexical, target))
+        ranks["hybrid"].append(rank_of(hybrid, target))
+    return ranks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--window", type=int, default=8, help="Words per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    queries = make_queries(args.queries, args.window, args.seed)
+    if not queries:
+        raise SystemExit(f"No chunks in {settings.LEXICAL_INDEX_PATH}; run python -m app.ingest_data first")
+    
+    ranks = asyncio.run(evaluate(queries, depth=max(K_VALUES)))
+    
+    print(f"{len(queries)} known-item queries of {args.window} words")
+    print(f"{'K':>4} | " + " | ".join(f"{name:>7}" for name in ranks))
+    for k in K_VALUES:
+        recalls = [
+            sum(1 for rank in method_ranks if rank is not None and rank <= k) / len(method_ranks)
+            for method_ranks in ranks.values()
+        ]
+        print(f"{k:>4} | " + " | ".join(f"{recall:>7.1%}" for recall in recalls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Compare Qdrant REST and gRPC transports: upsert throughput and search latency
+
+Uses a throwaway collection sized like ours (a few hundred chunks by default),
+filled with random vectors, against the Qdrant configured in .env.
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_qdrant_transport [--points 500] [--queries 200] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.qdrant_service import QdrantService
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+async def run_transport(prefer_grpc: bool, vectors: np.ndarray, queries: np.ndarray, concurrency: int):
+    service = QdrantService(prefer_grpc=prefer_grpc, collection_name=f"{settings.QDRANT_COLLECTION_NAME}_bench")
+    service.delete_collection()
+    service.create_collection(vector_size=vectors.shape[1])
+    
+    chunks = [
+        {'content': f"chunk {i}", 'metadata': {'url': f"https://example.com/{i}", 'title': "bench", 'chunk_index': 0}}
+        for i in range(len(vectors))
+    ]
+    
+    try:
+        start = time.perf_counter()
+        await service.aupsert_documents(chunks, vectors.tolist())
+        upsert_seconds = time.perf_counter() - start
+        
+        # Warm up the connection pool / channel before timing searches
+        await service.asearch(queries[0].tolist(), limit=settings.TOP_K_RESULTS)
+        
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            await service.asearch(query.tolist(), limit=settings.TOP_K_RESULTS)
+            latencies.append(time.perf_counter() - start)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def timed_search(query):
+            async with semaphore:
+                await service.asearch(query.tolist(), limit=settings.TOP_K_RESULTS)
+        
+        start = time.perf_counter()
+        await asyncio.gather(*[timed_search(query) for query in queries])
+        concurrent_seconds = time.perf_counter() - start
+    finally:
+        service.delete_collection()
+    
+    return {
+        'transport': "gRPC" if prefer_grpc else "REST",
+        'upsert_pts_per_s': len(vectors) / upsert_seconds,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'concurrent_qps': len(queries) / concurrent_seconds
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=500, help="Points in the benchmark collection")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--concurrency", type=int, default=8, help="Searches in flight for the throughput run")
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.points, args.dim)).astype(np.float32)
+    queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    
+    results = []
+    for prefer_grpc in (False, True):
+        # Separate event loops: the async gRPC channel is bound to the loop it was created on
+        results.append(asyncio.run(run_transport(prefer_grpc, vectors, queries, args.concurrency)))
+    
+    print(f"{args.points} points x {args.dim} dims, {args.queries} searches (limit {settings.TOP_K_RESULTS})")
+    print(f"{'transport':>9} | {'upsert pts/s':>12} | {'search p50':>10} | {'search p95':>10} | {'qps @' + str(args.concurrency):>8}")
+    for row in results:
+        print(
+            f"{row['transport']:>9} | {row['upsert_pts_per_s']:>12.0f} | {row['p50_ms']:>8.2f}ms | "
+            f"{row['p95_ms']:>8.2f}ms | {row['concurrent_qps']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare reranker backends on the bundled corpus: latency and score drift vs torch
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_rerank_backends --backends torch onnx onnx-int8
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.rerank_backends import load_rerank_backend
+from scripts.common import SAMPLE_QUERIES, load_passages
+
+
+def rank(values: np.ndarray) -> np.ndarray:
+    """Ranks of values (0 = smallest), used for Spearman correlation"""
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values)] = np.arange(len(values))
+    return ranks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="BAAI/bge-reranker-v2-m3")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--cache-dir", default="./data/onnx")
+    parser.add_argument("--pairs", type=int, default=20, help="Pairs per request (TOP_K_RESULTS)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--top-k", type=int, default=5, help="Top-k used for ranking overlap")
+    args = parser.parse_args()
+    
+    passages = load_passages()
+    rng = random.Random(0)
+    requests = [
+        [[query, passage[:512]] for passage in rng.sample(passages, args.pairs)]
+        for query in SAMPLE_QUERIES
+    ]
+    
+    results = {}
+    for name in args.backends:
+        print(f"Loading backend: {name}")
+        backend = load_rerank_backend(name, args.model, cache_dir=args.cache_dir, device="cpu")
+        if backend.name != name:
+            print(f"  Skipping {name}: loaded {backend.name} instead")
+            continue
+        
+        backend.predict(requests[0], batch_size=args.batch_size)  # Warm-up
+        latencies, scores = [], []
+        for pairs in requests:
+            start = time.perf_counter()
+            scores.append(np.asarray(backend.predict(pairs, batch_size=args.batch_size)))
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[name] = (np.array(latencies), scores)
+    
+    baseline = results.get("torch")
+    print()
+    print(f"{'backend':>10} | {'p50 ms':>8} | {'p95 ms':>8} | {'max |Δ|':>8} | {'mean |Δ|':>8} | {'spearman':>8} | {f'top-{args.top_k} overlap':>14}")
+    for name, (latencies, scores) in results.items():
+        row = f"{name:>10} | {np.percentile(latencies, 50):>8.1f} | {np.percentile(latencies, 95):>8.1f}"
+        if baseline is None:
+            print(row)
+            continue
+        
+        diffs, correlations, overlaps = [], [], []
+        for reference, candidate in zip(baseline[1], scores):
+            diffs.append(np.abs(reference - candidate))
+            correlations.append(np.corrcoef(rank(reference), rank(candidate))[0, 1])
+            top_ref = set(np.argsort(-reference)[:args.top_k])
+            top_cand = set(np.argsort(-candidate)[:args.top_k])
+            overlaps.append(len(top_ref & top_cand) / args.top_k)
+        diffs = np.concatenate(diffs)
+        print(
+            f"{row} | {diffs.max():>8.4f} | {diffs.mean():>8.4f} | "
+            f"{np.mean(correlations):>8.4f} | {np.mean(overlaps):>14.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
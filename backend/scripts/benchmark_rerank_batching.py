@@ -0,0 +1,69 @@
+"""
+Benchmark reranker throughput under concurrent load, with and without micro-batching
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_rerank_batching --concurrency 1 4 8 16
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sentence_transformers import CrossEncoder
+
+from app.services.rerank_batcher import RerankBatcher
+from scripts.common import SAMPLE_QUERIES, load_passages
+
+
+def run_load(score_fn, requests, concurrency: int) -> float:
+    """Score every request with the given concurrency, returning pairs/sec"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(score_fn, requests))
+    elapsed = time.perf_counter() - start
+    return sum(len(pairs) for pairs in requests) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="BAAI/bge-reranker-v2-m3")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--pairs", type=int, default=20, help="Pairs per request (TOP_K_RESULTS)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Pairs per forward pass")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    
+    passages = load_passages()
+    rng = random.Random(0)
+    requests = [
+        [[rng.choice(SAMPLE_QUERIES), passage[:512]] for passage in rng.sample(passages, args.pairs)]
+        for _ in range(args.requests)
+    ]
+    
+    print(f"Loading {args.model}...")
+    model = CrossEncoder(args.model, max_length=512)
+    predict = lambda pairs: model.predict(pairs, batch_size=args.batch_size)
+    batcher = RerankBatcher(
+        predict_fn=predict,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        bucket_size=args.batch_size
+    )
+    
+    # Warm up both paths
+    predict(requests[0])
+    batcher.predict(requests[0])
+    
+    print(f"{'concurrency':>11} | {'direct pairs/s':>14} | {'batched pairs/s':>15} | {'speedup':>7}")
+    for concurrency in args.concurrency:
+        direct = run_load(predict, requests, concurrency)
+        batched = run_load(batcher.predict, requests, concurrency)
+        print(f"{concurrency:>11} | {direct:>14.1f} | {batched:>15.1f} | {batched / direct:>6.2f}x")
+    
+    print(f"Batcher stats: {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Shared helpers for the benchmark and evaluation scripts
+"""
+import json
+import os
+from typing import Dict, List
+
+DEFAULT_CORPUS = os.path.join("data", "scraped_content_www_zibtek_com.json")
+
+# Representative user questions, including out-of-scope ones
+SAMPLE_QUERIES = [
+    "What services does Zibtek offer?",
+    "Tell me about Zibtek's team",
+    "What technologies does Zibtek use?",
+    "How can I contact Zibtek?",
+    "Does Zibtek build mobile apps?",
+    "Where are Zibtek's offices located?",
+    "How does Zibtek handle software outsourcing?",
+    "What industries has Zibtek worked with?",
+    "Does Zibtek offer QA and testing services?",
+    "Can Zibtek help with cloud migration?",
+    "What is Zibtek's development process?",
+    "Who is the president of the US?",
+]
+
+
+def load_documents(path: str = DEFAULT_CORPUS) -> List[Dict[str, str]]:
+    """Load scraped documents from the bundled JSON cache"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get("documents", [])
+
+
+def load_passages(path: str = DEFAULT_CORPUS, size: int = 1000, limit: int = 0) -> List[str]:
+    """
+    Split the bundled corpus into fixed-size passages roughly matching ingestion chunks
+    
+    Args:
+        path: Scraped content JSON file
+        size: Characters per passage
+        limit: Maximum number of passages (0 = all)
+        
+    Returns:
+        List of passage strings
+    """
+    passages = []
+    for doc in load_documents(path):
+        content = doc['content']
+        for start in range(0, len(content), size):
+            passages.append(content[start:start + size])
+            if limit and len(passages) >= limit:
+                return passages
+    return passages
@@ -0,0 +1,83 @@
+"""
+Offline evaluation of the rerank cascade: rerank time saved vs change in answer sources
+
+Runs each query through retrieval twice over the same candidate set, once with
+the full reranker and once with the cascade enabled, and compares the sources.
+Needs the usual OpenAI and Qdrant settings (.env).
+
+Usage (from the backend directory):
+    python -m scripts.evaluate_rerank_cascade [--queries queries.txt]
+"""
+import argparse
+import asyncio
+from collections import Counter
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.langchain_rag import rag_service
+from app.services.vector_store import vector_store
+from app.services.reranker import reranker_service
+from scripts.common import SAMPLE_QUERIES
+
+
+async def evaluate(queries):
+    # Score every pair from scratch so both runs pay the real rerank cost
+    reranker_service.score_cache.max_size = 0
+    
+    rows = []
+    for query in queries:
+        embedding = await rag_service.aembed_query(query)
+        candidates = await vector_store.asearch(query_vector=embedding, limit=settings.TOP_K_RESULTS)
+        
+        settings.RERANK_CASCADE_ENABLED = False
+        full = await rag_service.aselect_context(query, candidates)
+        settings.RERANK_CASCADE_ENABLED = True
+        cascade = await rag_service.aselect_context(query, candidates)
+        
+        full_sources, cascade_sources = set(full.sources), set(cascade.sources)
+        union = full_sources | cascade_sources
+        rows.append({
+            'query': query,
+            'path': cascade.rerank_path,
+            'full_ms': full.rerank_ms,
+            'cascade_ms': cascade.rerank_ms,
+            'jaccard': len(full_sources & cascade_sources) / len(union) if union else 1.0,
+            'top1_match': full.sources[:1] == cascade.sources[:1]
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="File with one query per line (default: built-in sample queries)")
+    args = parser.parse_args()
+    
+    queries = SAMPLE_QUERIES
+    if args.queries:
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+    
+    if not reranker_service.is_enabled():
+        raise SystemExit("Reranker is not enabled; nothing to evaluate")
+    
+    rows = asyncio.run(evaluate(queries))
+    
+    print(f"{'path':>8} | {'full ms':>8} | {'cascade ms':>10} | {'jaccard':>7} | top-1 | query")
+    for row in rows:
+        print(
+            f"{row['path']:>8} | {row['full_ms']:>8.1f} | {row['cascade_ms']:>10.1f} | "
+            f"{row['jaccard']:>7.2f} | {'yes' if row['top1_match'] else 'no':>5} | {row['query'][:60]}"
+        )
+    
+    full_ms = np.array([row['full_ms'] for row in rows])
+    cascade_ms = np.array([row['cascade_ms'] for row in rows])
+    print()
+    print(f"Paths taken: {dict(Counter(row['path'] for row in rows))}")
+    print(f"Median rerank time: {np.median(full_ms):.1f} ms full → {np.median(cascade_ms):.1f} ms cascade")
+    print(f"Mean source Jaccard: {np.mean([row['jaccard'] for row in rows]):.3f}")
+    print(f"Top-1 source agreement: {np.mean([row['top1_match'] for row in rows]):.1%}")
+
+
+if __name__ == "__main__":
+    main()
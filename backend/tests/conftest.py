@@ -0,0 +1,7 @@
+import os
+
+# Settings require an API key; tests never call OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "test")
+# Import-time services: no Qdrant server and no reranker model download
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("USE_RERANKER", "false")
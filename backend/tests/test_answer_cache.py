@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import answer_cache
+from app.services.answer_cache import SemanticAnswerCache
+from app.utils import corpus
+from app.utils.corpus import bump_corpus_version, get_corpus_version
+
+
+@pytest.fixture(autouse=True)
+def corpus_version_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CORPUS_VERSION_FILE", str(tmp_path / "data" / "corpus_version"))
+    monkeypatch.setattr(corpus, "_cached_version", "")
+    monkeypatch.setattr(corpus, "_cached_mtime", None)
+
+
+def test_hit_on_a_nearby_query():
+    cache = SemanticAnswerCache(max_distance=0.03)
+    cache.store([1.0, 0.0], "We build web apps", ["https://example.com/web"])
+    
+    hit = cache.lookup([10.0, 0.5])
+    assert hit['answer'] == "We build web apps"
+    assert hit['sources'] == ["https://example.com/web"]
+    assert hit['distance'] == pytest.approx(1 - 10 / (10.0 ** 2 + 0.25) ** 0.5, abs=1e-6)
+    
+    assert cache.lookup([0.0, 1.0]) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_corpus_version_bump_invalidates_answers():
+    assert get_corpus_version() == ""
+    cache = SemanticAnswerCache()
+    cache.store([1.0, 0.0], "old answer", [])
+    assert cache.lookup([1.0, 0.0]) is not None
+    
+    version = bump_corpus_version()
+    assert get_corpus_version() == version
+    assert cache.lookup([1.0, 0.0]) is None
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["corpus_version"] == version
+    
+    # Answers stored after the bump are served again
+    cache.store([1.0, 0.0], "new answer", [])
+    assert cache.lookup([1.0, 0.0])['answer'] == "new answer"
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(answer_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    cache = SemanticAnswerCache(ttl=60)
+    cache.store([1.0, 0.0], "answer", [])
+    
+    clock.now += 61
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction():
+    cache = SemanticAnswerCache(max_size=2)
+    cache.store([1.0, 0.0, 0.0], "a", [])
+    cache.store([0.0, 1.0, 0.0], "b", [])
+    assert cache.lookup([1.0, 0.0, 0.0])['answer'] == "a"
+    cache.store([0.0, 0.0, 1.0], "c", [])
+    
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0])['answer'] == "a"
+
+
+def test_zero_size_disables_the_cache():
+    cache = SemanticAnswerCache(max_size=0)
+    cache.store([1.0], "answer", [])
+    assert cache.lookup([1.0]) is None
@@ -0,0 +1,153 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import crawl_state, scraper
+from app.services.crawl_state import CrawlStateStore
+from app.services.scraper import WebScraper
+
+BASE_URL = "https://example.com/"
+
+PAGES = {
+    "/": ("Home", "/about"),
+    "/about": ("About", "/"),
+}
+
+
+def page_html(title, link):
+    body = f"{title} page. " + "Plenty of text about the company and its services. " * 5
+    return f"<html><head><title>{title}</title></head><body><p>{body}</p><a href=\"{link}\">next</a></body></html>"
+
+
+class FakeSite:
+    """Serves PAGES with an ETag per page, answering matching If-None-Match with a 304"""
+    
+    def __init__(self):
+        self.etags = {path: '"v1"' for path in PAGES}
+        self.requests = []
+    
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append((path, request.headers.get('if-none-match')))
+        if path not in PAGES:
+            return httpx.Response(404)
+        etag = self.etags[path]
+        if request.headers.get('if-none-match') == etag:
+            return httpx.Response(304, headers={'ETag': etag})
+        return httpx.Response(200, headers={'ETag': etag}, html=page_html(*PAGES[path]))
+
+
+@pytest.fixture
+def site(monkeypatch, tmp_path):
+    """A WebScraper factory crawling FakeSite, with its cache and crawl state under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "SCRAPER_RESPECT_ROBOTS", False)
+    monkeypatch.setattr(settings, "SCRAPER_USE_SITEMAP", False)
+    monkeypatch.setattr(settings, "SCRAPER_PARSE_WORKERS", 0)
+    monkeypatch.setattr(settings, "SCRAPER_PER_HOST_RPS", 0.0)
+    monkeypatch.setattr(settings, "SCRAPER_CONDITIONAL_REQUESTS", True)
+    monkeypatch.setattr(settings, "SCRAPER_STATE_PATH", str(tmp_path / "crawl_state.db"))
+    
+    fake = FakeSite()
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(
+        scraper.httpx, "AsyncClient",
+        lambda **kwargs: client_class(transport=httpx.MockTransport(fake), **kwargs)
+    )
+    return SimpleNamespace(fake=fake, scraper=lambda: WebScraper(BASE_URL, max_pages=10))
+
+
+def test_put_get_round_trip(tmp_path):
+    store = CrawlStateStore(str(tmp_path / "state" / "crawl.db"))
+    store.put(BASE_URL, '"abc"', "Mon, 01 Jan 2024 00:00:00 GMT", "hash-1", [BASE_URL + "about"])
+    store.put(BASE_URL + "empty", None, None, None, [])
+    
+    page = store.get(BASE_URL)
+    assert page['etag'] == '"abc"'
+    assert page['last_modified'] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert page['content_hash'] == "hash-1"
+    assert page['links'] == [BASE_URL + "about"]
+    assert store.get(BASE_URL + "empty")['content_hash'] is None
+    assert store.get(BASE_URL + "missing") is None
+    assert len(store) == 2
+
+
+def test_put_replaces_and_state_survives_reopen(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    store = CrawlStateStore(path)
+    store.put(BASE_URL, '"v1"', None, "hash-1", [])
+    store.put(BASE_URL, '"v2"', None, "hash-2", [BASE_URL + "new"])
+    store.conn.close()
+    
+    reopened = CrawlStateStore(path)
+    assert len(reopened) == 1
+    assert reopened.get(BASE_URL)['etag'] == '"v2"'
+    assert reopened.get(BASE_URL)['links'] == [BASE_URL + "new"]
+
+
+def test_touch_only_updates_fetch_time(tmp_path, monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(crawl_state, "time", SimpleNamespace(time=lambda: clock.now))
+    store = CrawlStateStore(str(tmp_path / "crawl.db"))
+    store.put(BASE_URL, '"v1"', "yesterday", "hash-1", [BASE_URL + "about"])
+    before = store.get(BASE_URL)
+    
+    clock.now = 2000.0
+    store.touch(BASE_URL)
+    store.touch(BASE_URL + "missing")
+    after = store.get(BASE_URL)
+    
+    assert before['fetched_at'] == 1000.0
+    assert after == {**before, 'fetched_at': 2000.0}
+    assert store.get(BASE_URL + "missing") is None
+
+
+def test_conditional_headers(site):
+    crawler = site.scraper()
+    state = {'etag': '"v1"', 'last_modified': "yesterday", 'content_hash': None, 'links': []}
+    
+    assert crawler._conditional_headers(BASE_URL, None) == {}
+    # Pages without a document can always be revalidated
+    assert crawler._conditional_headers(BASE_URL, state) == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': "yesterday"
+    }
+    assert crawler._conditional_headers(BASE_URL, {**state, 'last_modified': None}) == {'If-None-Match': '"v1"'}
+    # A 304 for a document that left the cache would have nothing to reuse
+    assert crawler._conditional_headers(BASE_URL, {**state, 'content_hash': "hash-1"}) == {}
+    crawler.cache.put({'url': BASE_URL, 'title': "Home", 'content': "cached"})
+    assert crawler._conditional_headers(BASE_URL, {**state, 'content_hash': "hash-1"})['If-None-Match'] == '"v1"'
+
+
+def test_recrawl_reuses_documents_on_304(site):
+    first = list(site.scraper().crawl())
+    assert sorted(d['title'] for d in first) == ["About", "Home"]
+    assert all(etag is None for _, etag in site.fake.requests)
+    
+    site.fake.requests.clear()
+    crawler = site.scraper()
+    
+    async def no_parse(url, html):
+        raise AssertionError(f"{url} should not be parsed")
+    
+    crawler.aparse_page = no_parse
+    second = list(crawler.crawl())
+    
+    assert sorted(site.fake.requests) == [("/", '"v1"'), ("/about", '"v1"')]
+    assert second == first
+    assert crawler.unchanged_urls == {d['url'] for d in first}
+
+
+def test_recrawl_fetches_changed_pages(site):
+    site.scraper().crawl()
+    site.fake.etags["/about"] = '"v2"'
+    
+    crawler = site.scraper()
+    crawler.crawl()
+    
+    state = CrawlStateStore(settings.SCRAPER_STATE_PATH)
+    assert state.get(BASE_URL + "about")['etag'] == '"v2"'
+    # The page was resent in full but its text is unchanged, so its document is reused
+    assert len(crawler.unchanged_urls) == 2
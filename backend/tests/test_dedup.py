@@ -0,0 +1,108 @@
+from app.services.dedup import CorpusDeduplicator, lsh_bands
+
+CTA = " ".join(f"cta{i}" for i in range(30))
+
+
+def page(path, content):
+    return {'url': f"https://example.com{path}", 'title': path, 'content': content}
+
+
+def words(prefix, count=40):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def paragraph_chunks(doc):
+    """Chunk on blank lines, like a splitter with one paragraph per chunk"""
+    for i, text in enumerate(part for part in doc['content'].split("\n\n") if part.strip()):
+        yield {'content': text, 'metadata': {'url': doc['url'], 'title': doc['title'], 'chunk_index': i}}
+
+
+def run(documents, **options):
+    deduplicator = CorpusDeduplicator(**options)
+    deduplicator.fit(documents)
+    return deduplicator, list(deduplicator.iter_chunks(documents, paragraph_chunks))
+
+
+def test_boilerplate_is_kept_only_on_the_shortest_url():
+    documents = [
+        page("/services/web", f"{words('web')}\n\n{CTA}"),
+        page("/", f"{words('home')}\n\n{CTA}"),
+        page("/services/mobile", f"{words('mobile')}\n\n{CTA}"),
+    ]
+    deduplicator, chunks = run(documents)
+    
+    with_cta = [chunk['metadata']['url'] for chunk in chunks if "cta0" in chunk['content']]
+    assert with_cta == ["https://example.com/"]
+    assert deduplicator.stats['stripped_pages'] == 2
+    assert deduplicator.stats['boilerplate_words'] == 60
+    # Each page keeps its own text
+    for prefix in ("web0", "home0", "mobile0"):
+        assert any(prefix in chunk['content'] for chunk in chunks)
+
+
+def test_text_on_too_few_pages_or_too_short_is_kept():
+    short = "call us today for a free quote"
+    documents = [page(f"/{name}", f"{words(name)} {short}") for name in "abc"]
+    documents.append(page("/d", f"{words('d')}\n\n{CTA}"))
+    documents.append(page("/e", f"{words('e')}\n\n{CTA}"))
+    
+    deduplicator, chunks = run(documents)
+    assert deduplicator.stats['boilerplate_blocks'] == 0
+    assert sum(short in chunk['content'] for chunk in chunks) == 3
+    # Not boilerplate, but the second copy is still a duplicate chunk
+    assert deduplicator.stats['near_duplicates'] == 1
+    assert [chunk['metadata']['url'] for chunk in chunks if "cta0" in chunk['content']] == ["https://example.com/d"]
+
+
+def test_near_duplicate_chunks_are_dropped():
+    original = words("team", 60)
+    edited = original.replace("team7 ", "staff7 ")
+    documents = [
+        page("/about", f"{words('about')}\n\n{original}"),
+        page("/careers", f"{words('careers')}\n\n{edited}"),
+    ]
+    deduplicator, chunks = run(documents)
+    
+    assert deduplicator.stats['near_duplicates'] == 1
+    assert not any("staff7" in chunk['content'] for chunk in chunks)
+    # Kept chunks are renumbered per page
+    assert [chunk['metadata']['chunk_index'] for chunk in chunks] == [0, 1, 0]
+
+
+def test_distinct_chunks_are_kept():
+    documents = [page(f"/{name}", words(name, 60)) for name in "abcd"]
+    deduplicator, chunks = run(documents)
+    assert len(chunks) == 4
+    assert deduplicator.stats['near_duplicates'] == 0
+
+
+def test_passes_are_repeatable_and_chunk_each_page_once():
+    documents = [page(path, f"{words(path.strip('/') or 'home')}\n\n{CTA}") for path in ("/", "/a", "/b")]
+    deduplicator = CorpusDeduplicator()
+    deduplicator.fit(documents)
+    
+    calls = []
+    
+    def counting_chunks(doc):
+        calls.append(doc['url'])
+        return paragraph_chunks(doc)
+    
+    first = list(deduplicator.iter_chunks(documents, counting_chunks))
+    second = list(deduplicator.iter_chunks(documents, counting_chunks))
+    assert first == second
+    assert len(calls) == 2 * len(documents)
+
+
+def test_report_counts_savings():
+    documents = [page(path, f"{words(path.strip('/') or 'home')}\n\n{CTA}") for path in ("/", "/a", "/b")]
+    deduplicator, chunks = run(documents)
+    
+    assert deduplicator.stats['tokens_after'] == sum(len(chunk['content'].split()) for chunk in chunks)
+    assert deduplicator.stats['boilerplate_tokens'] == 60
+    assert "150 embedding tokens instead of 210 (60 saved, 29%)" in deduplicator.report()
+
+
+def test_lsh_bands_turn_near_the_threshold():
+    bands, rows = lsh_bands(0.8, 128)
+    assert bands * rows <= 128
+    assert abs((1 / bands) ** (1 / rows) - 0.8) < 0.05
@@ -0,0 +1,152 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from app.services.document_cache import DocumentCache
+
+COMPRESSIONS = ["none", "gzip", pytest.param("zstd", marks=pytest.mark.skipif(
+    importlib.util.find_spec("zstandard") is None, reason="zstandard not installed"
+))]
+
+
+def doc(name, content=None):
+    return {'url': f"https://example.com/{name}", 'title': name, 'content': content or f"About {name}"}
+
+
+@pytest.fixture(params=COMPRESSIONS)
+def open_cache(request, tmp_path):
+    """Opens the same cache file, in each compression"""
+    return lambda: DocumentCache(str(tmp_path / "scraped"), compression=request.param)
+
+
+def test_put_get_and_replace(open_cache):
+    cache = open_cache()
+    cache.put(doc("a"))
+    cache.put(doc("b"))
+    cache.put(doc("a", "About a, updated"))
+    cache.flush()
+    
+    assert len(cache) == 2
+    assert cache.get(doc("a")['url'])['content'] == "About a, updated"
+    assert cache.get("https://example.com/missing") is None
+    # Iteration follows file order, so the replaced page comes last
+    assert [d['title'] for d in cache] == ["b", "a"]
+    assert cache.dead_bytes > 0
+
+
+def test_reopen_uses_the_saved_index(open_cache):
+    cache = open_cache()
+    cache.put(doc("a"))
+    cache.flush()
+    
+    reopened = open_cache()
+    assert reopened.records == cache.records
+    assert not reopened.dirty
+
+
+def test_missing_index_is_rebuilt_from_records(open_cache):
+    cache = open_cache()
+    cache.put(doc("a"))
+    cache.put(doc("b"))
+    cache.put(doc("a", "About a, updated"))
+    cache.delete([doc("b")['url']])
+    cache.flush()
+    os.remove(cache.index_path)
+    
+    rebuilt = open_cache()
+    assert rebuilt.records == cache.records
+    assert rebuilt.dead_bytes == cache.dead_bytes
+    assert rebuilt.get(doc("a")['url'])['content'] == "About a, updated"
+    assert os.path.exists(rebuilt.index_path)
+
+
+def test_torn_tail_is_truncated(open_cache):
+    cache = open_cache()
+    cache.put(doc("a"))
+    cache.put(doc("b"))
+    cache.flush()
+    intact_size = os.path.getsize(cache.path)
+    
+    # A crawl killed halfway through writing a record; the index was not flushed
+    torn = cache._encode(doc("c"))
+    with open(cache.path, 'ab') as f:
+        f.write(torn[:len(torn) // 2])
+    
+    recovered = open_cache()
+    assert os.path.getsize(recovered.path) == intact_size
+    assert [d['title'] for d in recovered] == ["a", "b"]
+    
+    recovered.put(doc("c"))
+    recovered.flush()
+    assert [d['title'] for d in open_cache()] == ["a", "b", "c"]
+
+
+def test_compaction_drops_dead_records(open_cache):
+    cache = open_cache()
+    cache.put(doc("a"))
+    cache.put(doc("b"))
+    cache.flush()
+    
+    # Below the dead-record ratio nothing happens
+    size = os.path.getsize(cache.path)
+    cache.compact()
+    assert os.path.getsize(cache.path) == size
+    
+    for version in range(5):
+        cache.put(doc("a", f"About a, version {version}"))
+    cache.delete([doc("b")['url']])
+    cache.flush()
+    cache.compact()
+    
+    assert cache.dead_bytes == 0
+    assert os.path.getsize(cache.path) == cache.records[doc("a")['url']][1]
+    reopened = open_cache()
+    assert [d['content'] for d in reopened] == ["About a, version 4"]
+    assert not reopened.dirty
+
+
+def test_migrates_legacy_json(tmp_path):
+    base_path = str(tmp_path / "scraped")
+    with open(f"{base_path}.json", 'w', encoding='utf-8') as f:
+        json.dump({'base_url': "https://example.com", 'documents': [doc("a"), doc("b")]}, f)
+    
+    cache = DocumentCache(base_path)
+    assert cache.base_url == "https://example.com"
+    assert [d['title'] for d in cache] == ["a", "b"]
+
+
+def test_rejects_unknown_compression(tmp_path):
+    with pytest.raises(ValueError):
+        DocumentCache(str(tmp_path / "scraped"), compression="bz2")
+
+
+def test_documents_view_behaves_like_a_list(open_cache):
+    cache = open_cache()
+    assert not cache.documents()
+    for name in "abc":
+        cache.put(doc(name))
+    documents = cache.documents()
+    
+    assert len(documents) == 3
+    assert documents[0] == doc("a")
+    assert documents[-1] == doc("c")
+    assert documents[1:] == [doc("b"), doc("c")]
+    assert list(documents) == [doc("a"), doc("b"), doc("c")]
+    assert doc("b") in documents
+    with pytest.raises(IndexError):
+        documents[3]
+
+
+def test_documents_view_follows_writes_and_compaction(open_cache):
+    cache = open_cache()
+    cache.put(doc("a"))
+    cache.put(doc("b"))
+    documents = cache.documents()
+    assert documents[0] == doc("a")
+    
+    cache.put(doc("a", "About a, updated"))
+    cache.delete([doc("b")['url']])
+    cache.compact(force=True)
+    assert list(documents) == [doc("a", "About a, updated")]
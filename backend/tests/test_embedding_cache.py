@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import embedding_cache, embedding_store
+from app.services.embedding_cache import QueryEmbeddingCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    fake_time = SimpleNamespace(time=lambda: clock.now)
+    monkeypatch.setattr(embedding_cache, "time", fake_time)
+    monkeypatch.setattr(embedding_store, "time", fake_time)
+    return clock
+
+
+def test_keys_ignore_case_and_spacing_but_not_the_model():
+    cache = QueryEmbeddingCache("model-a")
+    assert cache.make_key("What  does Zibtek do?") == cache.make_key(" what does zibtek DO? ")
+    assert cache.make_key("query") != QueryEmbeddingCache("model-b").make_key("query")
+
+
+def test_lru_eviction(clock):
+    cache = QueryEmbeddingCache("model", max_size=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]
+    cache.put("c", [3.0])
+    
+    # "b" was least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.get("c") == [3.0]
+
+
+def test_ttl_expiry(clock):
+    cache = QueryEmbeddingCache("model", ttl=60)
+    cache.put("a", [1.0])
+    clock.now += 60
+    assert cache.get("a") == [1.0]
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_zero_size_disables_the_memory_tier(clock):
+    cache = QueryEmbeddingCache("model", max_size=0)
+    cache.put("a", [1.0])
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_a_restart(clock, tmp_path):
+    path = str(tmp_path / "queries.db")
+    QueryEmbeddingCache("model", disk_path=path).put("a", [0.5, 0.25])
+    
+    restarted = QueryEmbeddingCache("model", disk_path=path)
+    assert restarted.get("a") == [0.5, 0.25]
+    assert restarted.get("a") == [0.5, 0.25]
+    stats = restarted.stats()
+    assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_disk_hits_keep_their_original_age(clock, tmp_path):
+    path = str(tmp_path / "queries.db")
+    QueryEmbeddingCache("model", ttl=60, disk_path=path).put("a", [1.0])
+    clock.now += 50
+    
+    restarted = QueryEmbeddingCache("model", ttl=60, disk_path=path)
+    assert restarted.get("a") == [1.0]
+    # Promoted to memory, but still expires 60s after it was first stored
+    clock.now += 11
+    assert restarted.get("a") is None
+
+
+def test_async_variants_use_both_tiers(clock, tmp_path):
+    path = str(tmp_path / "queries.db")
+    
+    async def run():
+        await QueryEmbeddingCache("model", disk_path=path).aput("a", [1.0])
+        restarted = QueryEmbeddingCache("model", disk_path=path)
+        return await restarted.aget("a"), await restarted.aget("missing"), restarted.stats()
+    
+    vector, missing, stats = asyncio.run(run())
+    assert vector == [1.0]
+    assert missing is None
+    assert stats["hit_rate"] == 0.5
+
+
+def test_unreadable_disk_tier_falls_back_to_memory(clock, tmp_path):
+    cache = QueryEmbeddingCache("model", disk_path=str(tmp_path))  # a directory, not a database
+    assert cache.disk is None
+    cache.put("a", [1.0])
+    assert cache.get("a") == [1.0]
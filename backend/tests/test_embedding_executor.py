@@ -0,0 +1,100 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import embedding_executor
+from app.services.embedding_executor import EmbeddingExecutor, RateLimiter
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the limiter sleeps"""
+    
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+    
+    def monotonic(self):
+        return self.now
+    
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(embedding_executor, "time", SimpleNamespace(monotonic=clock.monotonic, perf_counter=time.perf_counter))
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def acquire_all(limiter, *tokens):
+    async def run():
+        for count in tokens:
+            await limiter.acquire(count)
+    asyncio.run(run())
+
+
+def test_unlimited_limiter_never_waits(clock):
+    acquire_all(RateLimiter(), *[10 ** 6] * 5)
+    assert clock.sleeps == []
+
+
+def test_requests_per_minute(clock):
+    acquire_all(RateLimiter(requests_per_minute=2), 1, 1, 1)
+    # The third request waits for one request's worth of refill
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+
+def test_tokens_per_minute(clock):
+    acquire_all(RateLimiter(tokens_per_minute=100), 80, 50)
+    # 20 tokens left, 30 more refill at 100 per minute
+    assert clock.sleeps == [pytest.approx(18.0)]
+
+
+def test_batch_over_the_minute_budget_still_runs(clock):
+    acquire_all(RateLimiter(tokens_per_minute=100), 500)
+    assert clock.sleeps == []
+
+
+def test_idle_refill_is_capped_at_the_budget(clock):
+    limiter = RateLimiter(requests_per_minute=2)
+    clock.now = 3600.0
+    acquire_all(limiter, 1, 1, 1)
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def test_make_batches_respects_token_budget():
+    executor = EmbeddingExecutor(embed_fn=None, count_tokens=word_count, max_batch_tokens=5)
+    texts = ["a b", "c d", "e f", "g", "h i j k l m"]
+    
+    assert executor.make_batches(texts) == [
+        (0, ["a b", "c d"], 4),
+        (2, ["e f", "g"], 3),
+        # A text over the budget still gets a batch of its own
+        (4, ["h i j k l m"], 6),
+    ]
+
+
+def test_make_batches_respects_batch_size():
+    executor = EmbeddingExecutor(embed_fn=None, count_tokens=word_count, max_batch_size=2)
+    batches = executor.make_batches(["a", "b", "c", "d", "e"])
+    assert [(start, texts) for start, texts, _ in batches] == [(0, ["a", "b"]), (2, ["c", "d"]), (4, ["e"])]
+
+
+def test_embed_keeps_vectors_aligned_across_concurrent_batches():
+    async def embed_fn(texts):
+        # Later batches finish first
+        await asyncio.sleep(0.01 / len(texts[0]))
+        return [[float(len(text))] for text in texts]
+    
+    executor = EmbeddingExecutor(embed_fn=embed_fn, count_tokens=word_count, max_batch_size=1, concurrency=4)
+    texts = ["a", "bb", "ccc", "dddd"]
+    assert asyncio.run(executor.embed(texts)) == [[1.0], [2.0], [3.0], [4.0]]
@@ -0,0 +1,91 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import embedding_store
+from app.services.embedding_store import EmbeddingStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(embedding_store, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_vectors_round_trip_as_float32(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "store.db"))
+    store.put("a", [0.5, -1.25, 3.0])
+    store.put("b", [0.1])
+    
+    assert store.get("a") == [0.5, -1.25, 3.0]
+    assert store.get("b") == pytest.approx([0.1])
+    assert store.get("missing") is None
+    assert len(store) == 2
+
+
+def test_reopen_keeps_vectors(tmp_path):
+    path = str(tmp_path / "nested" / "store.db")
+    EmbeddingStore(path).put_many([("a", [1.0]), ("b", [2.0])])
+    assert EmbeddingStore(path).get_many(["a", "b", "c"]) == {"a": [1.0], "b": [2.0]}
+
+
+def test_get_many_spans_query_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(EmbeddingStore, "QUERY_BATCH_SIZE", 2)
+    store = EmbeddingStore(str(tmp_path / "store.db"))
+    store.put_many([(str(i), [float(i)]) for i in range(5)])
+    assert store.get_many([str(i) for i in range(5)]) == {str(i): [float(i)] for i in range(5)}
+
+
+def test_put_replaces_and_max_age_expires(tmp_path, clock):
+    store = EmbeddingStore(str(tmp_path / "store.db"))
+    store.put("a", [1.0])
+    clock.now += 100
+    assert store.get("a", max_age=60) is None
+    
+    store.put("a", [2.0])
+    assert store.get("a", max_age=60) == [2.0]
+    assert store.get_entry("a") == ([2.0], clock.now)
+
+
+def test_prunes_least_recently_used(tmp_path, clock):
+    store = EmbeddingStore(str(tmp_path / "store.db"), max_entries=2)
+    store.put("a", [1.0])
+    clock.now += 1
+    store.put("b", [2.0])
+    clock.now += 1
+    # Reading "a" makes "b" the least recently used
+    assert store.get("a") == [1.0]
+    clock.now += 1
+    store.put("c", [3.0])
+    
+    assert len(store) == 2
+    assert store.get_many(["a", "b", "c"]) == {"a": [1.0], "c": [3.0]}
+
+
+def test_get_entry_does_not_count_as_a_use(tmp_path, clock):
+    store = EmbeddingStore(str(tmp_path / "store.db"), max_entries=2)
+    store.put("a", [1.0])
+    clock.now += 1
+    store.put("b", [2.0])
+    clock.now += 1
+    store.get_entry("a")
+    store.put("c", [3.0])
+    
+    assert store.get("a") is None
+    assert store.get("b") == [2.0]
+
+
+def test_upgrades_stores_without_last_access(tmp_path):
+    path = str(tmp_path / "store.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)")
+    conn.execute("INSERT INTO embeddings VALUES (?, ?, ?)", ("a", EmbeddingStore.pack([1.0]), 0.0))
+    conn.commit()
+    conn.close()
+    
+    store = EmbeddingStore(path, max_entries=1)
+    assert store.get("a") == [1.0]
+    store.put("b", [2.0])
+    assert store.get_many(["a", "b"]) == {"b": [2.0]}
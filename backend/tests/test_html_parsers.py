@@ -0,0 +1,60 @@
+import importlib.util
+import sys
+
+import pytest
+
+from app.services.html_parsers import HTML_PARSERS, extract_html, resolve_html_parser
+
+MODULES = {"lxml": "lxml", "selectolax": "selectolax"}
+
+BACKENDS = [
+    pytest.param(backend, marks=pytest.mark.skipif(
+        backend in MODULES and importlib.util.find_spec(MODULES[backend]) is None,
+        reason=f"{backend} not installed"
+    ))
+    for backend in HTML_PARSERS
+]
+
+PAGE = b"""<html><head><title>Services</title><script>var tracking = 1;</script></head>
+<body>
+<header><a href="/home">Home</a></header>
+<nav><a href="/about">About us</a></nav>
+<main><h1>Custom software</h1><p>We build <a href="/apps">apps</a> and APIs.</p></main>
+<footer>Copyright</footer>
+</body></html>"""
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="SCRAPER_HTML_PARSER"):
+        resolve_html_parser("html5lib")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_installed_backend_is_kept(backend):
+    assert resolve_html_parser(backend) == backend
+
+
+@pytest.mark.parametrize("module, backend", [("lxml.html", "lxml"), ("selectolax.lexbor", "selectolax")])
+def test_missing_backend_falls_back_to_html_parser(monkeypatch, module, backend):
+    # A None entry makes the import raise ImportError
+    monkeypatch.setitem(sys.modules, module, None)
+    assert resolve_html_parser(backend) == "html.parser"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_extracts_title_main_text_and_all_links(backend):
+    title, text, hrefs = extract_html(PAGE, backend)
+    
+    assert title == "Services"
+    assert text == "Custom software We build apps and APIs."
+    # Links are collected before header/nav/footer are dropped
+    assert hrefs == ["/home", "/about", "/apps"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_falls_back_to_article_then_body(backend):
+    article = b"<html><body><nav>Menu</nav><article>Case study</article><p>Aside</p></body></html>"
+    body = b"<html><body><nav>Menu</nav><p>Plain page</p></body></html>"
+    
+    assert extract_html(article, backend)[:2] == (None, "Case study")
+    assert extract_html(body, backend)[:2] == (None, "Plain page")
@@ -0,0 +1,69 @@
+import asyncio
+import uuid
+
+from app.services.ingest_pipeline import IngestCheckpoint, IngestPipeline
+from app.services.local_vector_store import LocalVectorStore
+from app.utils.corpus import chunk_key, content_hash, point_id
+
+
+def test_point_ids_are_deterministic_uuids():
+    assert point_id("https://example.com/a", 0) == point_id("https://example.com/a", 0)
+    assert point_id("https://example.com/a", 0) != point_id("https://example.com/a", 1)
+    assert point_id("https://example.com/a", 0) != point_id("https://example.com/b", 0)
+    assert uuid.UUID(point_id("https://example.com/a", 0)).version == 5
+    assert chunk_key("https://example.com/a", 2) == "https://example.com/a#2"
+
+
+def test_content_hash_tracks_exact_text():
+    assert content_hash("We build apps") == content_hash("We build apps")
+    assert content_hash("We build apps") != content_hash("We build apps.")
+
+
+def pages(**contents):
+    """Chunks for pages given as name="first chunk|second chunk" """
+    for url, text in contents.items():
+        for chunk_index, content in enumerate(text.split("|")):
+            yield {'content': content, 'metadata': {'url': url, 'title': url, 'chunk_index': chunk_index}}
+
+
+def ingest(store, tmp_path, chunks):
+    """One ingestion run against the local store, as ingest_data drives it"""
+    embedded = []
+    
+    async def embed(texts):
+        embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+    
+    pipeline = IngestPipeline(
+        embed_fn=embed,
+        upsert_fn=store.aupsert_documents,
+        ensure_collection=lambda size: store.create_collection(vector_size=size),
+        checkpoint=IngestCheckpoint(str(tmp_path / "checkpoint.json")),
+        batch_size=2
+    )
+    pipeline.checkpoint.start()
+    stored = store.get_content_hashes() if store.collection_exists() else {}
+    result = asyncio.run(pipeline.run(chunks, stored))
+    store.flush()
+    store.delete_points(result.pop('deleted_ids'))
+    return result, embedded
+
+
+def test_reingestion_only_embeds_what_changed(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "index"))
+    result, embedded = ingest(store, tmp_path, pages(a="a0|a1", b="b0", c="c0"))
+    assert result == {'added': 4, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    
+    # a1 edited, b removed, a2 and d added
+    result, embedded = ingest(store, tmp_path, pages(a="a0|a1 edited|a2", c="c0", d="d0"))
+    assert result == {'added': 2, 'updated': 1, 'unchanged': 2, 'deleted': 1}
+    assert sorted(embedded) == ["a1 edited", "a2", "d0"]
+    
+    assert store.get_content_hashes() == {
+        point_id(url, index): content_hash(text)
+        for url, index, text in [("a", 0, "a0"), ("a", 1, "a1 edited"), ("a", 2, "a2"), ("c", 0, "c0"), ("d", 0, "d0")]
+    }
+    
+    result, embedded = ingest(store, tmp_path, pages(a="a0|a1 edited|a2", c="c0", d="d0"))
+    assert result == {'added': 0, 'updated': 0, 'unchanged': 5, 'deleted': 0}
+    assert embedded == []
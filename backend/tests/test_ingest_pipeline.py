@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+from app.services.ingest_pipeline import IngestCheckpoint, IngestPipeline
+from app.utils.corpus import content_hash, point_id
+
+TIMEOUT = 5
+
+
+def chunk(url, chunk_index=0, content=None):
+    content = content or f"{url} #{chunk_index}"
+    return {'content': content, 'metadata': {'url': url, 'title': url, 'chunk_index': chunk_index}}
+
+
+class Recorder:
+    """Stand-in embedder and vector store"""
+    
+    def __init__(self):
+        self.embedded = []
+        self.upserted = []
+        self.collections = []
+    
+    async def embed(self, texts):
+        self.embedded.append(list(texts))
+        return [[float(len(text))] for text in texts]
+    
+    async def upsert(self, batch, embeddings):
+        self.upserted.append([c['metadata']['url'] for c in batch])
+    
+    def ensure_collection(self, vector_size):
+        self.collections.append(vector_size)
+
+
+def make_pipeline(tmp_path, recorder, batch_size=2):
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.start()
+    pipeline = IngestPipeline(
+        embed_fn=recorder.embed,
+        upsert_fn=recorder.upsert,
+        ensure_collection=recorder.ensure_collection,
+        checkpoint=checkpoint,
+        batch_size=batch_size
+    )
+    return pipeline, checkpoint
+
+
+def test_only_new_and_changed_chunks_are_embedded(tmp_path):
+    recorder = Recorder()
+    pipeline, checkpoint = make_pipeline(tmp_path, recorder)
+    stored = {
+        point_id("same", 0): content_hash("same #0"),
+        point_id("edited", 0): content_hash("old text"),
+        point_id("gone", 0): content_hash("gone #0"),
+        point_id("kept", 0): content_hash("kept #0"),
+        point_id("kept", 1): content_hash("kept #1"),
+    }
+    chunks = [chunk("same"), chunk("edited"), chunk("new"), chunk("new", 1), chunk("new")]
+    
+    result = asyncio.run(pipeline.run(iter(chunks), stored, unchanged_urls=["kept"]))
+    
+    assert result == {
+        'added': 2, 'updated': 1, 'unchanged': 3, 'deleted': 1,
+        'deleted_ids': [point_id("gone", 0)]
+    }
+    assert recorder.upserted == [["edited", "new"], ["new"]]
+    assert recorder.collections == [1, 1]
+    assert checkpoint.state['chunks'] == 3
+    assert checkpoint.corpus_changed
+
+
+def test_nothing_to_embed(tmp_path):
+    recorder = Recorder()
+    pipeline, checkpoint = make_pipeline(tmp_path, recorder)
+    stored = {point_id("same", 0): content_hash("same #0")}
+    
+    result = asyncio.run(pipeline.run(iter([chunk("same")]), stored))
+    assert result['unchanged'] == 1
+    assert recorder.embedded == []
+    assert not checkpoint.corpus_changed
+
+
+def test_chunking_overlaps_embedding(tmp_path):
+    first_batch_embedded = threading.Event()
+    
+    class SignallingRecorder(Recorder):
+        async def embed(self, texts):
+            first_batch_embedded.set()
+            return await super().embed(texts)
+    
+    def chunks():
+        yield chunk("a")
+        yield chunk("b")
+        # Only possible if the embed stage runs while this generator is being advanced
+        assert first_batch_embedded.wait(TIMEOUT)
+        yield chunk("c")
+    
+    recorder = SignallingRecorder()
+    pipeline, _ = make_pipeline(tmp_path, recorder)
+    result = asyncio.run(pipeline.run(chunks(), {}))
+    
+    assert result['added'] == 3
+    assert recorder.upserted == [["a", "b"], ["c"]]
+
+
+def test_checkpoint_survives_until_cleared(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoint.json"))
+    assert not checkpoint.load()
+    checkpoint.start()
+    checkpoint.commit(5)
+    
+    resumed = IngestCheckpoint(checkpoint.path)
+    resumed.start()
+    assert resumed.state['chunks'] == 5
+    assert resumed.corpus_changed
+    
+    resumed.clear()
+    assert not IngestCheckpoint(checkpoint.path).load()
@@ -0,0 +1,193 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import langchain_rag
+from app.services.langchain_rag import rag_service
+from app.services.reranker import reranker_service
+
+
+def candidate(url, score, **fields):
+    return {'id': url, 'content': f"About {url}", 'url': url, 'title': url, 'chunk_index': 0, 'score': score, **fields}
+
+
+@pytest.fixture(autouse=True)
+def tiers(monkeypatch):
+    monkeypatch.setattr(settings, "SIMILARITY_THRESHOLD", 0.8)
+    monkeypatch.setattr(settings, "FALLBACK_SIMILARITY_THRESHOLD", 0.5)
+    monkeypatch.setattr(settings, "RERANK_THRESHOLD", 0.5)
+    monkeypatch.setattr(settings, "RERANK_CASCADE_ENABLED", False)
+
+
+@pytest.fixture
+def reranker(monkeypatch):
+    """Real reranker filtering over fixed per-URL logits; records each scoring call"""
+    calls = []
+    logits = {}
+    
+    async def ascore_documents(query, documents):
+        calls.append([doc['url'] for doc in documents])
+        return reranker_service._build_scored_documents(documents, np.array([logits[doc['url']] for doc in documents]))
+    
+    monkeypatch.setattr(reranker_service, "is_enabled", lambda: True)
+    monkeypatch.setattr(reranker_service, "ascore_documents", ascore_documents)
+    return calls, logits
+
+
+def select(candidates):
+    return asyncio.run(rag_service.aselect_context("query", candidates))
+
+
+def test_primary_tier_wins_when_it_has_results():
+    result = select([candidate("a", 0.9), candidate("b", 0.6), candidate("c", 0.3)])
+    assert result.tier == "primary"
+    assert result.sources == ["a"]
+    assert result.rerank_path == "disabled"
+    assert result.candidates == 3
+
+
+def test_fallback_tier_uses_the_same_candidates():
+    result = select([candidate("a", 0.7), candidate("b", 0.6), candidate("c", 0.3)])
+    assert result.tier == "fallback"
+    assert result.sources == ["a", "b"]
+
+
+def test_no_tier_means_out_of_scope():
+    result = select([candidate("a", 0.3)])
+    assert result.tier == "none"
+    assert result.context == ""
+    assert result.sources == []
+
+
+def test_each_candidate_is_reranked_once_across_tiers(reranker):
+    calls, logits = reranker
+    logits.update(a=-5.0, b=3.0, c=-5.0)
+    
+    result = select([candidate("a", 0.9), candidate("b", 0.6), candidate("c", 0.3)])
+    
+    # The primary tier's only candidate is rejected, the fallback tier reuses its score
+    assert calls == [["a"], ["b"]]
+    assert result.tier == "fallback"
+    assert result.sources == ["b"]
+    assert result.rerank_path == "full"
+
+
+def test_reranker_order_replaces_vector_order(reranker):
+    _, logits = reranker
+    logits.update(a=1.0, b=4.0)
+    
+    result = select([candidate("a", 0.95), candidate("b", 0.9)])
+    assert result.sources == ["b", "a"]
+
+
+def test_reranker_failure_falls_back_to_vector_results(monkeypatch):
+    async def broken(query, documents):
+        raise RuntimeError("model crashed")
+    
+    monkeypatch.setattr(reranker_service, "is_enabled", lambda: True)
+    monkeypatch.setattr(reranker_service, "ascore_documents", broken)
+    
+    result = select([candidate("a", 0.9), candidate("b", 0.85)])
+    assert result.rerank_path == "failed"
+    assert result.sources == ["a", "b"]
+
+
+def test_lexical_only_hits_need_a_dense_result_in_the_tier():
+    lexical = candidate("lex", 0.0, lexical_only=True)
+    
+    assert select([lexical, candidate("a", 0.3)]).tier == "none"
+    result = select([lexical, candidate("a", 0.9)])
+    assert result.sources == ["lex", "a"]
+
+
+def test_retrieval_runs_one_vector_search(monkeypatch):
+    searches = []
+    
+    async def asearch(query_vector, limit, score_threshold):
+        searches.append(score_threshold)
+        return [candidate("a", 0.7)]
+    
+    monkeypatch.setattr(langchain_rag.vector_store, "asearch", asearch)
+    result = asyncio.run(rag_service.aretrieve("query", query_embedding=[0.1, 0.2]))
+    
+    # One search down to the loosest threshold serves both tiers
+    assert searches == [0.5]
+    assert result.tier == "fallback"
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    monkeypatch.setattr(settings, "RERANK_CASCADE_ENABLED", True)
+    monkeypatch.setattr(settings, "RERANK_CASCADE_SKIP_MARGIN", 0.08)
+    monkeypatch.setattr(settings, "RERANK_CASCADE_PREFIX_MARGIN", 0.03)
+    monkeypatch.setattr(settings, "RERANK_CASCADE_MAX_ENTROPY", 0.6)
+    monkeypatch.setattr(settings, "RERANK_CASCADE_TEMPERATURE", 0.02)
+    monkeypatch.setattr(settings, "RERANK_CASCADE_PREFIX_SIZE", 5)
+
+
+def scored(*scores):
+    return [candidate(f"doc{i}", score) for i, score in enumerate(scores)]
+
+
+def test_cascade_disabled_reranks_everything():
+    assert rag_service.choose_rerank_path(scored(0.99, 0.5)) == ("full", 2)
+
+
+@pytest.mark.usefixtures("cascade")
+@pytest.mark.parametrize("scores, expected", [
+    # Clear winner: the vector order is trusted
+    ((0.95, 0.85, 0.84), ("skipped", 0)),
+    # Moderate margin: only a prefix
+    ((0.90, 0.85, 0.84, 0.84, 0.84, 0.84, 0.84), ("prefix", 5)),
+    # Small margin, but the mass sits on the top two (low entropy)
+    ((0.90, 0.88, 0.5, 0.5, 0.5, 0.5), ("prefix", 5)),
+    # Flat scores: no shortcut
+    ((0.90, 0.90, 0.90, 0.90, 0.90, 0.90), ("full", 6)),
+    # Too few candidates to judge
+    ((0.9,), ("full", 1)),
+])
+def test_cascade_paths(scores, expected):
+    assert rag_service.choose_rerank_path(scored(*scores)) == expected
+
+
+@pytest.mark.usefixtures("cascade")
+def test_cascade_ignores_lexical_only_scores():
+    docs = [candidate("lex", 0.0, lexical_only=True), candidate("a", 0.9), candidate("b", 0.6)]
+    assert rag_service.choose_rerank_path(docs) == ("skipped", 0)
+    assert rag_service.choose_rerank_path(docs[:2]) == ("full", 2)
+
+
+@pytest.mark.usefixtures("cascade")
+def test_skip_path_uses_vector_order_without_lexical_hits(reranker):
+    calls, _ = reranker
+    result = select([candidate("a", 0.95), candidate("b", 0.85), candidate("lex", 0.0, lexical_only=True)])
+    
+    assert calls == []
+    assert result.rerank_path == "skipped"
+    assert result.sources == ["a", "b"]
+
+
+@pytest.mark.usefixtures("cascade")
+def test_prefix_path_appends_the_tail_once_the_prefix_is_accepted(reranker):
+    calls, logits = reranker
+    candidates = scored(0.90, 0.86, 0.85, 0.85, 0.85, 0.85, 0.85)
+    logits.update({doc['url']: -5.0 for doc in candidates})
+    logits['doc1'] = 3.0
+    
+    result = select(candidates)
+    assert calls == [[f"doc{i}" for i in range(5)]]
+    assert result.rerank_path == "prefix"
+    assert result.sources == ["doc1", "doc5", "doc6"]
+
+
+@pytest.mark.usefixtures("cascade")
+def test_prefix_path_rejected_prefix_keeps_the_tail_out(reranker):
+    _, logits = reranker
+    candidates = scored(0.90, 0.86, 0.85, 0.85, 0.85, 0.85, 0.85)
+    logits.update({doc['url']: -5.0 for doc in candidates})
+    
+    result = select(candidates)
+    assert result.tier == "none"
+    assert result.sources == []
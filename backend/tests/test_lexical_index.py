@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def result(url, chunk_index=0, **fields):
+    return {'url': url, 'chunk_index': chunk_index, 'content': url, **fields}
+
+
+def test_rrf_ranks_chunks_found_by_both_searches_first():
+    dense = [result("a", score=0.9), result("b", score=0.8)]
+    lexical = [result("b", lexical_score=7.0), result("c", lexical_score=5.0)]
+    fused = reciprocal_rank_fusion(dense, lexical, limit=10)
+    
+    assert [r['url'] for r in fused] == ["b", "a", "c"]
+    assert fused[0]['rrf_score'] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[0]['score'] == 0.8
+    assert fused[0]['lexical_score'] == 7.0
+
+
+def test_rrf_marks_lexical_only_results():
+    fused = reciprocal_rank_fusion([result("a", score=0.9)], [result("c", lexical_score=5.0)], limit=10)
+    by_url = {r['url']: r for r in fused}
+    
+    assert by_url["c"]['lexical_only'] is True
+    assert by_url["c"]['score'] == 0.0
+    assert 'lexical_only' not in by_url["a"]
+
+
+def test_rrf_keys_on_url_and_chunk_index():
+    dense = [result("a", 0, score=0.9)]
+    lexical = [result("a", 1, lexical_score=5.0)]
+    assert len(reciprocal_rank_fusion(dense, lexical, limit=10)) == 2
+
+
+def test_rrf_applies_limit_after_fusion():
+    dense = [result(url, score=0.5) for url in "abc"]
+    lexical = [result(url, lexical_score=1.0) for url in "cde"]
+    fused = reciprocal_rank_fusion(dense, lexical, limit=2)
+    
+    assert len(fused) == 2
+    assert fused[0]['url'] == "c"
+
+
+def test_tokenize_keeps_technical_terms():
+    assert tokenize("What is C# and Node.js for CI-CD?") == ["c#", "node.js", "ci-cd"]
+
+
+def test_search_ranks_matching_chunks(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.json"))
+    index.build([
+        {'content': content, 'metadata': {'url': url, 'title': url, 'chunk_index': 0}}
+        for url, content in [
+            ("react", "We build React and Node.js web applications"),
+            ("ml", "Machine learning models for demand forecasting"),
+            ("mobile", "Native mobile apps, with React Native for cross-platform"),
+        ]
+    ])
+    
+    results = index.search("react native apps")
+    assert [r['url'] for r in results] == ["mobile", "react"]
+    assert results[0]['lexical_score'] > results[1]['lexical_score']
+
+
+def test_asearch_matches_search(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.json"))
+    index.build([{'content': "Python backend services", 'metadata': {'url': "py", 'title': "py", 'chunk_index': 0}}])
+    
+    assert asyncio.run(index.asearch("python")) == index.search("python")
@@ -0,0 +1,80 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.local_vector_store import LocalVectorStore
+from app.utils.corpus import content_hash, point_id
+
+
+def chunk(url, chunk_index=0, content=None):
+    content = content or f"{url} #{chunk_index}"
+    return {'content': content, 'metadata': {'url': url, 'title': url, 'chunk_index': chunk_index}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalVectorStore(str(tmp_path / "index"))
+
+
+def test_batches_are_written_once_on_flush(store, monkeypatch):
+    writes = []
+    write = store._write
+    monkeypatch.setattr(store, "_write", lambda *args: (writes.append(len(args[1])), write(*args)))
+    
+    for i in range(5):
+        asyncio.run(store.aupsert_documents([chunk(f"https://example.com/{i}")], [[1.0, float(i)]]))
+    assert writes == []
+    assert not store.collection_exists()
+    
+    store.flush()
+    assert writes == [5]
+    store.flush()
+    assert writes == [5]
+
+
+def test_search_sees_points_after_flush(store):
+    store.upsert_documents([chunk("a"), chunk("b")], [[1.0, 0.0], [0.0, 1.0]])
+    assert store.search([1.0, 0.0]) == []
+    
+    store.flush()
+    results = store.search([1.0, 0.1], limit=2)
+    assert [r['url'] for r in results] == ["a", "b"]
+    assert results[0]['score'] == pytest.approx(1 / np.sqrt(1.01))
+
+
+def test_upsert_overwrites_in_place(store):
+    store.upsert_documents([chunk("a"), chunk("b")], [[1.0, 0.0], [0.0, 1.0]])
+    store.flush()
+    store.upsert_documents([chunk("a", content="new a")], [[0.0, 1.0]])
+    store.upsert_documents([chunk("c")], [[1.0, 1.0]])
+    store.flush()
+    
+    reopened = LocalVectorStore(store.index_dir)
+    assert reopened.get_content_hashes() == {
+        point_id("a", 0): content_hash("new a"),
+        point_id("b", 0): content_hash("b #0"),
+        point_id("c", 0): content_hash("c #0"),
+    }
+    assert reopened.search([1.0, 0.0], limit=1)[0]['url'] == "c"
+
+
+def test_content_hashes_include_pending_points(store):
+    store.upsert_documents([chunk("a")], [[1.0, 0.0]])
+    assert store.get_content_hashes() == {point_id("a", 0): content_hash("a #0")}
+
+
+def test_delete_flushes_pending_points_first(store):
+    store.upsert_documents([chunk("a"), chunk("b")], [[1.0, 0.0], [0.0, 1.0]])
+    store.delete_points([point_id("a", 0)])
+    
+    assert store.pending == {}
+    assert [r['url'] for r in store.search([1.0, 0.0])] == ["b"]
+
+
+def test_float16_index(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "index"), dtype="float16")
+    store.upsert_documents([chunk("a")], [[3.0, 4.0]])
+    store.flush()
+    assert store.search([3.0, 4.0])[0]['score'] == pytest.approx(1.0, abs=1e-3)
+    assert LocalVectorStore(store.index_dir).search([1.0, 0.0])[0]['url'] == "a"
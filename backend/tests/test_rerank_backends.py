@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.rerank_backends import (
+    RerankBackend,
+    parse_worker_address,
+    require_worker_authkey,
+)
+
+
+class SumBackend(RerankBackend):
+    """Logit = sum of the attention mask, so padding must not count"""
+    
+    name = "sum"
+    
+    def __init__(self):
+        super().__init__("test-model")
+        self.tokenizer = SimpleNamespace(pad_token_id=0)
+        self.batches = []
+    
+    def predict_logits(self, features):
+        self.batches.append(features['input_ids'].shape)
+        return features['attention_mask'].sum(axis=1).astype(np.float32) - 2
+
+
+def test_backend_without_predict_logits_cannot_be_constructed():
+    class Incomplete(RerankBackend):
+        pass
+    
+    with pytest.raises(TypeError):
+        Incomplete("test-model")
+
+
+def test_pad_right_pads_to_the_longest_item():
+    features = SumBackend().pad([
+        {'input_ids': [5, 6, 7], 'token_type_ids': [0, 0, 1]},
+        {'input_ids': [8], 'token_type_ids': [0]},
+    ])
+    assert features['input_ids'].tolist() == [[5, 6, 7], [8, 0, 0]]
+    assert features['attention_mask'].tolist() == [[1, 1, 1], [1, 0, 0]]
+    assert features['token_type_ids'].tolist() == [[0, 0, 1], [0, 0, 0]]
+
+
+def test_predict_encoded_batches_and_applies_sigmoid():
+    backend = SumBackend()
+    items = [{'input_ids': [1] * length} for length in (2, 3, 1)]
+    
+    scores = backend.predict_encoded(items, batch_size=2)
+    assert backend.batches == [(2, 3), (1, 1)]
+    assert scores == pytest.approx(1 / (1 + np.exp(-np.array([0.0, 1.0, -1.0]))))
+    assert backend.predict_encoded([]).shape == (0,)
+
+
+def test_parse_worker_address_defaults_to_loopback():
+    assert parse_worker_address(":6390") == ("127.0.0.1", 6390)
+    assert parse_worker_address("rerank.internal:7000") == ("rerank.internal", 7000)
+
+
+@pytest.mark.parametrize("authkey", [None, "", "change-me", "zibtek-reranker"])
+def test_worker_authkey_must_be_private(authkey):
+    with pytest.raises(ValueError):
+        require_worker_authkey(authkey)
+
+
+def test_worker_authkey_is_encoded():
+    assert require_worker_authkey("s3cret") == b"s3cret"
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.rerank_batcher import RerankBatcher
+
+TIMEOUT = 5
+
+
+def length_scores(pairs):
+    """Score a pair by the length of its document"""
+    return np.array([len(doc) for _, doc in pairs], dtype=np.float32)
+
+
+class GatedPredict:
+    """predict_fn that blocks until released, to hold the worker mid-batch"""
+    
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+    
+    def __call__(self, pairs):
+        self.started.set()
+        assert self.release.wait(TIMEOUT)
+        return length_scores(pairs)
+
+
+def test_scores_are_aligned_with_pairs():
+    batcher = RerankBatcher(length_scores, bucket_size=2)
+    pairs = [("q", "ccc"), ("q", "a"), ("q", "bb")]
+    scores = batcher.submit(pairs).result(timeout=TIMEOUT)
+    assert scores.tolist() == [3.0, 1.0, 2.0]
+
+
+def test_empty_submit_resolves_immediately():
+    batcher = RerankBatcher(length_scores)
+    assert batcher.submit([]).result(timeout=TIMEOUT).tolist() == []
+
+
+def test_concurrent_jobs_share_a_batch():
+    predict = GatedPredict()
+    batcher = RerankBatcher(predict, max_wait_ms=50)
+    first = batcher.submit([("q", "a")])
+    assert predict.started.wait(TIMEOUT)
+    # Queued while the worker is busy, then collected together
+    second = batcher.submit([("q", "bb")])
+    third = batcher.submit([("q", "ccc")])
+    predict.release.set()
+    assert first.result(timeout=TIMEOUT).tolist() == [1.0]
+    assert second.result(timeout=TIMEOUT).tolist() == [2.0]
+    assert third.result(timeout=TIMEOUT).tolist() == [3.0]
+    assert batcher.stats()["batches"] == 2
+
+
+def test_job_cancelled_while_queued_is_skipped():
+    predict = GatedPredict()
+    batcher = RerankBatcher(predict)
+    running = batcher.submit([("q", "a")])
+    assert predict.started.wait(TIMEOUT)
+    cancelled = batcher.submit([("q", "bb")])
+    assert cancelled.cancel()
+    predict.release.set()
+    
+    assert running.result(timeout=TIMEOUT).tolist() == [1.0]
+    assert batcher.submit([("q", "ccc")]).result(timeout=TIMEOUT).tolist() == [3.0]
+    assert batcher.worker.is_alive()
+
+
+def test_cancelled_async_waiter_does_not_kill_the_worker():
+    predict = GatedPredict()
+    batcher = RerankBatcher(predict)
+    
+    async def abandon_request():
+        # Like an SSE client disconnecting while its pairs are being scored
+        waiter = asyncio.ensure_future(asyncio.wrap_future(batcher.submit([("q", "a")])))
+        await asyncio.get_running_loop().run_in_executor(None, predict.started.wait, TIMEOUT)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+    
+    asyncio.run(abandon_request())
+    predict.release.set()
+    
+    assert batcher.submit([("q", "bb")]).result(timeout=TIMEOUT).tolist() == [2.0]
+    assert batcher.worker.is_alive()
+
+
+def test_errors_fail_the_batch_but_not_the_worker():
+    def length_fn(pair):
+        if pair[1] == "bad":
+            raise ValueError("unmeasurable pair")
+        return len(pair[1])
+    
+    batcher = RerankBatcher(length_scores, length_fn=length_fn)
+    with pytest.raises(ValueError):
+        batcher.submit([("q", "bad")]).result(timeout=TIMEOUT)
+    assert batcher.submit([("q", "ok")]).result(timeout=TIMEOUT).tolist() == [2.0]
@@ -0,0 +1,77 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.reranker import reranker_service
+from app.services.rerank_score_cache import RerankScoreCache
+from app.utils import corpus
+from app.utils.corpus import bump_corpus_version
+
+
+@pytest.fixture(autouse=True)
+def corpus_version_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CORPUS_VERSION_FILE", str(tmp_path / "corpus_version"))
+    monkeypatch.setattr(corpus, "_cached_version", "")
+    monkeypatch.setattr(corpus, "_cached_mtime", None)
+
+
+def docs(*ids):
+    return [{'id': id_, 'content': f"About {id_}", 'url': id_, 'score': 0.5} for id_ in ids]
+
+
+def test_keys_cover_model_query_and_chunk():
+    cache = RerankScoreCache("model-a")
+    key = cache.make_keys("What does Zibtek do?", docs("p1"))[0]
+    
+    assert cache.make_keys("  what does zibtek DO? ", docs("p1")) == [key]
+    assert cache.make_keys("Who founded Zibtek?", docs("p1")) != [key]
+    assert cache.make_keys("What does Zibtek do?", docs("p2")) != [key]
+    assert RerankScoreCache("model-b").make_keys("What does Zibtek do?", docs("p1")) != [key]
+    # Chunks without a point id are never cached
+    assert cache.make_keys("query", [{'content': "x"}]) == [None]
+
+
+def test_lru_eviction():
+    cache = RerankScoreCache("model", max_size=2)
+    cache.put_many(["a", "b"], [0.1, 0.2])
+    assert cache.get_many(["a"]) == [0.1]
+    cache.put_many(["c", None], [0.3, 0.4])
+    
+    assert cache.get_many(["a", "b", "c"]) == [0.1, None, 0.3]
+    assert cache.stats()["size"] == 2
+
+
+def test_corpus_version_bump_clears_scores():
+    cache = RerankScoreCache("model")
+    cache.put_many(["a"], [0.9])
+    bump_corpus_version()
+    assert cache.get_many(["a"]) == [None]
+
+
+def test_zero_size_disables_the_cache():
+    cache = RerankScoreCache("model", max_size=0)
+    cache.put_many(["a"], [0.9])
+    assert cache.get_many(["a"]) == [None]
+
+
+def test_reranker_only_scores_uncached_pairs(monkeypatch):
+    predicted = []
+    
+    def predict(items):
+        predicted.append(list(items))
+        return np.array([float(len(item)) for item in items])
+    
+    monkeypatch.setattr(reranker_service, "score_cache", RerankScoreCache("model"))
+    monkeypatch.setattr(reranker_service, "batcher", None)
+    monkeypatch.setattr(reranker_service, "_encode", lambda query, documents: [doc['content'] for doc in documents])
+    monkeypatch.setattr(reranker_service, "_predict", predict)
+    
+    first = asyncio.run(reranker_service.ascore_documents("query", docs("aa", "b")))
+    second = asyncio.run(reranker_service.ascore_documents("query", docs("b", "ccc")))
+    
+    assert predicted == [["About aa", "About b"], ["About ccc"]]
+    assert [doc['url'] for doc in first] == ["aa", "b"]
+    assert [doc['url'] for doc in second] == ["ccc", "b"]
+    assert second[1]['rerank_score'] == pytest.approx(first[1]['rerank_score'])
@@ -0,0 +1,10 @@
+import pytest
+
+from app.core.config import settings
+from app.rerank_server import RerankWorkerPool
+
+
+def test_pool_reports_a_worker_that_cannot_load_the_model(monkeypatch):
+    monkeypatch.setattr(settings, "RERANK_BACKEND", "missing-backend")
+    with pytest.raises(RuntimeError, match="Unknown RERANK_BACKEND"):
+        RerankWorkerPool(workers=1, torch_threads=1, load_timeout=60)
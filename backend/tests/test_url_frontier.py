@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.services.url_frontier import TIER_SEED, TIER_SITEMAP, URLFrontier, canonicalize_url, parse_sitemap
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM/About/", "https://example.com/About"),
+    ("https://example.com:443/a#team", "https://example.com/a"),
+    ("http://example.com:8080/", "http://example.com:8080/"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com/?b=2&a=1", "https://example.com/?a=1&b=2"),
+    ("https://example.com/a?utm_source=x&UTM_medium=y&gclid=1&page=2", "https://example.com/a?page=2"),
+    ("  https://example.com/a  ", "https://example.com/a"),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc> https://example.com/a </loc><lastmod>2024-05-01</lastmod></url>
+  <url><loc>https://example.com/b</loc><lastmod>2024-05-01T10:00:00Z</lastmod></url>
+  <url><loc>https://example.com/c</loc><lastmod>yesterday</lastmod></url>
+  <url><loc>https://example.com/d</loc></url>
+  <url><lastmod>2024-05-01</lastmod></url>
+</urlset>"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/pages.xml</loc></sitemap>
+  <sitemap><loc>https://example.com/posts.xml</loc></sitemap>
+</sitemapindex>"""
+
+
+def test_parse_sitemap():
+    pages, sitemaps = parse_sitemap(SITEMAP)
+    
+    assert sitemaps == []
+    assert [url for url, _ in pages] == [f"https://example.com/{name}" for name in "abcd"]
+    lastmods = dict(pages)
+    assert lastmods["https://example.com/b"] > lastmods["https://example.com/a"]
+    # Unparseable or missing lastmod
+    assert lastmods["https://example.com/c"] is None
+    assert lastmods["https://example.com/d"] is None
+
+
+def test_parse_sitemap_index():
+    assert parse_sitemap(SITEMAP_INDEX) == ([], ["https://example.com/pages.xml", "https://example.com/posts.xml"])
+
+
+def drain(frontier):
+    async def run():
+        urls = []
+        while not frontier.queue.empty():
+            url, _ = await frontier.pop()
+            frontier.task_done()
+            urls.append(url)
+        return urls
+    return asyncio.run(run())
+
+
+def test_frontier_dedups_canonical_forms():
+    frontier = URLFrontier()
+    assert frontier.push("https://example.com/a")
+    assert not frontier.push("https://EXAMPLE.com/a/#top")
+    assert not frontier.push("https://example.com/a?utm_campaign=x")
+    assert frontier.push("https://example.com/b")
+    
+    assert drain(frontier) == ["https://example.com/a", "https://example.com/b"]
+    assert frontier.duplicates == 2
+    # Popped URLs stay seen
+    assert not frontier.push("https://example.com/a")
+
+
+def test_frontier_skips_links_beyond_max_depth():
+    frontier = URLFrontier(max_depth=1)
+    assert frontier.push("https://example.com/a", depth=1)
+    assert not frontier.push("https://example.com/b", depth=2)
+    assert frontier.too_deep == 1
+
+
+def test_frontier_priority():
+    frontier = URLFrontier()
+    frontier.push("https://example.com/deep", depth=2)
+    frontier.push("https://example.com/shallow", depth=1)
+    frontier.push("https://example.com/undated", tier=TIER_SITEMAP)
+    frontier.push("https://example.com/old", tier=TIER_SITEMAP, lastmod=1000.0)
+    frontier.push("https://example.com/new", tier=TIER_SITEMAP, lastmod=2000.0)
+    frontier.push("https://example.com/", tier=TIER_SEED)
+    
+    assert drain(frontier) == [
+        "https://example.com/",
+        "https://example.com/new",
+        "https://example.com/old",
+        "https://example.com/undated",
+        "https://example.com/shallow",
+        "https://example.com/deep",
+    ]
@@ -3,7 +3,7 @@
 import { useEffect } from "react";
 import { useChatStore } from "@/lib/store";
 import {
-  sendMessage,
+  sendMessageStream,
   createConversation,
   getConversationHistory,
   getConversations,
@@ -19,6 +19,7 @@ export default function ChatInterface() {
     messages,
     setMessages,
     addMessage,
+    updateLastMessage,
     setIsLoading,
     clearMessages,
     setConversations,
@@ -87,15 +88,31 @@ export default function ChatInterface() {
 
     setIsLoading(true);
 
-    try {
-      const response = await sendMessage(currentConversationId, message);
+    let streamedContent = "";
+    let streamedSources: string[] = [];
+    let hasAssistantMessage = false;
 
-      // Add assistant response with sources
-      addMessage({
-        role: "assistant",
-        content: response.message,
-        timestamp: new Date().toISOString(),
-        sources: response.sources,
+    try {
+      await sendMessageStream(currentConversationId, message, {
+        onSources: (sources) => {
+          streamedSources = sources;
+        },
+        onToken: (token) => {
+          streamedContent += token;
+          if (!hasAssistantMessage) {
+            // First token: replace the loading indicator with the assistant message
+            hasAssistantMessage = true;
+            setIsLoading(false);
+            addMessage({
+              role: "assistant",
+              content: streamedContent,
+              timestamp: new Date().toISOString(),
+              sources: streamedSources,
+            });
+          } else {
+            updateLastMessage({ content: streamedContent });
+          }
+        },
       });
 
       // Update conversation title if it's the first message
@@ -124,12 +141,17 @@ export default function ChatInterface() {
       }
     } catch (error) {
       console.error("Failed to send message:", error);
-      // Add error message
-      addMessage({
-        role: "assistant",
+      // Add error message, replacing a partially streamed answer if there is one
+      const errorMessage = {
+        role: "assistant" as const,
         content: "Sorry, I encountered an error. Please try again.",
         timestamp: new Date().toISOString(),
-      });
+      };
+      if (hasAssistantMessage) {
+        updateLastMessage({ ...errorMessage, sources: [] });
+      } else {
+        addMessage(errorMessage);
+      }
     } finally {
       setIsLoading(false);
     }
@@ -3,6 +3,7 @@ import {
   ConversationWithMessages,
   ChatResponse,
   MessageRequest,
+  StreamHandlers,
 } from "@/types/chat";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
@@ -29,6 +30,77 @@ export async function sendMessage(
   return response.json();
 }
 
+export async function sendMessageStream(
+  conversationId: string,
+  message: string,
+  handlers: StreamHandlers = {}
+): Promise<ChatResponse> {
+  const response = await fetch(`${API_URL}/api/chat/message/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream",
+    },
+    body: JSON.stringify({
+      conversation_id: conversationId,
+      message,
+    } as MessageRequest),
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error("Failed to send message");
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let content = "";
+  let sources: string[] = [];
+
+  const handleEvent = (rawEvent: string) => {
+    let event = "message";
+    let data = "";
+    for (const line of rawEvent.split("\n")) {
+      if (line.startsWith("event:")) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith("data:")) {
+        data += line.slice(5).trim();
+      }
+    }
+    if (!data) return;
+
+    const payload = JSON.parse(data);
+    if (event === "sources") {
+      sources = payload.sources;
+      handlers.onSources?.(sources);
+    } else if (event === "token") {
+      content += payload.content;
+      handlers.onToken?.(payload.content);
+    } else if (event === "error") {
+      throw new Error(payload.detail || "Failed to send message");
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      handleEvent(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf("\n\n");
+    }
+  }
+
+  return {
+    message: content,
+    sources,
+    conversation_id: conversationId,
+  };
+}
+
 export async function createConversation(
   title: string = "New Chat"
 ): Promise<Conversation> {
@@ -10,6 +10,7 @@ interface ChatStore {
   setCurrentConversation: (id: string) => void;
   setMessages: (messages: Message[]) => void;
   addMessage: (message: Message) => void;
+  updateLastMessage: (update: Partial<Message>) => void;
   setConversations: (conversations: Conversation[]) => void;
   setIsLoading: (isLoading: boolean) => void;
   clearMessages: () => void;
@@ -25,6 +26,12 @@ export const useChatStore = create<ChatStore>((set) => ({
   setMessages: (messages) => set({ messages }),
   addMessage: (message) =>
     set((state) => ({ messages: [...state.messages, message] })),
+  updateLastMessage: (update) =>
+    set((state) => ({
+      messages: state.messages.map((message, index) =>
+        index === state.messages.length - 1 ? { ...message, ...update } : message
+      ),
+    })),
   setConversations: (conversations) => set({ conversations }),
   setIsLoading: (isLoading) => set({ isLoading }),
   clearMessages: () => set({ messages: [] }),
@@ -27,3 +27,7 @@ export interface MessageRequest {
   message: string;
 }
 
+export interface StreamHandlers {
+  onSources?: (sources: string[]) => void;
+  onToken?: (token: string) => void;
+}